@@ -0,0 +1,176 @@
+"""
+get_ofi 离线基准：逐行循环版 vs 向量化版
+
+从 processed tick 中截取与 get_ticks(start_dt, end_dt) 相同的时间窗口作为"录制窗口"，
+分别用原逐行实现（df.iloc[k] + dict + calc_ofi）与 jq_strategy 中的向量化 ofi_from_ticks 计算，
+校验 (ofi, rel_spread, last_current) 一致并报告耗时。
+
+用法：
+    python benchmarks/bench_get_ofi.py
+    python benchmarks/bench_get_ofi.py --window_seconds 180 --n_windows 500 --crossed_ratio 0.01
+"""
+from __future__ import annotations
+import argparse
+import importlib
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "jq_strategy"))
+
+from src.ofi.io import list_day_files  # noqa: E402
+from src.ofi.paths import PROCESSED_TICKS_DIR  # noqa: E402
+
+
+def load_strategy(name: str):
+    """导入 jq_strategy 下的策略模块（jqdata 由 jq_strategy/jqdata.py 本地替身提供）"""
+    return importlib.import_module(name)
+
+
+# ----------------------------------------------------------------------
+# 原逐行实现（向量化前的 get_ofi 计算部分），作为对照
+# ----------------------------------------------------------------------
+def calc_ofi(prev, curr, level):
+    ap, av = f'a{level}_p', f'a{level}_v'
+    bp, bv = f'b{level}_p', f'b{level}_v'
+    ofi = 0.0
+
+    if curr[bp] > prev[bp]:
+        ofi += curr[bv]
+    elif curr[bp] == prev[bp]:
+        ofi += (curr[bv] - prev[bv])
+    else:
+        ofi -= prev[bv]
+
+    if curr[ap] < prev[ap]:
+        ofi -= curr[av]
+    elif curr[ap] == prev[ap]:
+        ofi -= (curr[av] - prev[av])
+    else:
+        ofi += prev[av]
+
+    return ofi
+
+
+def ofi_from_ticks_loop(df, levels=5, weight=None):
+    weight = np.ones(levels, dtype=float) if weight is None else np.asarray(weight, dtype=float)
+    if df is None or len(df) < 2:
+        return np.nan, np.nan, np.nan
+
+    fields = ['current']
+    for i in range(1, levels + 1):
+        fields += [f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v']
+
+    df = df.sort_values('time')
+
+    last = df.iloc[-1]
+    a1, b1 = float(last['a1_p']), float(last['b1_p'])
+    mid = (a1 + b1) / 2.0 if (a1 > 0 and b1 > 0) else np.nan
+    rel_spread = (a1 - b1) / mid if (mid and mid > 0 and a1 > b1) else np.nan
+    last_current = float(last['current'])
+
+    prev_row = df.iloc[0]
+    prev = {c: float(prev_row[c]) for c in fields}
+
+    res = 0.0
+    lvl_ofi = np.zeros(levels, dtype=float)
+    for k in range(1, len(df)):
+        row = df.iloc[k]
+        curr = {c: float(row[c]) for c in fields}
+        if curr['a1_p'] <= 0 or curr['b1_p'] <= 0 or curr['a1_p'] <= curr['b1_p']:
+            prev = curr
+            continue
+        for level in range(1, levels + 1):
+            lvl_ofi[level - 1] = calc_ofi(prev, curr, level)
+        res += float((lvl_ofi * weight).sum())
+        prev = curr
+
+    return res, rel_spread, last_current
+
+
+# ----------------------------------------------------------------------
+# 录制窗口
+# ----------------------------------------------------------------------
+def recorded_windows(processed_root: Path, n_windows: int, window_seconds: int,
+                     levels: int, crossed_ratio: float, seed: int):
+    """
+    从 processed tick 中按再平衡时点截取窗口，列与 get_ticks(fields=...) 一致
+
+    Returns:
+        [DataFrame, ...]
+    """
+    rng = np.random.default_rng(seed)
+    cols = ['ts', 'current'] + [f'{s}{i}_{k}' for i in range(1, levels + 1) for s in 'ab' for k in 'pv']
+    files = [f for d in sorted(Path(processed_root).iterdir()) if d.is_dir()
+             for _, f in list_day_files(d, layout="dir")]
+    if not files:
+        raise SystemExit(f"No processed tick files under {processed_root}")
+
+    windows = []
+    per_file = max(1, n_windows // len(files) + 1)
+    for f in files:
+        day = pd.read_parquet(f, columns=cols).rename(columns={'ts': 'time'})
+        day['time'] = pd.to_datetime(day['time'])
+        if crossed_ratio > 0:
+            bad = rng.random(len(day)) < crossed_ratio
+            day.loc[bad, 'a1_p'] = day.loc[bad, 'b1_p']
+        ends = day['time'].dt.ceil('min').drop_duplicates()
+        ends = ends.sample(min(per_file, len(ends)), random_state=int(rng.integers(1 << 31)))
+        t = day['time'].to_numpy()
+        for end in sorted(ends):
+            lo = np.searchsorted(t, np.datetime64(end - pd.Timedelta(seconds=window_seconds)), side='left')
+            hi = np.searchsorted(t, np.datetime64(end), side='right')
+            windows.append(day.iloc[lo:hi].reset_index(drop=True))
+        if len(windows) >= n_windows:
+            break
+    return windows[:n_windows]
+
+
+def _same(x, y) -> bool:
+    return bool(np.isclose(x, y, rtol=1e-9, atol=1e-6) or (np.isnan(x) and np.isnan(y)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="get_ofi 逐行 vs 向量化 基准")
+    parser.add_argument("--processed_root", type=str, default=str(PROCESSED_TICKS_DIR))
+    parser.add_argument("--n_windows", type=int, default=300)
+    parser.add_argument("--window_seconds", type=int, default=60)
+    parser.add_argument("--levels", type=int, default=5)
+    parser.add_argument("--crossed_ratio", type=float, default=0.005,
+                        help="随机把部分快照改成交叉盘口，覆盖异常过滤分支")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    windows = recorded_windows(Path(args.processed_root), args.n_windows, args.window_seconds,
+                               args.levels, args.crossed_ratio, args.seed)
+    n_ticks = sum(len(w) for w in windows)
+    weight = 1.0 / np.arange(1, args.levels + 1)
+    print(f"{len(windows)} windows, {n_ticks} ticks, window={args.window_seconds}s, levels={args.levels}")
+
+    t0 = time.perf_counter()
+    ref = [ofi_from_ticks_loop(w, args.levels, weight) for w in windows]
+    t_loop = time.perf_counter() - t0
+    print(f"{'loop (df.iloc)':<36s} {t_loop:8.3f}s  {n_ticks / t_loop:12,.0f} ticks/s")
+
+    ok = True
+    for name in ["strategy", "strategy_optimized"]:
+        mod = load_strategy(name)
+        t0 = time.perf_counter()
+        out = [mod.ofi_from_ticks(w, args.levels, weight) for w in windows]
+        t_vec = time.perf_counter() - t0
+        equal = all(_same(a, b) for r, o in zip(ref, out) for a, b in zip(r, o))
+        ok &= equal
+        print(f"{name + '.ofi_from_ticks':<36s} {t_vec:8.3f}s  {n_ticks / t_vec:12,.0f} ticks/s  "
+              f"x{t_loop / t_vec:.1f}  equal={equal}")
+
+    if not ok:
+        raise SystemExit("Vectorized get_ofi differs from the loop implementation")
+
+
+if __name__ == "__main__":
+    main()
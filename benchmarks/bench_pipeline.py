@@ -0,0 +1,219 @@
+"""
+OFI 流水线端到端基准
+
+用 src.ofi.synthetic 生成确定性的合成盘口（n_symbols 个标的 × size 个交易日），
+依次对各阶段计时并记录峰值内存：
+    read_raw_lob_csv -> convert_one_day -> clean_lob_data -> compute_ofi_per_tick
+    -> compute_ofi_minute -> 标签（build_labels.compute_minute_returns）
+    -> compute_ic（分钟截面）-> rolling_ic_analysis
+
+- 耗时取 repeat 次中的最小值；峰值内存在单独一次运行中用 tracemalloc 测量（不影响计时）
+- 吞吐量按该阶段处理的行数（tick 或分钟）计算
+- --save_baseline 把结果写入基线文件；否则与基线比较，耗时或峰值内存超过
+  (1 + tolerance) 倍时标记为 REGRESSION，--fail_on_regression 时以非零状态退出
+
+基线与机器相关，不随仓库提交；在同一台机器上先保存基线，改动后再运行比较。
+
+用法：
+    python benchmarks/bench_pipeline.py --save_baseline
+    python benchmarks/bench_pipeline.py --sizes 1 5 20 --n_symbols 4
+    python benchmarks/bench_pipeline.py --stages compute_ofi_per_tick compute_ic --fail_on_regression
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.ofi.io import read_raw_lob_csv, convert_one_day  # noqa: E402
+from src.ofi.clean import clean_lob_data  # noqa: E402
+from src.ofi.features_ofi import compute_ofi_per_tick, compute_ofi_minute, ensure_datetime_index  # noqa: E402
+from src.ofi.evaluate import compute_ic, rolling_ic_analysis  # noqa: E402
+from src.ofi.synthetic import synthetic_symbols, trading_dates, write_raw_days  # noqa: E402
+from scripts.build_labels import compute_minute_returns  # noqa: E402
+
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+STAGES = [
+    "read_raw_lob_csv", "convert_one_day", "clean_lob_data", "compute_ofi_per_tick",
+    "compute_ofi_minute", "build_labels", "compute_ic", "rolling_ic_analysis",
+]
+
+
+def measure(fn: Callable[[], int], repeat: int) -> dict:
+    """
+    对 fn 计时并测峰值内存
+
+    Args:
+        fn: 无参函数，返回处理的行数
+        repeat: 计时重复次数（取最小值）
+
+    Returns:
+        {"seconds", "rows", "rows_per_sec", "peak_mb"}
+    """
+    tracemalloc.start()
+    rows = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return {
+        "seconds": best,
+        "rows": int(rows),
+        "rows_per_sec": rows / best if best > 0 else np.nan,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def bench_size(n_days: int, symbols: List[str], stages: List[str], repeat: int, seed: int, workdir: Path) -> Dict[str, dict]:
+    """在 n_days 个交易日的数据上运行各阶段，返回 {stage: 测量结果}"""
+    raw_root, processed_root = workdir / "raw", workdir / "processed"
+    files = write_raw_days(raw_root, symbols, trading_dates(n_days), seed=seed)
+
+    # 各阶段的输入提前准备好，只对阶段本身计时
+    raw = [read_raw_lob_csv(f, f.parent.name, f.name.split(".")[0]) for f in files]
+    indexed = [ensure_datetime_index(df) for df in raw]
+    n_ticks = sum(len(df) for df in raw)
+
+    minute = {}
+    for f, df in zip(files, indexed):
+        minute.setdefault(f.parent.name, []).append(compute_ofi_minute(df, add_features=False)["ofi"])
+    labels = {}
+    for f, df in zip(files, raw):
+        labels.setdefault(f.parent.name, []).append(compute_minute_returns(df.copy()))
+    ofi_wide = pd.DataFrame({s: pd.concat(v) for s, v in minute.items()})
+    ret_wide = pd.DataFrame({s: pd.concat(v) for s, v in labels.items()})
+    signal, returns = ofi_wide[symbols[0]], ret_wide[symbols[0]]
+
+    def run_read():
+        return sum(len(read_raw_lob_csv(f, f.parent.name, f.name.split(".")[0])) for f in files)
+
+    def run_convert():
+        for f in files:
+            convert_one_day(f, processed_root)
+        return n_ticks
+
+    def run_clean():
+        return sum(len(clean_lob_data(df)[0]) for df in raw)
+
+    def run_ofi_tick():
+        return sum(len(compute_ofi_per_tick(df)) for df in indexed)
+
+    def run_ofi_minute():
+        for df in indexed:
+            compute_ofi_minute(df)
+        return n_ticks
+
+    def run_labels():
+        # compute_minute_returns 会原地添加 minute 列，传入副本
+        for df in raw:
+            compute_minute_returns(df.copy())
+        return n_ticks
+
+    def run_ic():
+        compute_ic(ofi_wide, ret_wide)
+        return len(ofi_wide)
+
+    def run_rolling_ic():
+        rolling_ic_analysis(signal, returns, window=20)
+        return len(signal)
+
+    runners = {
+        "read_raw_lob_csv": run_read,
+        "convert_one_day": run_convert,
+        "clean_lob_data": run_clean,
+        "compute_ofi_per_tick": run_ofi_tick,
+        "compute_ofi_minute": run_ofi_minute,
+        "build_labels": run_labels,
+        "compute_ic": run_ic,
+        "rolling_ic_analysis": run_rolling_ic,
+    }
+    return {stage: measure(runners[stage], repeat) for stage in stages}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float) -> List[str]:
+    """逐项与基线比较，返回回归项描述"""
+    regressions = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if b is None:
+            continue
+        for metric in ("seconds", "peak_mb"):
+            if b[metric] > 0 and r[metric] > b[metric] * (1 + tolerance):
+                regressions.append(f"{key} {metric}: {b[metric]:.4g} -> {r[metric]:.4g} "
+                                   f"(+{r[metric] / b[metric] - 1:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OFI 流水线端到端基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20], help="交易日数")
+    parser.add_argument("--n_symbols", type=int, default=4)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=str, default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save_baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="相对基线允许的变慢/增长比例")
+    parser.add_argument("--fail_on_regression", action="store_true")
+    parser.add_argument("--output", type=str, default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    symbols = synthetic_symbols(args.n_symbols)
+    results: Dict[str, dict] = {}
+    print(f"{'stage':<24s} {'days':>5s} {'rows':>10s} {'seconds':>9s} {'rows/s':>12s} {'peak MB':>9s}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            for stage, r in bench_size(size, symbols, args.stages, args.repeat, args.seed, Path(tmp)).items():
+                results[f"{stage}@{size}"] = r
+                print(f"{stage:<24s} {size:>5d} {r['rows']:>10,d} {r['seconds']:>9.4f} "
+                      f"{r['rows_per_sec']:>12,.0f} {r['peak_mb']:>9.1f}")
+
+    report = {
+        "created": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "n_symbols": args.n_symbols,
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"\nBaseline saved to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"\nNo baseline at {baseline_path}; run with --save_baseline first")
+        return
+
+    regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) vs {baseline_path.name} (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+    else:
+        print(f"\nNo regressions vs {baseline_path.name} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
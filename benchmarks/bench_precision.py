@@ -0,0 +1,129 @@
+"""
+float32 精度模式的漂移检验
+
+在 src.ofi.synthetic 生成的确定性盘口上，分别按 float64 与 float32（data.yaml 中
+feature.ofi.precision）计算分钟 OFI 特征与 mid/spread 统计，构造 IC 面板，比较：
+- 特征漂移：各列 max|x32 - x64| / max|x64|（相对列尺度）
+- IC 漂移：逐 (symbol, date) 的 Rank IC 与 Pearson IC 的最大绝对差
+- 面板内存与 grouped_rank_ic 耗时
+
+漂移超过阈值时打印 FAIL，--fail_on_drift 时以非零状态退出。
+
+用法：
+    python benchmarks/bench_precision.py
+    python benchmarks/bench_precision.py --n_symbols 8 --n_days 10 --fail_on_drift
+"""
+from __future__ import annotations
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from src.ofi.features_ofi import compute_ofi_minute, ensure_datetime_index  # noqa: E402
+from src.ofi.evaluate import grouped_rank_ic  # noqa: E402
+from src.ofi.io import _parse_ts  # noqa: E402
+from src.ofi.synthetic import generate_lob_day, synthetic_symbols, trading_dates  # noqa: E402
+from scripts.build_labels import compute_minute_returns  # noqa: E402
+
+FEATURE_COLS = [f"ofi{i}" for i in range(1, 6)] + ["ofi", "mid_last", "spread_mean", "spread_median"]
+
+
+def build_panels(symbols: List[str], dates: List[str], seed: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """同一批盘口分别按 float64 / float32 计算特征，返回两张面板（标签同样按对应精度）"""
+    frames = {"float64": [], "float32": []}
+    for symbol in symbols:
+        for date in dates:
+            raw = generate_lob_day(symbol, date, seed=seed)
+            raw.insert(0, "ts", _parse_ts(raw))
+            indexed = ensure_datetime_index(raw)
+            ret = compute_minute_returns(raw.copy()).rename("ret")
+            for precision in frames:
+                feat = compute_ofi_minute(indexed, dtype=precision)
+                day = feat.join(ret.astype(precision), how="inner")
+                day.index.name = "minute"
+                day = day.reset_index()
+                day.insert(0, "date", date)
+                day.insert(0, "symbol", symbol)
+                frames[precision].append(day)
+    return pd.concat(frames["float64"], ignore_index=True), pd.concat(frames["float32"], ignore_index=True)
+
+
+def feature_drift(p64: pd.DataFrame, p32: pd.DataFrame) -> Dict[str, float]:
+    """各特征列相对列尺度的最大绝对误差"""
+    out = {}
+    for col in FEATURE_COLS + ["ret"]:
+        a = p64[col].to_numpy(dtype=float)
+        b = p32[col].to_numpy(dtype=float)
+        scale = np.nanmax(np.abs(a))
+        out[col] = float(np.nanmax(np.abs(a - b)) / scale) if scale > 0 else 0.0
+    return out
+
+
+def pearson_ic(panel: pd.DataFrame, col: str) -> pd.Series:
+    """逐 (symbol, date) 的 Pearson IC（float64 累加）"""
+    def corr(g):
+        x = g[col].to_numpy(dtype=float)
+        y = g["ret"].to_numpy(dtype=float)
+        return np.corrcoef(x, y)[0, 1] if x.std() > 0 and y.std() > 0 else np.nan
+    return panel.groupby(["symbol", "date"]).apply(corr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="float32 精度模式漂移检验")
+    parser.add_argument("--n_symbols", type=int, default=4)
+    parser.add_argument("--n_days", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max_feature_drift", type=float, default=1e-6,
+                        help="特征列允许的最大相对误差（float32 机器精度约 6e-8）")
+    parser.add_argument("--max_ic_drift", type=float, default=1e-4, help="IC 允许的最大绝对差")
+    parser.add_argument("--fail_on_drift", action="store_true")
+    args = parser.parse_args()
+
+    symbols = synthetic_symbols(args.n_symbols)
+    dates = trading_dates(args.n_days)
+    p64, p32 = build_panels(symbols, dates, args.seed)
+    print(f"{len(symbols)} symbols x {len(dates)} days, {len(p64):,} minute rows")
+
+    failed = False
+    print(f"\n{'column':<16s} {'max rel drift':>14s}")
+    for col, d in feature_drift(p64, p32).items():
+        flag = "  FAIL" if d > args.max_feature_drift else ""
+        failed |= bool(flag)
+        print(f"{col:<16s} {d:>14.3e}{flag}")
+
+    print(f"\n{'IC':<16s} {'max |diff|':>14s} {'mean IC f64':>12s}")
+    for col in ["ofi1", "ofi"]:
+        keys = ["symbol", "date"]
+        r64 = grouped_rank_ic(p64, keys, signal_col=col, return_col="ret").set_index(keys)["ic"]
+        r32 = grouped_rank_ic(p32, keys, signal_col=col, return_col="ret").set_index(keys)["ic"]
+        c64, c32 = pearson_ic(p64, col), pearson_ic(p32, col)
+        for name, a, b in [(f"rank_ic[{col}]", r64, r32), (f"pearson_ic[{col}]", c64, c32)]:
+            d = float(np.nanmax(np.abs(a - b.reindex(a.index))))
+            flag = "  FAIL" if d > args.max_ic_drift else ""
+            failed |= bool(flag)
+            print(f"{name:<16s} {d:>14.3e} {a.mean():>12.4f}{flag}")
+
+    value_cols = FEATURE_COLS + ["ret"]
+    mem64 = p64[value_cols].memory_usage(index=False).sum() / 2 ** 20
+    mem32 = p32[value_cols].memory_usage(index=False).sum() / 2 ** 20
+    print(f"\npanel value columns: float64 {mem64:.2f} MB, float32 {mem32:.2f} MB ({mem32 / mem64:.0%})")
+
+    for name, panel in [("float64", p64), ("float32", p32)]:
+        t0 = time.perf_counter()
+        for _ in range(5):
+            grouped_rank_ic(panel, ["symbol", "date"], signal_col="ofi", return_col="ret")
+        print(f"grouped_rank_ic {name}: {(time.perf_counter() - t0) / 5 * 1000:.1f} ms")
+
+    if failed and args.fail_on_drift:
+        raise SystemExit("float32 drift exceeds tolerance")
+
+
+if __name__ == "__main__":
+    main()
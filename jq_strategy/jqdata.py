@@ -0,0 +1,202 @@
+"""
+聚宽数据/交易接口的本地替身（仅用于离线测试，不要上传到平台）
+
+策略文件中的 `from jqdata import *` 在本地会导入本模块：
+- get_ticks 从 processed tick（data/processed/ticks/{symbol}/{date}/part.parquet）读取，
+  也可以用 set_tick_source 注入内存中的 DataFrame
+- 支持单标的与标的列表两种请求；MULTI_SECURITY_TICKS=False 时列表请求抛出 TypeError，
+  用来模拟不支持多标的的接口并测试逐个请求的回退路径
+- 下单、记录、日志等平台函数只做记录
+- run_strategy 按 聚宽分钟回测的顺序（before_open -> every_bar -> after_close）驱动策略
+
+用法：
+    import sys; sys.path.insert(0, "jq_strategy")
+    import jqdata, strategy
+    jqdata.run_strategy(strategy, ["2021-01-04", "2021-01-05"])
+    jqdata.CALLS["get_ticks"], jqdata.RECORDS[-1]
+"""
+from __future__ import annotations
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+__all__ = [
+    "g", "log", "get_ticks", "record", "order_target_percent", "order_target_value",
+    "set_benchmark", "set_option", "set_order_cost", "OrderCost", "run_daily",
+]
+
+PROCESSED_TICKS_DIR = Path(__file__).resolve().parents[1] / "data" / "processed" / "ticks"
+
+# 是否模拟支持多标的 get_ticks
+MULTI_SECURITY_TICKS = True
+
+CALLS: Counter = Counter()
+RECORDS: list = []
+ORDERS: list = []
+SCHEDULE: dict = {"before_open": [], "every_bar": [], "after_close": []}
+
+g = SimpleNamespace()
+log = logging.getLogger("jqdata")
+
+_tick_source = None
+_day_cache: dict = {}
+
+
+def set_tick_source(source=None):
+    """
+    设置 tick 来源
+
+    Args:
+        source: None 表示读取 PROCESSED_TICKS_DIR；也可以是 {symbol: DataFrame}（含 time 或 ts 列）
+    """
+    global _tick_source
+    _tick_source = source
+    _day_cache.clear()
+
+
+def reset():
+    """清空调用计数、记录、订单与调度，并重置 g"""
+    CALLS.clear()
+    RECORDS.clear()
+    ORDERS.clear()
+    for v in SCHEDULE.values():
+        v.clear()
+    g.__dict__.clear()
+    _day_cache.clear()
+
+
+def _load_day(security: str, date: str) -> pd.DataFrame:
+    key = (security, date)
+    if key not in _day_cache:
+        if _tick_source is not None:
+            df = _tick_source.get(security, pd.DataFrame(columns=["time"]))
+        else:
+            path = PROCESSED_TICKS_DIR / security / date / "part.parquet"
+            df = pd.read_parquet(path) if path.exists() else pd.DataFrame(columns=["time"])
+        if "ts" in df.columns:
+            # processed 数据中 time 为原始数字时间，解析后的时间戳在 ts 列
+            df = df.drop(columns=["time"], errors="ignore").rename(columns={"ts": "time"})
+        df = df.copy()
+        df["time"] = pd.to_datetime(df["time"])
+        if _tick_source is not None:
+            df = df[df["time"].dt.strftime("%Y-%m-%d") == date]
+        df["code"] = security
+        _day_cache[key] = df.sort_values("time", kind="mergesort").reset_index(drop=True)
+    return _day_cache[key]
+
+
+def _ticks_one(security, start_dt, end_dt, count, fields):
+    end_dt = pd.Timestamp(end_dt)
+    day = _load_day(security, end_dt.strftime("%Y-%m-%d"))
+    if len(day) == 0 and fields:
+        # 与平台一致：无数据时返回带全部请求字段的空表
+        empty = pd.DataFrame({f: pd.Series(dtype=float) for f in fields})
+        if "time" in empty.columns:
+            empty["time"] = pd.Series(dtype="datetime64[ns]")
+        if "code" in empty.columns:
+            empty["code"] = pd.Series(dtype=object)
+        return empty
+    t = day["time"]
+    mask = t <= end_dt
+    if start_dt is not None:
+        mask &= t >= pd.Timestamp(start_dt)
+    out = day[mask]
+    if count is not None:
+        out = out.tail(count)
+    return out[fields].reset_index(drop=True) if fields else out.reset_index(drop=True)
+
+
+def get_ticks(security, end_dt, start_dt=None, count=None, fields=None, skip=True, df=False):
+    """
+    与 聚宽 get_ticks 同签名；security 可以是列表（需 MULTI_SECURITY_TICKS=True），
+    此时返回带 code 列的 DataFrame
+    """
+    CALLS["get_ticks"] += 1
+    if isinstance(security, (list, tuple)):
+        if not MULTI_SECURITY_TICKS:
+            raise TypeError("get_ticks() only accepts a single security")
+        fields = None if fields is None else (["code"] + [f for f in fields if f != "code"])
+        parts = [_ticks_one(s, start_dt, end_dt, count, fields) for s in security]
+        return pd.concat(parts, ignore_index=True)
+    fields = None if fields is None else [f for f in fields if f != "code"]
+    out = _ticks_one(security, start_dt, end_dt, count, fields)
+    return out if df else out.to_records(index=False)
+
+
+def record(**kwargs):
+    RECORDS.append(kwargs)
+
+
+def order_target_percent(security, percent):
+    ORDERS.append((security, "percent", percent))
+
+
+def order_target_value(security, value):
+    ORDERS.append((security, "value", value))
+
+
+def set_benchmark(security):
+    pass
+
+
+def set_option(key, value):
+    pass
+
+
+class OrderCost:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def set_order_cost(cost, type=None, ref=None):
+    pass
+
+
+def run_daily(func, time="every_bar", reference_security=None):
+    SCHEDULE[time].append(func)
+
+
+def _bar_times(date: str):
+    """分钟 bar 时间点：09:31~11:30，13:01~15:00"""
+    day = datetime.strptime(date, "%Y-%m-%d")
+    out = []
+    for start, n in [((9, 31), 120), ((13, 1), 120)]:
+        t0 = day.replace(hour=start[0], minute=start[1])
+        out += [t0 + timedelta(minutes=i) for i in range(n)]
+    return out
+
+
+def run_strategy(module, dates, total_value: float = 1_000_000.0):
+    """
+    在本地按交易日、分钟 bar 驱动策略
+
+    Args:
+        module: 已导入的策略模块（需定义 initialize）
+        dates: 交易日列表（YYYY-MM-DD）
+        total_value: 组合市值（常数，只用于日志/记录）
+
+    Returns:
+        RECORDS
+    """
+    reset()
+    portfolio = SimpleNamespace(total_value=total_value, positions={})
+    context = SimpleNamespace(current_dt=datetime.strptime(dates[0], "%Y-%m-%d"), portfolio=portfolio)
+    module.initialize(context)
+
+    for date in dates:
+        bars = _bar_times(date)
+        context.current_dt = bars[0].replace(hour=9, minute=0)
+        for f in SCHEDULE["before_open"]:
+            f(context)
+        for dt in bars:
+            context.current_dt = dt
+            for f in SCHEDULE["every_bar"]:
+                f(context)
+        context.current_dt = bars[-1].replace(hour=15, minute=30)
+        for f in SCHEDULE["after_close"]:
+            f(context)
+    return RECORDS
@@ -1,30 +1,60 @@
 from jqdata import *
 import numpy as np
+import pandas as pd
 from datetime import timedelta
 from collections import deque
 
-def calc_ofi(prev, curr, level):
-    ap, av = f'a{level}_p', f'a{level}_v'
-    bp, bv = f'b{level}_p', f'b{level}_v'
-    ofi = 0.0
+try:
+    from src.ofi.book import SnapshotStore
+    from src.ofi.stream import OfiAccumulator
+except ImportError:
+    # 聚宽：把 src/ofi/stream.py、src/ofi/book.py 上传到研究根目录（作为 stream.py、book.py）
+    from book import SnapshotStore
+    from stream import OfiAccumulator
 
-    # bid side
-    if curr[bp] > prev[bp]:
-        ofi += curr[bv]
-    elif curr[bp] == prev[bp]:
-        ofi += (curr[bv] - prev[bv])
+def ofi_from_ticks(df, levels=5, weight=None):
+    """
+    由一段 tick 快照计算 (ofi, rel_spread, last_current)，全部为数组运算
+    - ofi: 相邻快照的 L1~L{levels} OFI（按 weight 加权）之和；L1 价格非正或交叉的快照不计入，
+      但仍作为下一笔的基准
+    - rel_spread: 最后一条快照的相对点差 (a1-b1)/mid
+    - last_current: 最后一条快照的 current（最新价）
+    """
+    if weight is None:
+        weight = np.ones(levels, dtype=float)
     else:
-        ofi -= prev[bv]
+        weight = np.asarray(weight, dtype=float)
+        if len(weight) != levels:
+            raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
 
-    # ask side（注意方向：ask 下移 => 卖压增强 => 负）
-    if curr[ap] < prev[ap]:
-        ofi -= curr[av]
-    elif curr[ap] == prev[ap]:
-        ofi -= (curr[av] - prev[av])
-    else:
-        ofi += prev[av]
+    if df is None or len(df) < 2:
+        return np.nan, np.nan, np.nan
 
-    return ofi
+    if not df['time'].is_monotonic_increasing:
+        df = df.sort_values('time', kind='mergesort')
+
+    # 一次取出 (n, levels, 4) 的盘口数组：a_p, a_v, b_p, b_v
+    cols = [f'{side}{i}_{kind}' for i in range(1, levels + 1) for side in 'ab' for kind in 'pv']
+    book = df[cols].to_numpy(dtype=float).reshape(len(df), levels, 4)
+    ap, av, bp, bv = book[:, :, 0], book[:, :, 1], book[:, :, 2], book[:, :, 3]
+
+    a1, b1 = ap[-1, 0], bp[-1, 0]
+    mid = (a1 + b1) / 2.0 if (a1 > 0 and b1 > 0) else np.nan
+    rel_spread = (a1 - b1) / mid if (mid and mid > 0 and a1 > b1) else np.nan
+    last_current = float(df['current'].iat[-1])
+
+    # 相邻快照逐档比较：prev = [:-1], curr = [1:]
+    db = np.where(bp[1:] > bp[:-1], bv[1:],
+                  np.where(bp[1:] == bp[:-1], bv[1:] - bv[:-1], -bv[:-1]))
+    da = np.where(ap[1:] < ap[:-1], av[1:],
+                  np.where(ap[1:] == ap[:-1], av[1:] - av[:-1], -av[:-1]))
+
+    # 基本异常过滤：L1 价差必须为正
+    a1c, b1c = ap[1:, 0], bp[1:, 0]
+    ok = ~((a1c <= 0) | (b1c <= 0) | (a1c <= b1c))
+
+    res = float(((db - da)[ok] * weight).sum())
+    return res, rel_spread, last_current
 
 
 def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
@@ -33,14 +63,10 @@ def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
     - ofi: 最近 window_seconds 内 tick 累加的 L1~L5 OFI（按 weight 加权）
     - rel_spread: 最后一条快照的相对点差 (a1-b1)/mid
     - last_current: 最后一条快照的 current（最新价）
-    get_ticks 的字段包含 current 以及买五卖五。:contentReference[oaicite:0]{index=0}
+    计算见 ofi_from_ticks。
     """
-    if weight is None:
-        weight = np.ones(levels, dtype=float)
-    else:
-        weight = np.asarray(weight, dtype=float)
-        if len(weight) != levels:
-            raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
+    if weight is not None and len(weight) != levels:
+        raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
 
     start_dt = end_dt - timedelta(seconds=window_seconds)
 
@@ -49,39 +75,137 @@ def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
         fields += [f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v']
 
     df = get_ticks(security, start_dt=start_dt, end_dt=end_dt, fields=fields, df=True)
-    if df is None or len(df) < 2:
-        return np.nan, np.nan, np.nan
+    return ofi_from_ticks(df, levels=levels, weight=weight)
 
-    df = df.sort_values('time')
 
-    last = df.iloc[-1]
-    a1, b1 = float(last['a1_p']), float(last['b1_p'])
-    mid = (a1 + b1) / 2.0 if (a1 > 0 and b1 > 0) else np.nan
-    rel_spread = (a1 - b1) / mid if (mid and mid > 0 and a1 > b1) else np.nan
-    last_current = float(last['current'])
+def tick_fields(levels=5):
+    fields = ['time', 'current']
+    for i in range(1, levels + 1):
+        fields += [f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v']
+    return fields
 
-    prev_row = df.iloc[0]
-    prev = {c: float(prev_row[c]) for c in fields if c != 'time'}
 
-    res = 0.0
-    lvl_ofi = np.zeros(levels, dtype=float)
+def fetch_ticks(securities, start_dt, end_dt, fields, since=None):
+    """
+    取整个标的池的 tick：先尝试一次多标的请求，数据接口不支持时（g.batch_ticks=False）逐个请求
+    - 只有接口拒绝标的列表（TypeError / ValueError）才退回逐个请求，其余异常照常抛出
+    - since: {security: 已取到的最新时间}，只保留严格晚于该时间的新 tick；
+      逐个请求时以各自的 since 作为请求起点，多标的请求以全部标的中最早的 since 作为起点
+      （有标的缺 since 时为 start_dt），多取到的旧 tick 在本地按各自的 since 过滤
+    返回 {security: DataFrame}
+    """
+    since = since or {}
+    frames = {}
+
+    if g.batch_ticks:
+        batch_start = min(start_dt if since.get(s) is None else max(start_dt, since[s]) for s in securities)
+        try:
+            res = get_ticks(list(securities), start_dt=batch_start, end_dt=end_dt,
+                            fields=['code'] + fields, df=True)
+            if isinstance(res, dict):
+                frames = dict(res)
+            else:
+                frames = {s: df for s, df in res.groupby('code', sort=False)}
+        except (TypeError, ValueError) as e:
+            log.info(f"[Ticks] Multi-security get_ticks unavailable ({type(e).__name__}), fetching per security")
+            g.batch_ticks = False
+            frames = {}
+
+    if not g.batch_ticks:
+        for s in securities:
+            t0 = since.get(s)
+            frames[s] = get_ticks(s, start_dt=start_dt if t0 is None else max(start_dt, t0),
+                                  end_dt=end_dt, fields=fields, df=True)
+
+    out = {}
+    for s in securities:
+        df = frames.get(s)
+        if df is None or len(df) == 0:
+            continue
+        if since.get(s) is not None:
+            df = df[df['time'] > since[s]]
+        out[s] = df
+    return out
 
-    for k in range(1, len(df)):
-        row = df.iloc[k]
-        curr = {c: float(row[c]) for c in fields if c != 'time'}
 
-        # 基本异常过滤：L1 价差必须为正
-        if curr['a1_p'] <= 0 or curr['b1_p'] <= 0 or curr['a1_p'] <= curr['b1_p']:
-            prev = curr
-            continue
+def batch_ofi(windows, levels=5, weight=None):
+    """
+    一次向量化计算整个标的池的 OFI
+    - windows: {security: BookWindow}，每个标的 [dt - 窗口, dt] 内的快照（SnapshotRing.between 的视图）
+    返回 (ofi, rel_spread, last_current)，均为 {security: float}；
+    口径与对每个标的单独调用 get_ofi 完全相同：窗口内第一笔只作基准，不足 2 笔的标的为 NaN
+    """
+    weight = np.ones(levels, dtype=float) if weight is None else np.asarray(weight, dtype=float)
+    ofi = {s: np.nan for s in windows}
+    rel_spread = {s: np.nan for s in windows}
+    last_px = {s: np.nan for s in windows}
+
+    secs = [s for s, w in windows.items() if len(w) >= 2]
+    if not secs:
+        return ofi, rel_spread, last_px
+
+    # 所有标的拼成一个 (N, 4, levels) 数组（ask_p, ask_v, bid_p, bid_v），相邻两笔属于同一标的才计算 OFI
+    lens = [len(windows[s]) for s in secs]
+    big = np.concatenate([windows[s].book for s in secs])
+    gid = np.repeat(np.arange(len(secs)), lens)
+    ap, av, bp, bv = big[:, 0], big[:, 1], big[:, 2], big[:, 3]
+
+    db = np.where(bp[1:] > bp[:-1], bv[1:],
+                  np.where(bp[1:] == bp[:-1], bv[1:] - bv[:-1], -bv[:-1]))
+    da = np.where(ap[1:] < ap[:-1], av[1:],
+                  np.where(ap[1:] == ap[:-1], av[1:] - av[:-1], -av[:-1]))
+    row_ofi = ((db - da) * weight).sum(axis=1)
+
+    a1c, b1c = ap[1:, 0], bp[1:, 0]
+    ok = (gid[1:] == gid[:-1]) & ~((a1c <= 0) | (b1c <= 0) | (a1c <= b1c))
+    sums = np.bincount(gid[1:][ok], weights=row_ofi[ok], minlength=len(secs))
+
+    for k, s in enumerate(secs):
+        ofi[s] = float(sums[k])
+        rel_spread[s] = windows[s].last_rel_spread()
+        last_px[s] = float(windows[s].current[-1])
+    return ofi, rel_spread, last_px
+
+
+def update_minute_ofi(dt):
+    """
+    每分钟批量更新整个标的池的 1-min OFI 与相对点差
+    新 tick 追加到各标的的快照环形缓冲（g.books），只保留严格晚于缓冲中最新一笔的 tick，
+    同时按时间顺序送入各标的的流式 OFI 累加器（g.ofi_acc）；
+    1-min 窗口 [dt - g.minute_window_seconds, dt] 从缓冲中取视图，与 get_ofi 的窗口相同
+    """
+    start_dt = dt - timedelta(seconds=g.minute_window_seconds)
+    # 缓冲中最新一笔之前的 tick 都已取过；当日还没有 tick 的标的，上一次请求的终点之前也已取过
+    since = {}
+    for s in g.universe:
+        if s in g.books and len(g.books[s]):
+            since[s] = pd.Timestamp(int(g.books[s].latest().ts[0]))
+        elif g.last_tick_end is not None:
+            since[s] = g.last_tick_end
 
-        for level in range(1, levels + 1):
-            lvl_ofi[level - 1] = calc_ofi(prev, curr, level)
+    frames = fetch_ticks(g.universe, start_dt, dt, g.tick_fields, since=since)
+    g.last_tick_end = pd.Timestamp(dt)
+    for s, df in frames.items():
+        if not df['time'].is_monotonic_increasing:
+            df = df.sort_values('time', kind='mergesort')
+        g.books[s].extend_frame(df, time_col='time')
+        g.ofi_acc[s].update_frame(df, time_col='time')
 
-        res += float((lvl_ofi * weight).sum())
-        prev = curr  # ✅ 必须更新
+    windows = {s: g.books[s].between(start_dt, dt, include_start=True) for s in g.universe}
+    ofi, rel_spread, _ = batch_ofi(windows, g.levels, g.weight)
+    return ofi, rel_spread
 
-    return res, rel_spread, last_current
+
+def new_ofi_acc():
+    """
+    单标的流式 OFI 累加器：每分钟新取到的快照逐批送入，ofi(balance_interval) 即最近
+    balance_interval 根分钟 bar 内全部相邻快照的加权 OFI 之和
+    - closed='right'：分钟桶 (dt-1min, dt] 与 bar 对齐
+    - session_clock：午休不占分钟，窗口按 bar 数滑动，午后第一批 bar 不会因午休缺观测
+    - skip_crossed：与 get_ofi 相同，L1 非正/交叉的快照不计入但仍作为下一笔的基准
+    """
+    return OfiAccumulator(g.levels, weight=g.weight, windows=(g.balance_interval,),
+                          skip_crossed=True, closed='right', session_clock=True)
 
 
 def initialize(context):
@@ -116,6 +240,15 @@ def initialize(context):
     # 每分钟先算 1-min OFI（严格分钟对齐），再把最近3个分钟OFI求和作为信号
     g.minute_window_seconds = 60
 
+    # 批量取 tick：先尝试多标的请求，不支持时自动退回逐个请求
+    g.batch_ticks = True
+    g.tick_fields = tick_fields(g.levels)
+    # 每个标的最近的盘口快照（固定内存的环形缓冲），每分钟只追加新 tick
+    g.snapshot_capacity = 512
+    g.books = SnapshotStore(g.snapshot_capacity, g.levels)
+    # 当日上一次 tick 请求的终点
+    g.last_tick_end = None
+
     # 状态
     g.bar_count = 0
     g.prev_target = {s: 0.0 for s in g.universe}
@@ -123,9 +256,9 @@ def initialize(context):
     g.trades = 0
     g.cost_est = 0.0
 
-    # 最近3个 1-min OFI / spread 缓存
-    g.ofi_1m_hist = {s: deque(maxlen=g.balance_interval) for s in g.universe}
-    g.spr_1m_hist = {s: deque(maxlen=g.balance_interval) for s in g.universe}
+    # 流式 OFI 累加器与最近3个 1-min spread 缓存（每日开盘前重建）
+    g.ofi_acc = {}
+    g.spr_1m_hist = {}
     
     # 日志计数器：避免日志过多
     g.log_counter = 0
@@ -145,9 +278,11 @@ def initialize(context):
 def before_market_open(context):
     log.info(f"[Before Open] {context.current_dt.date()} - Resetting daily state")
     g.bar_count = 0
-    g.ofi_1m_hist = {s: deque(maxlen=g.balance_interval) for s in g.universe}
+    g.ofi_acc = {s: new_ofi_acc() for s in g.universe}
     g.spr_1m_hist = {s: deque(maxlen=g.balance_interval) for s in g.universe}
     g.log_counter = 0
+    g.books.clear()
+    g.last_tick_end = None
 
 
 def market_open(context):
@@ -160,21 +295,14 @@ def market_open(context):
         log.info(f"[Bar {g.bar_count}] {dt} - Processing...")
 
     # 1) 每分钟更新 1-min OFI（用于对账 & 形成 3-min 信号）
-    ofi_results = {}
+    ofi_results, spread_results = update_minute_ofi(dt)
     for s in g.universe:
-        ofi_1m, rel_spread, last_px = get_ofi(
-            s, dt,
-            window_seconds=g.minute_window_seconds,
-            levels=g.levels,
-            weight=g.weight
-        )
-        g.ofi_1m_hist[s].append(ofi_1m)
-        g.spr_1m_hist[s].append(rel_spread)
-        ofi_results[s] = ofi_1m
+        g.ofi_acc[s].advance_to(dt)
+        g.spr_1m_hist[s].append(spread_results[s])
 
     # 可选：对账用（如果你把 510050 加进 universe）
     # if '510050.XSHG' in g.universe:
-    #     ofi_dbg = g.ofi_1m_hist['510050.XSHG'][-1]
+    #     ofi_dbg = ofi_results['510050.XSHG']
     
     # 到了再平衡节点
     log.info(f"[Rebalance] Bar {g.bar_count} at {dt} - Starting rebalance")
@@ -186,13 +314,18 @@ def market_open(context):
                turnover=g.turnover, trades=g.trades, cost_est=g.cost_est)
         return
 
-    # 3) 形成 3-min OFI 信号（严格分钟对齐：最近3个1-min求和）
+    # 3) 形成 3-min OFI 信号（严格分钟对齐：最近3根 bar 内的 OFI 之和）
+    # 窗口内每根 bar 都要有 OFI 观测（至少一对相邻快照），否则跳过该标的
     ofi_map = {}
     spread_map = {}
 
-    for s inlog.debug(f"[Rebalance] {s} skip: hist_len={len(hist)}, has_nan={any(np.isnan(x) for x in hist) if hist else 'empty'}")
+    for s in g.universe:
+        acc = g.ofi_acc[s]
+        n_valid = acc.active_minutes(g.balance_interval)
+        if n_valid < g.balance_interval:
+            log.debug(f"[Rebalance] {s} skip: valid_bars={n_valid}/{g.balance_interval}")
             continue
-        ofi_map[s] = float(np.sum(hist))
+        ofi_map[s] = acc.ofi(g.balance_interval)
 
         spr_hist = [x for x in g.spr_1m_hist[s] if not np.isnan(x)]
         spread_map[s] = float(np.mean(spr_hist)) if len(spr_hist) else np.nan
@@ -201,15 +334,12 @@ def market_open(context):
         log.warning(f"[Rebalance] Not enough signals: got {len(ofi_map)}, need {g.k_long}")
         return
     
-    log.info(f"[Rebalance] OFI signals: {', '.join([f'{s}:{v:.0f}' for s, v in sorted(ofi_map.items(), key=lambda x: x[1], reverse=True)])}")_map[s] = float(np.mean(spr_hist)) if len(spr_hist) else np.nan
-
-    if len(ofi_map) < g.k_long:
-        return
-    log.info(f"[Rebalance] Selected longs: {longs}")
+    log.info(f"[Rebalance] OFI signals: {', '.join([f'{s}:{v:.0f}' for s, v in sorted(ofi_map.items(), key=lambda x: x[1], reverse=True)])}")
 
     # 4) 截面排序 long top2（long-only）
     ranked = sorted(ofi_map.items(), key=lambda kv: kv[1], reverse=True)
     longs = [x[0] for x in ranked[:g.k_long]]
+    log.info(f"[Rebalance] Selected longs: {longs}")
 
     target = {s: 0.0 for s in g.universe}
     w_long = 0.98 / g.k_long
@@ -233,16 +363,15 @@ def market_open(context):
         if abs(new_w - old_w) > 1e-8:
             g.turnover += abs(new_w - old_w)
             g.trades += 1
-            capital = cash * new_w
-            order_target_value(s, new_w)
+            order_target_percent(s, new_w)
             g.prev_target[s] = new_w
 
     record(pv=context.portfolio.total_value,
            turnover=g.turnover, trades=g.trades, cost_est=g.cost_est)
 
 
-def positions = [f"{p.security}:{p.value/context.portfolio.total_value:.2%}" for p in context.portfolio.positions.values() if p.total_amount > 0]
+def after_market_close(context):
+    positions = [f"{p.security}:{p.value/context.portfolio.total_value:.2%}" for p in context.portfolio.positions.values() if p.total_amount > 0]
     log.info(f"[Day End] {context.current_dt.date()} - PV={context.portfolio.total_value:.2f}, Bars={g.bar_count}, Turnover={g.turnover:.4f}, Trades={g.trades}, Cost={g.cost_est:.6f}")
     if positions:
-        log.info(f"[Day End] Positions: {', '.join(positions)
-    log.info(f"Day end: pv={context.portfolio.total_value:.2f}, turnover={g.turnover:.4f}, trades={g.trades}, cost_est={g.cost_est:.6f}")
+        log.info(f"[Day End] Positions: {', '.join(positions)}")
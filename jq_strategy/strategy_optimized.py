@@ -7,34 +7,11 @@ import numpy as np
 from datetime import timedelta
 from collections import deque
 
-def calc_ofi(prev, curr, level):
-    ap, av = f'a{level}_p', f'a{level}_v'
-    bp, bv = f'b{level}_p', f'b{level}_v'
-    ofi = 0.0
-
-    # bid side
-    if curr[bp] > prev[bp]:
-        ofi += curr[bv]
-    elif curr[bp] == prev[bp]:
-        ofi += (curr[bv] - prev[bv])
-    else:
-        ofi -= prev[bv]
-
-    # ask side（注意方向：ask 下移 => 卖压增强 => 负）
-    if curr[ap] < prev[ap]:
-        ofi -= curr[av]
-    elif curr[ap] == prev[ap]:
-        ofi -= (curr[av] - prev[av])
-    else:
-        ofi += prev[av]
-
-    return ofi
-
-
-def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
+def ofi_from_ticks(df, levels=5, weight=None):
     """
-    返回：(ofi, rel_spread, last_current)
-    - ofi: 最近 window_seconds 内 tick 累加的 L1~L5 OFI（按 weight 加权）
+    由一段 tick 快照计算 (ofi, rel_spread, last_current)，全部为数组运算
+    - ofi: 相邻快照的 L1~L{levels} OFI（按 weight 加权）之和；L1 价格非正或交叉的快照不计入，
+      但仍作为下一笔的基准
     - rel_spread: 最后一条快照的相对点差 (a1-b1)/mid
     - last_current: 最后一条快照的 current（最新价）
     """
@@ -45,46 +22,55 @@ def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
         if len(weight) != levels:
             raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
 
-    start_dt = end_dt - timedelta(seconds=window_seconds)
-
-    fields = ['time', 'current']
-    for i in range(1, levels + 1):
-        fields += [f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v']
-
-    df = get_ticks(security, start_dt=start_dt, end_dt=end_dt, fields=fields, df=True)
     if df is None or len(df) < 2:
         return np.nan, np.nan, np.nan
 
-    df = df.sort_values('time')
+    if not df['time'].is_monotonic_increasing:
+        df = df.sort_values('time', kind='mergesort')
 
-    last = df.iloc[-1]
-    a1, b1 = float(last['a1_p']), float(last['b1_p'])
+    # 一次取出 (n, levels, 4) 的盘口数组：a_p, a_v, b_p, b_v
+    cols = [f'{side}{i}_{kind}' for i in range(1, levels + 1) for side in 'ab' for kind in 'pv']
+    book = df[cols].to_numpy(dtype=float).reshape(len(df), levels, 4)
+    ap, av, bp, bv = book[:, :, 0], book[:, :, 1], book[:, :, 2], book[:, :, 3]
+
+    a1, b1 = ap[-1, 0], bp[-1, 0]
     mid = (a1 + b1) / 2.0 if (a1 > 0 and b1 > 0) else np.nan
     rel_spread = (a1 - b1) / mid if (mid and mid > 0 and a1 > b1) else np.nan
-    last_current = float(last['current'])
+    last_current = float(df['current'].iat[-1])
+
+    # 相邻快照逐档比较：prev = [:-1], curr = [1:]
+    db = np.where(bp[1:] > bp[:-1], bv[1:],
+                  np.where(bp[1:] == bp[:-1], bv[1:] - bv[:-1], -bv[:-1]))
+    da = np.where(ap[1:] < ap[:-1], av[1:],
+                  np.where(ap[1:] == ap[:-1], av[1:] - av[:-1], -av[:-1]))
 
-    prev_row = df.iloc[0]
-    prev = {c: float(prev_row[c]) for c in fields if c != 'time'}
+    # 基本异常过滤：L1 价差必须为正
+    a1c, b1c = ap[1:, 0], bp[1:, 0]
+    ok = ~((a1c <= 0) | (b1c <= 0) | (a1c <= b1c))
 
-    res = 0.0
-    lvl_ofi = np.zeros(levels, dtype=float)
+    res = float(((db - da)[ok] * weight).sum())
+    return res, rel_spread, last_current
 
-    for k in range(1, len(df)):
-        row = df.iloc[k]
-        curr = {c: float(row[c]) for c in fields if c != 'time'}
 
-        # 基本异常过滤：L1 价差必须为正
-        if curr['a1_p'] <= 0 or curr['b1_p'] <= 0 or curr['a1_p'] <= curr['b1_p']:
-            prev = curr
-            continue
+def get_ofi(security, end_dt, window_seconds=60, levels=5, weight=None):
+    """
+    返回：(ofi, rel_spread, last_current)
+    - ofi: 最近 window_seconds 内 tick 累加的 L1~L5 OFI（按 weight 加权）
+    - rel_spread: 最后一条快照的相对点差 (a1-b1)/mid
+    - last_current: 最后一条快照的 current（最新价）
+    计算见 ofi_from_ticks。
+    """
+    if weight is not None and len(weight) != levels:
+        raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
 
-        for level in range(1, levels + 1):
-            lvl_ofi[level - 1] = calc_ofi(prev, curr, level)
+    start_dt = end_dt - timedelta(seconds=window_seconds)
 
-        res += float((lvl_ofi * weight).sum())
-        prev = curr
+    fields = ['time', 'current']
+    for i in range(1, levels + 1):
+        fields += [f'a{i}_p', f'a{i}_v', f'b{i}_p', f'b{i}_v']
 
-    return res, rel_spread, last_current
+    df = get_ticks(security, start_dt=start_dt, end_dt=end_dt, fields=fields, df=True)
+    return ofi_from_ticks(df, levels=levels, weight=weight)
 
 
 def initialize(context):
@@ -7,6 +7,7 @@ from pathlib import Path
 import pandas as pd
 
 from src.pipeline_io import load_config, load_universe, iter_daily_files
+from src.ofi.profiling import StageProfiler
 
 
 def compute_minute_returns(df: pd.DataFrame) -> pd.Series:
@@ -76,6 +77,7 @@ def main():
     total_done = 0
     total_skip = 0
     total_fail = 0
+    prof = StageProfiler()
     
     for sym in universe:
         for sym, date, path, src in iter_daily_files(
@@ -91,18 +93,21 @@ def main():
             
             try:
                 # 加载数据
-                df = load_daily(path, src)
+                with prof.stage("load", sym):
+                    df = load_daily(path, src)
                 
                 # 检查必需列
                 if 'a1_p' not in df.columns or 'b1_p' not in df.columns:
                     raise ValueError(f"Missing a1_p or b1_p columns")
                 
                 # 计算分钟收益率
-                ret = compute_minute_returns(df)
+                with prof.stage("compute_returns", sym):
+                    ret = compute_minute_returns(df)
                 
                 # 保存为DataFrame（方便后续处理）
-                ret_df = ret.to_frame(name='ret')
-                ret_df.to_parquet(op)
+                with prof.stage("write", sym):
+                    ret_df = ret.to_frame(name='ret')
+                    ret_df.to_parquet(op)
                 
                 total_done += 1
                 
@@ -115,6 +120,11 @@ def main():
     
     print(f"\nFinished. done={total_done} skip={total_skip} fail={total_fail}")
     print(f"Labels saved to: {output_dir}")
+    
+    profile_file = output_dir.parent / "labels_build_profile.json"
+    prof.write(profile_file)
+    print(prof.summary())
+    print(f"Profile saved to: {profile_file}")
 
 
 if __name__ == "__main__":
@@ -1,14 +1,32 @@
 """
 重新生成 OFI 分钟特征数据
 使用修复后的 ofi.py 函数批量处理所有标的的所有交易日
+
+feature.ofi.engine 为 duckdb 时，processed 数据按 标的×年 用一条 SQL 计算
+（见 src/ofi/features_sql.py），输出与 pandas 逐日计算相同；raw 数据仍逐日计算。
+
+feature.ofi 中的 weights / normalize / integrated 变体与分档 OFI 在同一次 tick 遍历中计算
+（只支持 pandas 引擎）。integrated 时每个标的的分钟特征先留在内存，全部算完后用其
+ofi{i}_norm 拟合一次 PCA 载荷，ofi_int 由分钟级归一化分档 OFI 线性组合得到（与逐 tick
+加权后求和相同），载荷写入各文件的 attrs 与 output_dir 旁的 ofi_int_loadings.json。
+overwrite: false 的增量运行中，已有输出的标的沿用 ofi_int_loadings.json 中的载荷（不重新拟合，
+保证同一标的各日的 ofi_int 口径一致）；载荷缺失或档位数不符时报错，需以 overwrite: true 重算。
 """
 from __future__ import annotations
+from collections import defaultdict
+import json
 from pathlib import Path
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
 
 from src.pipeline_io import load_config, load_universe, iter_daily_files
-from src.ofi import compute_ofi_per_tick, ensure_datetime_index, aggregate_to_minute
+from src.ofi.features_ofi import (
+    compute_ofi_per_tick, ensure_datetime_index, aggregate_to_minute, resolve_dtype, fit_integrated_loadings
+)
+from src.ofi.features_sql import compute_ofi_minute_duckdb
+from src.ofi.prefetch import prefetch
+from src.ofi.profiling import StageProfiler
 
 
 def load_daily(path: Path, source: str) -> pd.DataFrame:
@@ -35,27 +53,105 @@ def out_path(base: Path, symbol: str, date: str) -> Path:
     return d / f"{date}.parquet"
 
 
-def process_one_day(df: pd.DataFrame, levels: int, bar: str, agg: str) -> pd.DataFrame:
-    """处理单日数据，返回分钟级OFI"""
+def process_one_day(df: pd.DataFrame, levels: int, bar: str, agg: str, precision: str = "float64",
+                    weights=None, normalize: bool = False) -> pd.DataFrame:
+    """处理单日数据，返回分钟级OFI（及加权/归一化变体）"""
     # 确保有datetime索引
     df_idx = ensure_datetime_index(df)
     
-    # 计算tick级OFI
-    ofi_tick = compute_ofi_per_tick(df_idx, levels=levels)
+    # 计算tick级OFI（tick 级保持 float64，只有分钟输出按 precision 存储）
+    ofi_tick = compute_ofi_per_tick(df_idx, levels=levels, weights=weights, normalize=normalize)
     
     # 聚合到分钟
-    ofi_min = aggregate_to_minute(ofi_tick, bar=bar, agg=agg)
+    ofi_min = aggregate_to_minute(ofi_tick, bar=bar, agg=agg, dtype=precision)
     
     return ofi_min
 
 
+def add_integrated_ofi(frames: list, levels: int, keep_norm: bool, loadings=None):
+    """
+    用一个标的全部分钟的归一化分档 OFI 拟合 PCA 载荷，为各日添加 ofi_int
+
+    Args:
+        frames: 同一标的各日的分钟特征（含 ofi{i}_norm），原地修改
+        levels: 档位数
+        keep_norm: 是否保留归一化列（feature.ofi.normalize）
+        loadings: 已有载荷（增量运行），给出时不重新拟合
+
+    Returns:
+        载荷，shape (levels,)
+    """
+    norm_cols = [f"ofi{i}_norm" for i in range(1, levels + 1)]
+    if loadings is None:
+        loadings = fit_integrated_loadings(pd.concat([f[norm_cols] for f in frames]))
+    loadings = np.asarray(loadings, dtype=float)
+    for f in frames:
+        f["ofi_int"] = (f[norm_cols].to_numpy(dtype=float) @ loadings).astype(f["ofi"].dtype)
+        if not keep_norm:
+            f.drop(columns=norm_cols + ["ofi_norm"], inplace=True)
+        f.attrs["ofi_int_loadings"] = [float(w) for w in loadings]
+    return loadings
+
+
+def loadings_file(output_dir) -> Path:
+    """integrated 载荷文件：output_dir 旁的 ofi_int_loadings.json"""
+    return Path(output_dir).parent / "ofi_int_loadings.json"
+
+
+def read_loadings(path: Path) -> dict:
+    """读取已保存的载荷 {标的: [w1..w{levels}]}，文件不存在时返回空字典"""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def resolve_loadings(symbols, existing: set, stored: dict, levels: int) -> dict:
+    """
+    增量运行时各标的使用的载荷
+
+    Args:
+        symbols: 本次需要计算的标的
+        existing: 已有输出（本次跳过）的标的
+        stored: read_loadings 读出的载荷
+        levels: 档位数
+
+    Returns:
+        {标的: 载荷}，只含需要沿用已有载荷的标的；其余标的在本次全部分钟上拟合
+
+    Raises:
+        ValueError: 已有输出的标的没有保存载荷或档位数不符
+    """
+    out, missing = {}, []
+    for sym in symbols:
+        if sym not in existing:
+            continue
+        w = stored.get(sym)
+        if w is None or len(w) != levels:
+            missing.append(sym)
+        else:
+            out[sym] = w
+    if missing:
+        raise ValueError(
+            f"integrated OFI: no stored loadings (levels={levels}) for {missing}, which already have "
+            f"output files; rerun with feature.ofi.overwrite: true to refit all days"
+        )
+    return out
+
+
 def main():
     # 加载配置
     cfg = load_config("configs/data.yaml")
     universe = load_universe(cfg.data.universe_file)
     
     print(f"Universe: {universe}, total={len(universe)}")
-    print(f"OFI Config: levels={cfg.ofi.levels}, bar={cfg.ofi.bar}, agg={cfg.ofi.agg}")
+    print(f"OFI Config: levels={cfg.ofi.levels}, bar={cfg.ofi.bar}, agg={cfg.ofi.agg}, "
+          f"engine={cfg.ofi.engine}, precision={cfg.ofi.precision}")
+    variants = bool(cfg.ofi.weights) or cfg.ofi.normalize or cfg.ofi.integrated
+    if variants:
+        print(f"OFI variants: weights={cfg.ofi.weights}, normalize={cfg.ofi.normalize}, "
+              f"integrated={cfg.ofi.integrated}")
+    dtype = resolve_dtype(cfg.ofi.precision)
     print(f"Output dir: {cfg.ofi.output_dir}")
     print(f"Overwrite: {cfg.ofi.overwrite}")
     print()
@@ -66,6 +162,7 @@ def main():
     
     # 收集所有需要处理的文件
     all_tasks = []
+    existing = set()
     for sym in universe:
         for sym, date, path, src in iter_daily_files(
             cfg.data.processed_dir, cfg.data.raw_dir, sym, 
@@ -76,17 +173,87 @@ def main():
             # 如果不覆盖且文件已存在，跳过
             if not cfg.ofi.overwrite and op.exists():
                 total_skip += 1
+                existing.add(sym)
                 continue
             
             all_tasks.append((sym, date, path, src, op))
     
     print(f"Total tasks: {len(all_tasks)} (skipped: {total_skip})")
     
-    # 处理所有任务
-    for sym, date, path, src, op in tqdm(all_tasks, desc="Processing"):
+    # 处理所有任务（按 阶段×标的 记录耗时、读取字节与峰值内存）
+    prof = StageProfiler()
+    
+    if cfg.ofi.engine == "duckdb" and variants:
+        print("OFI variants are computed by the pandas kernel; ignoring engine=duckdb")
+    elif cfg.ofi.engine == "duckdb":
+        # processed 数据按 (标的, 年) 分组，每组一条查询
+        groups = defaultdict(list)
+        for task in all_tasks:
+            if task[3] == "processed":
+                groups[(task[0], task[1][:4])].append(task)
+        all_tasks = [t for t in all_tasks if t[3] != "processed"]
+        
+        for (sym, year), tasks in tqdm(groups.items(), desc="DuckDB"):
+            try:
+                with prof.stage("compute_ofi_sql", sym):
+                    bars = compute_ofi_minute_duckdb(
+                        [(date, path) for _, date, path, _, _ in tasks],
+                        levels=cfg.ofi.levels,
+                        bar=cfg.ofi.bar,
+                        agg=cfg.ofi.agg
+                    )
+            except Exception as e:
+                # 整组失败时退回逐日计算
+                print(f"\n[FAIL] {sym} {year} engine=duckdb: {type(e).__name__}: {str(e)[:100]}")
+                all_tasks += tasks
+                continue
+            
+            for _, date, _, _, op in tasks:
+                if date not in bars:
+                    total_fail += 1
+                    print(f"\n[FAIL] {sym} {date} engine=duckdb: no ticks")
+                    continue
+                with prof.stage("write", sym):
+                    bars[date].astype(dtype).to_parquet(op)
+                total_done += 1
+    elif cfg.ofi.engine != "pandas":
+        raise ValueError(f"Unknown feature.ofi.engine={cfg.ofi.engine}, expected pandas or duckdb")
+    
+    # integrated：同一标的的分钟特征先缓存，标的结束时拟合载荷后统一写出；
+    # 已有输出的标的沿用保存的载荷（缺失时在计算前报错）
+    pending = []
+    all_loadings = {}
+    reuse = {}
+    if cfg.ofi.integrated:
+        all_loadings = read_loadings(loadings_file(cfg.ofi.output_dir))
+        reuse = resolve_loadings({t[0] for t in all_tasks}, existing, all_loadings, cfg.ofi.levels)
+    
+    def flush():
+        nonlocal total_done, total_fail
+        if not pending:
+            return
+        sym = pending[0][0]
+        try:
+            with prof.stage("fit_pca", sym):
+                all_loadings[sym] = add_integrated_ofi([f for _, _, f in pending], cfg.ofi.levels,
+                                                       cfg.ofi.normalize, reuse.get(sym)).tolist()
+        except Exception as e:
+            total_fail += len(pending)
+            print(f"\n[FAIL] {sym} integrated OFI: {type(e).__name__}: {str(e)[:100]}")
+        else:
+            for _, op, f in pending:
+                with prof.stage("write", sym):
+                    f.to_parquet(op)
+                total_done += 1
+        pending.clear()
+    
+    # 后台线程预取后续几天的文件，读盘/解压与计算重叠；load 阶段记录的是实际等待时间
+    days = prefetch(all_tasks, lambda task: load_daily(task[2], task[3]), depth=4)
+    for (sym, date, path, src, op), get in tqdm(days, total=len(all_tasks), desc="Processing"):
         try:
             # 加载数据
-            df = load_daily(path, src)
+            with prof.stage("load", sym):
+                df = get()
             
             # 检查必需列
             required_cols = ['a1_p', 'a1_v', 'b1_p', 'b1_v']
@@ -95,27 +262,50 @@ def main():
                 raise ValueError(f"Missing columns: {missing}")
             
             # 处理并生成OFI
-            ofi_min = process_one_day(
-                df, 
-                levels=cfg.ofi.levels, 
-                bar=cfg.ofi.bar, 
-                agg=cfg.ofi.agg
-            )
+            with prof.stage("compute_ofi", sym):
+                ofi_min = process_one_day(
+                    df, 
+                    levels=cfg.ofi.levels, 
+                    bar=cfg.ofi.bar, 
+                    agg=cfg.ofi.agg,
+                    precision=cfg.ofi.precision,
+                    weights=cfg.ofi.weights,
+                    normalize=cfg.ofi.normalize or cfg.ofi.integrated
+                )
+            
+            if cfg.ofi.integrated:
+                if pending and pending[0][0] != sym:
+                    flush()
+                pending.append((sym, op, ofi_min))
+                continue
             
             # 保存
-            ofi_min.to_parquet(op)
+            with prof.stage("write", sym):
+                ofi_min.to_parquet(op)
             total_done += 1
             
         except Exception as e:
             total_fail += 1
             print(f"\n[FAIL] {sym} {date} src={src}: {type(e).__name__}: {str(e)[:100]}")
+    flush()
     
     print(f"\n{'='*60}")
     print(f"Finished!")
     print(f"  Done: {total_done}")
     print(f"  Skip: {total_skip}")
     print(f"  Fail: {total_fail}")
+    print(f"  {days.stats}")
     print(f"{'='*60}")
+    
+    if all_loadings:
+        path = loadings_file(cfg.ofi.output_dir)
+        path.write_text(json.dumps(all_loadings, indent=2), encoding="utf-8")
+        print(f"PCA loadings saved to: {path}")
+    
+    profile_file = Path(cfg.ofi.output_dir).parent / "ofi_build_profile.json"
+    prof.write(profile_file)
+    print(prof.summary())
+    print(f"Profile saved to: {profile_file}")
 
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@
 - 分钟覆盖率
 - Book异常率
 - OFI分布稳定性
+
+指标计算由 src.ofi.qc 引擎完成（列投影读取 + 多进程并行）
 """
 from __future__ import annotations
 from pathlib import Path
@@ -10,116 +12,9 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from typing import List, Dict
 
 from src.pipeline_io import load_config, load_universe, iter_daily_files
-
-
-def load_daily(path: Path, source: str) -> pd.DataFrame:
-    """加载单日数据"""
-    if source == "processed":
-        return pd.read_parquet(path)
-    if source == "raw":
-        try:
-            return pd.read_csv(path, compression="gzip")
-        except pd.errors.ParserError:
-            return pd.read_csv(
-                path, 
-                compression="gzip",
-                on_bad_lines='skip',
-                engine='python'
-            )
-    raise ValueError(f"unknown source={source}")
-
-
-def check_minute_coverage(df: pd.DataFrame) -> Dict:
-    """检查分钟覆盖率"""
-    if 'ts' not in df.columns:
-        return {'n_minutes': 0, 'expected': 240, 'coverage': 0.0}
-    
-    df['ts'] = pd.to_datetime(df['ts'])
-    df['minute'] = df['ts'].dt.floor('min') # type: ignore
-    n_minutes = df['minute'].nunique()
-    expected = 240  # A股连续竞价约240分钟
-    coverage = n_minutes / expected
-    
-    return {
-        'n_minutes': n_minutes,
-        'expected': expected,
-        'coverage': coverage
-    }
-
-
-def check_book_anomalies(df: pd.DataFrame) -> Dict:
-    """检查订单簿异常"""
-    total = len(df)
-    if total == 0:
-        return {
-            'spread_negative': 0.0,
-            'mid_negative': 0.0,
-            'bid_ge_ask': 0.0,
-            'total_rows': 0
-        }
-    
-    anomalies = {}
-    
-    # 检查spread <= 0
-    if 'a1_p' in df.columns and 'b1_p' in df.columns:
-        spread = df['a1_p'] - df['b1_p']
-        anomalies['spread_negative'] = (spread <= 0).sum() / total
-        
-        # 检查mid <= 0
-        mid = (df['a1_p'] + df['b1_p']) / 2
-        anomalies['mid_negative'] = (mid <= 0).sum() / total
-        
-        # 检查bid >= ask
-        anomalies['bid_ge_ask'] = (df['b1_p'] >= df['a1_p']).sum() / total
-    else:
-        anomalies['spread_negative'] = np.nan
-        anomalies['mid_negative'] = np.nan
-        anomalies['bid_ge_ask'] = np.nan
-    
-    anomalies['total_rows'] = total
-    
-    return anomalies
-
-
-def load_ofi_data(ofi_dir: Path, symbol: str, date: str) -> pd.DataFrame:
-    """加载OFI数据"""
-    ofi_path = ofi_dir / symbol / f"{date}.parquet"
-    if not ofi_path.exists():
-        return None
-    
-    try:
-        return pd.read_parquet(ofi_path)
-    except Exception:
-        return None
-
-
-def check_ofi_distribution(ofi_df: pd.DataFrame) -> Dict:
-    """检查OFI分布统计"""
-    if ofi_df is None or 'ofi' not in ofi_df.columns:
-        return {
-            'mean': np.nan,
-            'std': np.nan,
-            'q25': np.nan,
-            'q50': np.nan,
-            'q75': np.nan,
-            'min': np.nan,
-            'max': np.nan
-        }
-    
-    ofi = ofi_df['ofi'].dropna()
-    
-    return {
-        'mean': ofi.mean(),
-        'std': ofi.std(),
-        'q25': ofi.quantile(0.25),
-        'q50': ofi.quantile(0.50),
-        'q75': ofi.quantile(0.75),
-        'min': ofi.min(),
-        'max': ofi.max()
-    }
+from src.ofi.qc import run_qc
 
 
 def main():
@@ -132,78 +27,47 @@ def main():
     output_dir = Path("outputs/data_quality")
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # 收集所有统计信息
-    results = []
-    ofi_stats_by_symbol = {sym: [] for sym in universe}
-    
-    total_files = 0
-    processed = 0
-    
+    # 收集任务：每个 (symbol, date) 一条，tick 与 OFI 均按列投影读取
+    tasks = []
     for sym in universe:
-        print(f"\nProcessing {sym}...")
-        sym_count = 0
-        
         for sym, date, path, src in iter_daily_files(
             cfg.data.processed_dir, cfg.data.raw_dir, sym, 
             cfg.data.start, cfg.data.end
         ):
-            total_files += 1
-            
-            try:
-                # 加载tick数据
-                df = load_daily(path, src)
-                
-                # 检查分钟覆盖率
-                coverage = check_minute_coverage(df)
-                
-                # 检查book异常
-                anomalies = check_book_anomalies(df)
-                
-                # 加载OFI数据
-                ofi_df = load_ofi_data(cfg.ofi.output_dir, sym, date)
-                ofi_dist = check_ofi_distribution(ofi_df)
-                
-                # 记录结果
-                result = {
-                    'symbol': sym,
-                    'date': date,
-                    'source': src,
-                    **coverage,
-                    **anomalies,
-                    'ofi_mean': ofi_dist['mean'],
-                    'ofi_std': ofi_dist['std'],
-                    'ofi_q25': ofi_dist['q25'],
-                    'ofi_q50': ofi_dist['q50'],
-                    'ofi_q75': ofi_dist['q75'],
-                    'ofi_min': ofi_dist['min'],
-                    'ofi_max': ofi_dist['max']
-                }
-                results.append(result)
-                
-                # 收集OFI统计用于可视化
-                if not np.isnan(ofi_dist['mean']):
-                    ofi_stats_by_symbol[sym].append({
-                        'date': pd.to_datetime(date),
-                        'mean': ofi_dist['mean'],
-                        'std': ofi_dist['std']
-                    })
-                
-                processed += 1
-                sym_count += 1
-                
-                if processed % 100 == 0:
-                    print(f"  Processed {processed}/{total_files} files...")
-                    
-            except Exception as e:
-                print(f"  [ERROR] {sym} {date}: {str(e)[:80]}")
-                continue
-        
-        print(f"  {sym}: {sym_count} days processed")
+            ofi_path = cfg.ofi.output_dir / sym / f"{date}.parquet"
+            tasks.append((sym, date, path, ofi_path, src))
+    
+    total_files = len(tasks)
+    print(f"Total files: {total_files}")
+    
+    # 并行计算全部QC指标
+    df_all = run_qc(tasks, verbose=True)
+    if "error" in df_all.columns:
+        df_results = df_all[df_all["error"].isna()].drop(columns=["error"])
+    else:
+        df_results = df_all
+    processed = len(df_results)
+    
+    for sym, n in df_results.groupby('symbol').size().items():
+        print(f"  {sym}: {n} days processed")
     
     print(f"\nTotal processed: {processed}/{total_files}")
     
+    # 单一QC parquet
+    qc_path = output_dir / "qc_panel.parquet"
+    df_results.to_parquet(qc_path, index=False)
+    print(f"\nSaved QC table to: {qc_path}")
+    
+    # 收集OFI统计用于可视化
+    ofi_stats_by_symbol = {sym: [] for sym in universe}
+    for sym, g in df_results.dropna(subset=['ofi_mean']).groupby('symbol'):
+        ofi_stats_by_symbol[sym] = pd.DataFrame({
+            'date': pd.to_datetime(g['date']),
+            'mean': g['ofi_mean'],
+            'std': g['ofi_std'],
+        }).to_dict('records')
+    
     # 保存汇总CSV
-    df_results = pd.DataFrame(results)
     csv_path = output_dir / "day3_panel_summary.csv"
     df_results.to_csv(csv_path, index=False)
     print(f"\nSaved summary to: {csv_path}")
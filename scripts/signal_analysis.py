@@ -12,6 +12,7 @@ from scipy import stats
 from typing import Dict, List, Tuple
 
 from src.pipeline_io import load_config, load_universe
+from src.ofi.prefetch import prefetch
 
 
 def compute_ofi_from_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
@@ -161,7 +162,9 @@ def calculate_quantile_returns(ofi: pd.Series, ret: pd.Series, n_groups: int = 5
     }
 
 
-def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end: str) -> pd.DataFrame:
+def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end: str,
+                   processed_dir: Path = Path("data/processed/ticks"),
+                   raw_dir: Path = Path("data/raw/ticks")) -> pd.DataFrame:
     """分析单个标的的IC和分组收益"""
     
     results = []
@@ -171,15 +174,15 @@ def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end:
     if not symbol_ofi_dir.exists():
         return pd.DataFrame()
     
-    for file_path in sorted(symbol_ofi_dir.glob("*.parquet")):
-        date = file_path.stem
-        
-        # 过滤日期范围
-        if date < start or date > end:
-            continue
-        
+    # 过滤日期范围
+    dates = [p.stem for p in sorted(symbol_ofi_dir.glob("*.parquet")) if start <= p.stem <= end]
+    
+    # 后台线程预取后续几天的 tick 数据并计算 OFI/收益，与本日的 IC 计算重叠
+    days = prefetch(dates, lambda date: load_ofi_and_labels(ofi_dir, label_dir, symbol, date,
+                                                            processed_dir, raw_dir))
+    for date, get in days:
         # 加载数据
-        df = load_ofi_and_labels(ofi_dir, label_dir, symbol, date)
+        df = get()
         
         if df is None or len(df) < 10:
             continue
@@ -206,6 +209,7 @@ def analyze_symbol(symbol: str, ofi_dir: Path, label_dir: Path, start: str, end:
         
         results.append(result)
     
+    print(f"  {days.stats}")
     return pd.DataFrame(results)
 
 
@@ -484,7 +488,8 @@ def main():
     
     for symbol in universe:
         print(f"\nAnalyzing {symbol}...")
-        result_df = analyze_symbol(symbol, ofi_dir, label_dir, cfg.data.start, cfg.data.end)
+        result_df = analyze_symbol(symbol, ofi_dir, label_dir, cfg.data.start, cfg.data.end,
+                                   cfg.data.processed_dir, cfg.data.raw_dir)
         
         if len(result_df) > 0:
             all_results.append(result_df)
@@ -37,3 +37,109 @@ def calculate_max_drawdown(equity_curve: np.ndarray) -> float:
     peak = np.maximum.accumulate(equity_curve)
     drawdown = (equity_curve - peak) / peak
     return float(np.min(drawdown))
+
+
+def _as_matrix(x) -> np.ndarray:
+    """Coerce a 1-D or 2-D array-like to a float (time x strategy) matrix."""
+    arr = np.asarray(x, dtype=float)
+    return arr[:, None] if arr.ndim == 1 else arr
+
+
+def drawdown_stats(returns) -> tuple:
+    """
+    Maximum drawdown and longest underwater duration for each column
+    
+    Args:
+        returns: (time x strategy) matrix of periodic simple returns
+        
+    Returns:
+        tuple: (max_drawdown, max_duration) arrays of length n_strategies;
+            max_duration is the longest run of periods spent below a previous peak
+    """
+    r = _as_matrix(returns)
+    equity = np.vstack([np.ones((1, r.shape[1])), np.cumprod(1.0 + r, axis=0)])
+    peak = np.maximum.accumulate(equity, axis=0)
+    drawdown = equity / peak - 1.0
+    
+    # Longest run of consecutive underwater periods: running count reset at each new peak
+    under = drawdown < 0
+    count = np.cumsum(under, axis=0)
+    reset = np.maximum.accumulate(np.where(under, 0, count), axis=0)
+    duration = (count - reset).max(axis=0)
+    return drawdown.min(axis=0), duration
+
+
+def compute_metrics(
+    returns,
+    costs=None,
+    turnover=None,
+    periods_per_year: int = 252,
+    risk_free_rate: float = 0.0
+) -> Union[dict, "pd.DataFrame"]:
+    """
+    Vectorized performance metrics for a (time x strategy) return matrix
+    
+    All statistics are computed column-wise in one pass, so thousands of
+    strategies (e.g. a parameter sweep) are scored without Python loops.
+    Volatility uses the population standard deviation, as in
+    calculate_sharpe_ratio.
+    
+    Args:
+        returns: (time x strategy) periodic simple returns before costs;
+            a DataFrame returns a DataFrame indexed by its columns
+        costs: Optional matrix of per-period costs, subtracted from returns
+        turnover: Optional matrix of per-period turnover (sum of |dw|)
+        periods_per_year: Periods per year used for annualization
+        risk_free_rate: Per-period risk-free rate
+        
+    Returns:
+        dict of arrays (or DataFrame) with total_return, gross_return,
+        ann_return, ann_vol, sharpe, sortino, max_drawdown,
+        max_drawdown_duration, calmar, hit_rate, cost, turnover,
+        turnover_per_period and n_periods
+    """
+    columns = getattr(returns, "columns", None)
+    gross = _as_matrix(returns)
+    cost = np.zeros_like(gross) if costs is None else _as_matrix(costs)
+    net = gross - cost
+    n = net.shape[0]
+    
+    excess = net - risk_free_rate
+    mean = excess.mean(axis=0) if n else np.full(net.shape[1], np.nan)
+    std = net.std(axis=0) if n else np.full(net.shape[1], np.nan)
+    downside = np.sqrt((np.minimum(excess, 0.0) ** 2).mean(axis=0)) if n else np.full(net.shape[1], np.nan)
+    
+    total = np.prod(1.0 + net, axis=0) - 1.0
+    ann_return = (1.0 + total) ** (periods_per_year / n) - 1.0 if n else np.full(net.shape[1], np.nan)
+    max_dd, dd_duration = drawdown_stats(net)
+    
+    scale = np.sqrt(periods_per_year)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * scale, 0.0)
+        sortino = np.where(downside > 0, mean / downside * scale, 0.0)
+        calmar = np.where(max_dd < 0, ann_return / np.abs(max_dd), np.nan)
+        active = (net != 0).sum(axis=0)
+        hit_rate = np.where(active > 0, (net > 0).sum(axis=0) / active, np.nan)
+    
+    turn = np.zeros_like(gross) if turnover is None else _as_matrix(turnover)
+    out = {
+        "total_return": total,
+        "gross_return": np.prod(1.0 + gross, axis=0) - 1.0,
+        "ann_return": ann_return,
+        "ann_vol": std * scale,
+        "sharpe": sharpe,
+        "sortino": sortino,
+        "max_drawdown": max_dd,
+        "max_drawdown_duration": dd_duration,
+        "calmar": calmar,
+        "hit_rate": hit_rate,
+        "cost": cost.sum(axis=0),
+        "turnover": turn.sum(axis=0),
+        "turnover_per_period": turn.sum(axis=0) / n if n else np.full(net.shape[1], np.nan),
+        "n_periods": np.full(net.shape[1], n),
+    }
+    
+    if columns is not None:
+        import pandas as pd
+        return pd.DataFrame(out, index=columns)
+    return out
@@ -2,7 +2,8 @@
 from __future__ import annotations
 from pathlib import Path
 import argparse
-from src.io_lob import convert_one_day, processed_path
+from src.ofi.io import convert_one_day, processed_path, tick_size_for, DEFAULT_TICK_SIZE
+from src.ofi.profiling import StageProfiler, profile_session, PROFILERS
 
 def main():
     ap = argparse.ArgumentParser()
@@ -11,10 +12,43 @@ def main():
     ap.add_argument("--symbol", type=str, default="ALL")   # ALL 或 159915.XSHE
     ap.add_argument("--year", type=str, default="ALL")     # ALL 或 2021 或 2021,2022
     ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--price_ticks", action="store_true",
+                    help="L1-L5 报价存为整数价格档位 round(price / tick_size)（int32）")
+    ap.add_argument("--tick_size", type=float, default=DEFAULT_TICK_SIZE,
+                    help="默认最小报价单位（ETF 为 0.001）")
+    ap.add_argument("--tick_sizes", type=str, default="",
+                    help="按标的覆盖 tick_size，如 600000.XSHG=0.01,159915.XSHE=0.001")
+    ap.add_argument("--profile_out", type=str, default=None,
+                    help="各阶段（按标的）耗时/读取字节/峰值RSS 的 JSON 输出路径")
+    ap.add_argument("--profile", type=str, choices=PROFILERS, default=None,
+                    help="用 cProfile / pyinstrument 剖析，结果写在 profile_out 同目录（默认当前目录）")
     args = ap.parse_args()
 
+    prof = StageProfiler()
+    prof_dir = Path(args.profile_out).parent if args.profile_out else Path(".")
+    with profile_session(args.profile, prof_dir, name="build_processed_profile"):
+        run(args, prof)
+
+    if args.profile_out:
+        prof.write(Path(args.profile_out))
+    print(prof.summary())
+
+
+def parse_tick_sizes(spec: str) -> dict:
+    """解析 "SYM=0.01,SYM2=0.001" 形式的按标的 tick_size"""
+    out = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        sym, _, value = item.partition("=")
+        if not value:
+            raise ValueError(f"Bad --tick_sizes entry: {item!r}, expected SYMBOL=SIZE")
+        out[sym.strip()] = float(value)
+    return out
+
+
+def run(args, prof: StageProfiler):
     raw_root = Path(args.raw_root)
     processed_root = Path(args.processed_root)
+    tick_sizes = parse_tick_sizes(args.tick_sizes)
 
     # years 列表
     if args.year == "ALL":
@@ -46,6 +80,7 @@ def main():
             if not files:
                 continue
 
+            tick_size = tick_size_for(sym, tick_sizes, args.tick_size) if args.price_ticks else None
             for f in files:
                 date_str = f.stem.split(".")[0]  # 2021-01-04
                 out = processed_path(processed_root, sym, date_str)
@@ -53,7 +88,8 @@ def main():
                     skipped += 1
                     continue
                 try:
-                    convert_one_day(f, processed_root)
+                    with prof.stage("convert_one_day", sym):
+                        convert_one_day(f, processed_root, tick_size=tick_size)
                     total += 1
                     if total % 200 == 0:
                         print(f"[OK {total}] (skipped={skipped}, failed={failed}) last={sym} {date_str}")
@@ -7,13 +7,24 @@ Order Flow Imbalance 研究工具包
 """
 
 from .paths import ROOT, DATA_DIR, PROCESSED_TICKS_DIR, OFI_FEATURES_DIR, REPORTS_DIR
-from .io import load_processed_day, load_ofi_features, save_ofi_features
-from .features_ofi import compute_ofi_per_tick, compute_ofi_minute, aggregate_to_minute
-from .clean import clean_lob_data, qc_one_day, qc_parquet_file
+from .io import load_processed_day, load_ofi_features, save_ofi_features, prices_to_ticks, ticks_to_prices
+from .features_ofi import compute_ofi_per_tick, compute_ofi_minute, aggregate_to_minute, fit_integrated_loadings
+from .stream import OfiAccumulator
+from .book import SnapshotRing, SnapshotStore
+from .clean import clean_lob_data, CleanReport, qc_one_day, qc_parquet_file
+from .qc import build_qc_table
 from .evaluate import (
     compute_ic, ic_summary, compute_quantile_returns, backtest_simple,
-    regression_analysis, classification_analysis, subsample_analysis
+    regression_analysis, classification_analysis, subsample_analysis,
+    grouped_rank_ic
 )
+from .panel import load_minute_panel
+from .backtest import run_backtest, backtest_summary
+from .sweep import expand_grid, run_sweep
+from .profiling import StageProfiler
+from .store import FeatureStore, build_feature_store, open_feature_store
+from .query import Query, scan_ticks, scan_ofi_minute
+from .prefetch import prefetch
 from .pipeline import run_all
 
 __version__ = "0.1.0"
@@ -27,12 +38,20 @@ __all__ = [
     "load_processed_day",
     "load_ofi_features",
     "save_ofi_features",
+    "prices_to_ticks",
+    "ticks_to_prices",
     "compute_ofi_per_tick",
     "compute_ofi_minute",
     "aggregate_to_minute",
+    "fit_integrated_loadings",
+    "OfiAccumulator",
+    "SnapshotRing",
+    "SnapshotStore",
     "clean_lob_data",
+    "CleanReport",
     "qc_one_day",
     "qc_parquet_file",
+    "build_qc_table",
     "compute_ic",
     "ic_summary",
     "compute_quantile_returns",
@@ -40,5 +59,19 @@ __all__ = [
     "regression_analysis",
     "classification_analysis",
     "subsample_analysis",
+    "grouped_rank_ic",
+    "load_minute_panel",
+    "run_backtest",
+    "backtest_summary",
+    "expand_grid",
+    "run_sweep",
+    "StageProfiler",
+    "FeatureStore",
+    "build_feature_store",
+    "open_feature_store",
+    "Query",
+    "scan_ticks",
+    "scan_ofi_minute",
+    "prefetch",
     "run_all",
 ]
@@ -22,6 +22,22 @@ def main():
   
   # 只运行质量检查
   python -m src.ofi --task quality_check
+  
+  # long top-k 策略本地回测（参数见 data.yaml 的 strategy 块）
+  python -m src.ofi --task backtest
+  
+  # 策略参数扫描（参数空间见 data.yaml 的 sweep 块），8个进程
+  python -m src.ofi --task sweep --jobs 8
+  
+  # 4个进程并行
+  python -m src.ofi --jobs 4
+  
+  # 各阶段耗时/内存写入 reports/run_profile.json；另用 cProfile 剖析主进程
+  python -m src.ofi --task ic_analysis --profile cprofile
+  
+  # 物化内存映射的分钟特征库，之后的分析直接映射读取
+  python -m src.ofi --task build_store --store data/features/minute_store
+  python -m src.ofi --task ic_analysis --store data/features/minute_store
         """
     )
     
@@ -50,7 +66,8 @@ def main():
         "--task",
         type=str,
         default="all",
-        choices=["all", "quality_check", "ic_analysis", "model_eval", "robustness"],
+        choices=["all", "quality_check", "ic_analysis", "model_eval", "robustness", "backtest", "sweep",
+                 "build_store"],
         help="运行的任务类型"
     )
     
@@ -73,6 +90,26 @@ def main():
         help="结束日期 YYYY-MM-DD"
     )
     
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="并行进程数（按 任务×标的 调度，默认1即串行）"
+    )
+    
+    parser.add_argument(
+        "--profile",
+        type=str,
+        choices=["cprofile", "pyinstrument"],
+        help="用 cProfile / pyinstrument 剖析主进程，结果写入输出目录的 profile.*（pyinstrument 需另行安装）"
+    )
+    
+    parser.add_argument(
+        "--store",
+        type=str,
+        help="分钟特征库目录：分析任务从该库内存映射读取；--task build_store 时为输出目录"
+    )
+    
     parser.add_argument(
         "--verbose",
         action="store_true",
@@ -96,6 +133,7 @@ def main():
     print(f"Universe: {args.universe}")
     print(f"Output: {args.outdir}")
     print(f"Task: {args.task}")
+    print(f"Jobs: {args.jobs}")
     print("=" * 80)
     
     try:
@@ -107,7 +145,10 @@ def main():
             symbols=args.symbols,
             start_date=args.start_date,
             end_date=args.end_date,
-            verbose=args.verbose
+            verbose=args.verbose,
+            jobs=args.jobs,
+            profile=args.profile,
+            store=args.store
         )
         print("\n" + "=" * 80)
         print("Pipeline completed successfully!")
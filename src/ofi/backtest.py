@@ -0,0 +1,353 @@
+"""
+本地向量化回测：OFI 截面 long top-k 策略
+
+复现 jq_strategy/strategy_optimized.py 的交易逻辑，直接在分钟 OFI / 标签面板上运行：
+- 每个交易日 bar 计数从 1 开始（09:30 这一分钟收盘即第 1 根 bar），
+  bar_count % balance_interval == 0 时再平衡；仓位跨日保留
+- 信号为最近 ofi_window 根 bar 的 OFI 之和，窗口不跨午休、不跨日
+- 截面取信号最大的 k_long 个标的，各配 gross / k_long 权重，其余为 0；
+  有效信号少于 k_long 时本次不调仓
+- 换手 Σ|Δw|，成本估计 Σ 0.5·|Δw|·k_spread·rel_spread
+- 第 t 分钟决定的权重获得标签 ret[t]（t 分钟收盘到 t+1 分钟收盘的中间价收益），
+  隔夜收益不计入
+
+数据按 (天, bar, 标的) 排成三维数组，所有步骤都是数组运算，不逐 bar 循环。
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from .qc import SESSION_GRID, EXPECTED_MINUTES
+from ..backtest.metrics import compute_metrics
+
+
+SESSION_BARS = EXPECTED_MINUTES          # 每日 240 根分钟 bar
+HALF_SESSION_BARS = SESSION_BARS // 2    # 上午/下午各 120 根
+
+# 日内分钟序号 (hour*60+minute) -> bar 位置（0~239），非交易时段为 -1
+_BAR_POS = np.full(24 * 60, -1, dtype=np.int64)
+_BAR_POS[SESSION_GRID] = np.arange(SESSION_BARS)
+_BAR_OFFSETS = pd.to_timedelta(np.flatnonzero(SESSION_GRID), unit="min")
+
+
+@dataclass
+class MinuteGrid:
+    """
+    (天, bar, 标的) 三维数据网格
+
+    Attributes:
+        dates: 交易日列表（YYYY-MM-DD）
+        symbols: 标的列表（列顺序即并列时的优先顺序）
+        ret: 未来1分钟收益，shape (D, 240, N)，缺失为 NaN
+        spread: 相对点差，shape (D, 240, N)；面板无点差列时为 None
+        features: {特征列: (D, 240, N) 数组}
+    """
+    dates: List[str]
+    symbols: List[str]
+    ret: np.ndarray
+    spread: Optional[np.ndarray] = None
+    features: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    @property
+    def minutes(self) -> pd.DatetimeIndex:
+        """展平后的分钟时间索引（长度 D*240）"""
+        days = pd.to_datetime(self.dates).values
+        return pd.DatetimeIndex((days[:, None] + _BAR_OFFSETS.values[None, :]).ravel(), name="minute")
+
+
+def build_minute_grid(
+    panel: pd.DataFrame,
+    feature_cols: Optional[Sequence[str]] = None,
+    return_col: str = "ret",
+    spread_col: str = "rel_spread",
+    symbols: Optional[Sequence[str]] = None,
+) -> MinuteGrid:
+    """
+    把分钟面板（长表）填入 (天, bar, 标的) 网格
+
+    Args:
+        panel: load_minute_panel 的输出
+        feature_cols: 需要的特征列，默认 ["ofi"]
+        return_col: 收益列
+        spread_col: 相对点差列，不存在时 grid.spread 为 None
+        symbols: 标的顺序，默认按面板中排序后的标的
+
+    Returns:
+        MinuteGrid
+    """
+    feature_cols = list(feature_cols or ["ofi"])
+    dates = sorted(panel["date"].unique())
+    symbols = list(symbols) if symbols is not None else sorted(panel["symbol"].unique())
+
+    minute = pd.DatetimeIndex(panel["minute"])
+    pos = _BAR_POS[(minute.hour * 60 + minute.minute).to_numpy()]
+    d_idx = pd.Index(dates).get_indexer(panel["date"])
+    s_idx = pd.Index(symbols).get_indexer(panel["symbol"])
+    keep = (pos >= 0) & (d_idx >= 0) & (s_idx >= 0)
+    d_idx, pos, s_idx = d_idx[keep], pos[keep], s_idx[keep]
+
+    shape = (len(dates), SESSION_BARS, len(symbols))
+
+    def fill(col: str) -> np.ndarray:
+        arr = np.full(shape, np.nan)
+        arr[d_idx, pos, s_idx] = panel[col].to_numpy(dtype=float)[keep]
+        return arr
+
+    return MinuteGrid(
+        dates=dates,
+        symbols=symbols,
+        ret=fill(return_col),
+        spread=fill(spread_col) if spread_col in panel.columns else None,
+        features={c: fill(c) for c in feature_cols},
+    )
+
+
+def session_window_sum(x: np.ndarray, window: int):
+    """
+    最近 window 根 bar 的滚动求和（上午、下午各自重置，不跨日）
+
+    Args:
+        x: (D, 240, N) 数组，NaN 视为该分钟无数据
+        window: 窗口长度（bar 数）
+
+    Returns:
+        (sums, counts)：窗口内求和（NaN 按 0 计）与非缺失分钟数，shape 同 x
+    """
+    d, b, n = x.shape
+    halves = x.reshape(d, 2, b // 2, n)
+    zero = np.zeros((d, 2, 1, n))
+    csum = np.concatenate([zero, np.nancumsum(halves, axis=2)], axis=2)
+    ccnt = np.concatenate([zero, np.cumsum(~np.isnan(halves), axis=2)], axis=2)
+
+    hi = np.arange(1, b // 2 + 1)
+    lo = np.maximum(hi - window, 0)
+    sums = csum[:, :, hi] - csum[:, :, lo]
+    counts = ccnt[:, :, hi] - ccnt[:, :, lo]
+    return sums.reshape(d, b, n), counts.reshape(d, b, n)
+
+
+def level_signal(grid: MinuteGrid, levels: int = 5, weight: Optional[Sequence[float]] = None) -> np.ndarray:
+    """
+    分档 OFI 加权合成：Σ_{l<=levels} w_l · ofi_l
+
+    Args:
+        grid: 需包含 ofi1..ofi{levels} 特征
+        levels: 使用的档位数
+        weight: 各档权重，默认全 1
+
+    Returns:
+        (D, 240, N) 信号数组；某分钟所有档位均缺失时为 NaN
+    """
+    weight = np.ones(levels) if weight is None else np.asarray(weight, dtype=float)
+    if len(weight) != levels:
+        raise ValueError(f"len(weight)={len(weight)} != levels={levels}")
+    stack = np.stack([grid.features[f"ofi{i}"] for i in range(1, levels + 1)], axis=-1)
+    out = np.nansum(stack * weight, axis=-1)
+    out[np.isnan(stack).all(axis=-1)] = np.nan
+    return out
+
+
+@dataclass
+class BacktestResult:
+    """
+    回测结果
+
+    Attributes:
+        pnl: 分钟级明细，列为 ret_gross, cost, ret_net, turnover, trades, rebalance
+        weights: 分钟级持仓权重（时间 × 标的）
+        params: 本次回测参数
+    """
+    pnl: pd.DataFrame
+    weights: pd.DataFrame
+    params: dict = field(default_factory=dict)
+
+    def summary(self) -> dict:
+        return backtest_summary(self.pnl)
+
+
+def long_topk_backtest(
+    grid: MinuteGrid,
+    signal: np.ndarray,
+    balance_interval: int = 3,
+    k_long: int = 2,
+    ofi_window: int = 3,
+    k_spread: float = 0.5,
+    gross: float = 0.98,
+    window_sums=None,
+) -> BacktestResult:
+    """
+    long top-k 策略回测
+
+    Args:
+        grid: build_minute_grid 的输出（提供收益与点差）
+        signal: (D, 240, N) 分钟信号（如 grid.features["ofi"] 或 level_signal 的结果）
+        balance_interval: 再平衡间隔（bar 数）
+        k_long: 做多标的个数
+        ofi_window: 信号累加窗口（bar 数）
+        k_spread: 点差成本系数
+        gross: 多头总仓位
+        window_sums: 预先计算的 session_window_sum(signal, ofi_window) 结果（参数扫描时复用）
+
+    Returns:
+        BacktestResult
+    """
+    if balance_interval < 1 or k_long < 1:
+        raise ValueError("balance_interval and k_long must be >= 1")
+    d, b, n = signal.shape
+    sums, counts = window_sums if window_sums is not None else session_window_sum(signal, ofi_window)
+
+    # 再平衡 bar：bar_count = 1..240，每日重置
+    rebal_bar = np.arange(1, b + 1) % balance_interval == 0
+    rebal = np.zeros((d, b), dtype=bool)
+    rebal[:, rebal_bar] = True
+
+    # 截面选股：无数据的标的排在最后，并列时按 symbols 顺序（与平台上的稳定排序一致）
+    sig = sums[rebal]
+    valid = counts[rebal] > 0
+    ok = valid.sum(axis=1) >= k_long
+    key = np.where(valid, sig, -np.inf)
+    top = np.argsort(-key, axis=1, kind="stable")[:, :k_long]
+
+    targets = np.zeros((int(ok.sum()) + 1, n))
+    rows = np.arange(1, len(targets))[:, None]
+    targets[rows, top[ok]] = gross / k_long
+
+    # 目标权重前向填充：持仓在下一次有效再平衡前保持不变（含跨日）
+    event = np.zeros(d * b, dtype=bool)
+    event[np.flatnonzero(rebal.ravel())[ok]] = True
+    weights = targets[np.cumsum(event)]
+
+    dw = np.abs(np.diff(weights, axis=0, prepend=np.zeros((1, n))))
+    ret = np.nan_to_num(grid.ret.reshape(d * b, n))
+    spread = np.zeros_like(ret) if grid.spread is None else np.nan_to_num(grid.spread.reshape(d * b, n))
+
+    ret_gross = (weights * ret).sum(axis=1)
+    cost = (0.5 * dw * k_spread * spread).sum(axis=1)
+
+    index = grid.minutes
+    pnl = pd.DataFrame({
+        "ret_gross": ret_gross,
+        "cost": cost,
+        "ret_net": ret_gross - cost,
+        "turnover": dw.sum(axis=1),
+        "trades": (dw > 1e-8).sum(axis=1),
+        "rebalance": event,
+    }, index=index)
+    params = {"balance_interval": balance_interval, "k_long": k_long, "ofi_window": ofi_window,
+              "k_spread": k_spread, "gross": gross}
+    return BacktestResult(pnl, pd.DataFrame(weights, index=index, columns=grid.symbols), params)
+
+
+# daily_pnl 的列顺序
+DAILY_COLUMNS = ["ret_gross", "ret_net", "cost", "turnover", "trades", "rebalance"]
+
+
+def daily_pnl(pnl: pd.DataFrame) -> pd.DataFrame:
+    """
+    分钟明细按日汇总（收益按日内复利，换手/成本/次数按日求和）
+
+    Args:
+        pnl: long_topk_backtest 的分钟级明细
+
+    Returns:
+        按交易日索引的 DataFrame：ret_gross, ret_net, cost, turnover, trades, rebalance
+    """
+    day = pnl.index.normalize()
+    out = (1 + pnl[["ret_gross", "ret_net"]]).groupby(day).prod() - 1
+    sums = pnl[["cost", "turnover", "trades", "rebalance"]].groupby(day).sum()
+    return pd.concat([out, sums], axis=1)[DAILY_COLUMNS]
+
+
+def backtest_summary(pnl: pd.DataFrame, periods_per_year: int = 252) -> dict:
+    """
+    回测汇总指标（按日复利，由 backtest.metrics.compute_metrics 计算）
+
+    Args:
+        pnl: long_topk_backtest 的分钟级明细
+        periods_per_year: 年化交易日数
+
+    Returns:
+        total_return, gross_return, ann_return, sharpe, sortino, calmar, max_drawdown,
+        max_drawdown_days, hit_rate, turnover, turnover_per_day, cost, n_rebalances,
+        n_trades, n_days
+    """
+    daily = daily_pnl(pnl)
+    if len(daily) == 0:
+        return {"n_days": 0}
+    return _summary_rows(daily.to_numpy()[:, :, None], list(daily.columns), periods_per_year)[0]
+
+
+def _summary_rows(daily: np.ndarray, columns: List[str], periods_per_year: int = 252) -> List[dict]:
+    """
+    一次计算多组回测的汇总指标
+
+    Args:
+        daily: shape (天, len(columns), 组合数)，列为 daily_pnl 的列
+        columns: daily 第二维的列名
+        periods_per_year: 年化交易日数
+
+    Returns:
+        每个组合一个汇总字典
+    """
+    col = {c: daily[:, i] for i, c in enumerate(columns)}
+    gross = col["ret_gross"]
+    # 日内复利下 净收益 = 毛收益 - 当日成本拖累
+    m = compute_metrics(gross, costs=gross - col["ret_net"], turnover=col["turnover"],
+                        periods_per_year=periods_per_year)
+    n_days = daily.shape[0]
+    return [
+        {
+            "total_return": float(m["total_return"][j]),
+            "gross_return": float(m["gross_return"][j]),
+            "ann_return": float(m["ann_return"][j]),
+            "sharpe": float(m["sharpe"][j]),
+            "sortino": float(m["sortino"][j]),
+            "calmar": float(m["calmar"][j]),
+            "max_drawdown": float(m["max_drawdown"][j]),
+            "max_drawdown_days": int(m["max_drawdown_duration"][j]),
+            "hit_rate": float(m["hit_rate"][j]),
+            "turnover": float(m["turnover"][j]),
+            "turnover_per_day": float(m["turnover_per_period"][j]),
+            "cost": float(col["cost"][:, j].sum()),
+            "n_rebalances": int(col["rebalance"][:, j].sum()),
+            "n_trades": int(col["trades"][:, j].sum()),
+            "n_days": n_days,
+        }
+        for j in range(daily.shape[2])
+    ]
+
+
+def run_backtest(
+    panel: pd.DataFrame,
+    balance_interval: int = 3,
+    k_long: int = 2,
+    ofi_window: int = 3,
+    k_spread: float = 0.5,
+    gross: float = 0.98,
+    levels: Optional[int] = None,
+    weight: Optional[Sequence[float]] = None,
+) -> BacktestResult:
+    """
+    在分钟面板上回测 long top-k 策略
+
+    Args:
+        panel: load_minute_panel 的输出；levels 为 None 时需含 ofi 列，
+               否则需含 ofi1..ofi{levels}；含 rel_spread 列时计入点差成本
+        balance_interval, k_long, ofi_window, k_spread, gross: 见 long_topk_backtest
+        levels: 使用的档位数；None 表示直接使用合成后的 ofi 列
+        weight: 各档权重（levels 不为 None 时生效）
+
+    Returns:
+        BacktestResult
+    """
+    if levels is None:
+        grid = build_minute_grid(panel, ["ofi"])
+        signal = grid.features["ofi"]
+    else:
+        grid = build_minute_grid(panel, [f"ofi{i}" for i in range(1, levels + 1)])
+        signal = level_signal(grid, levels, weight)
+    result = long_topk_backtest(grid, signal, balance_interval, k_long, ofi_window, k_spread, gross)
+    result.params.update({"levels": levels, "weight": None if weight is None else list(weight)})
+    return result
@@ -0,0 +1,240 @@
+"""
+盘口快照环形缓冲
+
+为每个标的保存最近 N 笔 L1~L5 快照，内存固定：
+- 数据存放在 NumPy 数组中，每笔快照同时写入位置 i 与 i+N（镜像写入），
+  因此任意最近 k 笔快照在底层数组中都是连续的一段，窗口取出的是视图而不是拷贝
+- 时间戳单调递增，按时间取窗口用二分查找
+- 窗口可直接交给 OfiAccumulator、点差估计和 qc.tick_qc_metrics 使用
+
+jq_strategy/strategy.py 用 SnapshotStore 缓存各标的的近期快照。本模块与 stream.py 只依赖
+NumPy/pandas，上传到聚宽研究根目录后可作为独立模块 book / stream 导入。
+"""
+from __future__ import annotations
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+try:
+    from .stream import OfiAccumulator, _to_ns
+except ImportError:
+    # 作为独立模块（聚宽研究根目录下的 book.py）导入
+    from stream import OfiAccumulator, _to_ns
+
+ASK_P, ASK_V, BID_P, BID_V = range(4)
+
+
+class BookWindow:
+    """
+    连续若干笔快照（均为底层缓冲的视图）
+
+    Attributes:
+        ts: int64 纳秒时间戳，shape (k,)
+        book: shape (k, 4, levels)，第二维依次为 ask_p, ask_v, bid_p, bid_v
+        current: 最新价，shape (k,)
+    """
+    __slots__ = ("ts", "book", "current")
+
+    def __init__(self, ts: np.ndarray, book: np.ndarray, current: np.ndarray):
+        self.ts = ts
+        self.book = book
+        self.current = current
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def ask_p(self) -> np.ndarray:
+        return self.book[:, ASK_P]
+
+    @property
+    def ask_v(self) -> np.ndarray:
+        return self.book[:, ASK_V]
+
+    @property
+    def bid_p(self) -> np.ndarray:
+        return self.book[:, BID_P]
+
+    @property
+    def bid_v(self) -> np.ndarray:
+        return self.book[:, BID_V]
+
+    def rel_spread(self) -> np.ndarray:
+        """逐笔相对点差 (a1-b1)/mid；L1 非正或交叉时为 NaN"""
+        a1, b1 = self.book[:, ASK_P, 0], self.book[:, BID_P, 0]
+        valid = (a1 > 0) & (b1 > 0) & (a1 > b1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(valid, (a1 - b1) / ((a1 + b1) / 2.0), np.nan)
+
+    def last_rel_spread(self) -> float:
+        """最后一笔快照的相对点差（与 jq_strategy.get_ofi 的 rel_spread 口径一致）"""
+        return float(self.rel_spread()[-1]) if len(self) else np.nan
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        {列名: 数组} 形式（ts, a{i}_p, a{i}_v, b{i}_p, b{i}_v, current），
+        各列均为视图，可直接传给 qc.tick_qc_metrics
+        """
+        cols = {"ts": self.ts.view("datetime64[ns]"), "current": self.current}
+        for i in range(self.book.shape[2]):
+            cols[f"a{i + 1}_p"] = self.book[:, ASK_P, i]
+            cols[f"a{i + 1}_v"] = self.book[:, ASK_V, i]
+            cols[f"b{i + 1}_p"] = self.book[:, BID_P, i]
+            cols[f"b{i + 1}_v"] = self.book[:, BID_V, i]
+        return cols
+
+    def feed(self, acc: OfiAccumulator) -> np.ndarray:
+        """把窗口内快照按顺序送入 OFI 累加器，返回逐笔分档 OFI"""
+        return acc.update_batch(self.ts, self.ask_p, self.ask_v, self.bid_p, self.bid_v)
+
+
+class SnapshotRing:
+    """
+    单标的最近 capacity 笔快照的环形缓冲
+
+    用法：
+        ring = SnapshotRing(capacity=4800, levels=5)
+        ring.append(ts, ask_p, ask_v, bid_p, bid_v, current)
+        ring.last(100)                  # 最近100笔
+        ring.between(t0, t1)            # (t0, t1] 内的快照
+        ring.between(t0, t1, include_start=True)   # [t0, t1]，与 get_ticks(start_dt=t0, end_dt=t1) 相同
+    """
+    __slots__ = ("capacity", "levels", "_ts", "_book", "_current", "_head", "_size")
+
+    def __init__(self, capacity: int, levels: int = 5):
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = capacity
+        self.levels = levels
+        self._ts = np.zeros(2 * capacity, dtype=np.int64)
+        self._book = np.full((2 * capacity, 4, levels), np.nan)
+        self._current = np.full(2 * capacity, np.nan)
+        self._head = 0      # 下一笔写入位置（0 ~ capacity-1）
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._ts.nbytes + self._book.nbytes + self._current.nbytes
+
+    def clear(self):
+        """清空（不释放内存）"""
+        self._head = 0
+        self._size = 0
+
+    def append(self, ts, ask_p, ask_v, bid_p, bid_v, current: float = np.nan):
+        """
+        追加一笔快照
+
+        Args:
+            ts: 时间戳（需不早于上一笔）
+            ask_p, ask_v, bid_p, bid_v: 长度为 levels 的数组（1 档在前）
+            current: 最新价
+        """
+        ns = int(_to_ns(ts))
+        if self._size and ns < self._ts[self._head - 1 + self.capacity]:
+            raise ValueError("Snapshots must be appended in time order")
+        i, j = self._head, self._head + self.capacity
+        self._ts[i] = self._ts[j] = ns
+        for k, x in enumerate((ask_p, ask_v, bid_p, bid_v)):
+            self._book[i, k] = self._book[j, k] = np.asarray(x, dtype=float)[:self.levels]
+        self._current[i] = self._current[j] = current
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def extend(self, ts, ask_p, ask_v, bid_p, bid_v, current=None):
+        """
+        批量追加（按时间顺序）；超过容量时只保留最后 capacity 笔
+
+        Args:
+            ts: 长度 n 的时间戳数组
+            ask_p, ask_v, bid_p, bid_v: shape (n, levels) 数组
+            current: 长度 n 的最新价数组（可选）
+        """
+        ns = _to_ns(ts)
+        n = len(ns)
+        if n == 0:
+            return
+        if np.any(ns[1:] < ns[:-1]) or (self._size and ns[0] < self._ts[self._head - 1 + self.capacity]):
+            raise ValueError("Snapshots must be appended in time order")
+
+        book = np.stack([np.asarray(x, dtype=float)[:, :self.levels] for x in (ask_p, ask_v, bid_p, bid_v)], axis=1)
+        cur = np.full(n, np.nan) if current is None else np.asarray(current, dtype=float)
+        if n > self.capacity:
+            ns, book, cur = ns[-self.capacity:], book[-self.capacity:], cur[-self.capacity:]
+            self._head = (self._head + n - self.capacity) % self.capacity
+            n = self.capacity
+
+        pos = (self._head + np.arange(n)) % self.capacity
+        for p in (pos, pos + self.capacity):
+            self._ts[p] = ns
+            self._book[p] = book
+            self._current[p] = cur
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def extend_frame(self, df: pd.DataFrame, time_col: str = "ts"):
+        """批量追加 DataFrame 形式的快照（列 ts, a{i}_p, a{i}_v, b{i}_p, b{i}_v[, current]）"""
+        ts = df.index if time_col not in df.columns else df[time_col]
+        cols = lambda side, kind: df[[f"{side}{i}_{kind}" for i in range(1, self.levels + 1)]].to_numpy(dtype=float)
+        current = df["current"].to_numpy(dtype=float) if "current" in df.columns else None
+        self.extend(np.asarray(ts), cols("a", "p"), cols("a", "v"), cols("b", "p"), cols("b", "v"), current)
+
+    def _slice(self, start: int, stop: int) -> BookWindow:
+        return BookWindow(self._ts[start:stop], self._book[start:stop], self._current[start:stop])
+
+    def last(self, k: Optional[int] = None) -> BookWindow:
+        """最近 k 笔快照（默认全部），按时间升序"""
+        k = self._size if k is None else min(int(k), self._size)
+        stop = self._head + self.capacity
+        return self._slice(stop - k, stop)
+
+    def between(self, start=None, end=None, include_start: bool = False) -> BookWindow:
+        """
+        时间区间 (start, end] 内的快照
+
+        Args:
+            start: 开始时间（默认不含），None 表示最早
+            end: 结束时间（含），None 表示最新
+            include_start: 为 True 时取 [start, end]，与 get_ticks(start_dt, end_dt) 的窗口一致
+        """
+        stop = self._head + self.capacity
+        first = stop - self._size
+        ts = self._ts[first:stop]
+        lo = 0 if start is None else int(np.searchsorted(ts, int(_to_ns(start)),
+                                                         side="left" if include_start else "right"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, int(_to_ns(end)), side="right"))
+        return self._slice(first + lo, first + max(lo, hi))
+
+    def latest(self) -> Optional[BookWindow]:
+        """最新一笔快照（长度为1的窗口），缓冲为空时返回 None"""
+        return self.last(1) if self._size else None
+
+
+class SnapshotStore:
+    """多标的快照缓冲：{symbol: SnapshotRing}，按需创建"""
+    __slots__ = ("capacity", "levels", "rings")
+
+    def __init__(self, capacity: int, levels: int = 5):
+        self.capacity = capacity
+        self.levels = levels
+        self.rings: Dict[str, SnapshotRing] = {}
+
+    def __getitem__(self, symbol: str) -> SnapshotRing:
+        ring = self.rings.get(symbol)
+        if ring is None:
+            ring = self.rings[symbol] = SnapshotRing(self.capacity, self.levels)
+        return ring
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.rings
+
+    @property
+    def nbytes(self) -> int:
+        return sum(r.nbytes for r in self.rings.values())
+
+    def clear(self):
+        for ring in self.rings.values():
+            ring.clear()
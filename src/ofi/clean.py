@@ -2,15 +2,42 @@
 LOB数据清洗和质量检查
 """
 from __future__ import annotations
+from dataclasses import dataclass, asdict
 from pathlib import Path
+from typing import Tuple
 import numpy as np
 import pandas as pd
 
+from .io import price_scale, read_processed
+
 
 PX_COLS = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
 VOL_COLS = [f"a{k}_v" for k in range(1, 6)] + [f"b{k}_v" for k in range(1, 6)]
 
 
+@dataclass
+class CleanReport:
+    """clean_lob_data 的逐规则剔除计数（按规则顺序归属，每行只计一次）"""
+    n_input: int = 0
+    bad_price: int = 0
+    crossed: int = 0
+    duplicate_ts: int = 0
+    outlier: int = 0
+
+    @property
+    def removed(self) -> int:
+        return self.bad_price + self.crossed + self.duplicate_ts + self.outlier
+
+    @property
+    def n_output(self) -> int:
+        return self.n_input - self.removed
+
+    def as_dict(self) -> dict:
+        d = asdict(self)
+        d.update(removed=self.removed, n_output=self.n_output)
+        return d
+
+
 def clean_lob_data(
     df: pd.DataFrame,
     remove_zero_price: bool = True,
@@ -18,10 +45,17 @@ def clean_lob_data(
     remove_duplicates: bool = True,
     remove_outliers: bool = True,
     outlier_threshold: float = 0.1  # 相对价格变动阈值
-) -> pd.DataFrame:
+) -> Tuple[pd.DataFrame, CleanReport]:
     """
     清洗LOB数据
     
+    在列数组上依次构造各规则的剔除掩码，合并为一个有效性掩码后只切片一次。
+    规则顺序与语义：
+    1. 价格 <= 0 或缺失
+    2. 交叉盘口（a1 <= b1）
+    3. 重复时间戳（在前两步保留的行中保留最后一个）
+    4. 异常价格跳动（相对前一条保留行的 mid 变动超过阈值）
+    
     Args:
         df: 原始LOB数据
         remove_zero_price: 是否移除价格为0或负的行
@@ -31,43 +65,53 @@ def clean_lob_data(
         outlier_threshold: 异常价格变动阈值（相对变化）
     
     Returns:
-        清洗后的DataFrame
+        (清洗后的DataFrame, 逐规则剔除计数 CleanReport)
     """
-    out = df.copy()
-    n_orig = len(out)
+    n = len(df)
+    report = CleanReport(n_input=n)
+    keep = np.ones(n, dtype=bool)
     
-    # 1. 移除价格 <= 0 的行
+    # 1. 价格 <= 0 或缺失
     if remove_zero_price:
-        price_cols = [c for c in out.columns if c.endswith("_p")]
-        bad_price = (out[price_cols] <= 0).any(axis=1) | out[price_cols].isna().any(axis=1)
-        out = out[~bad_price]
-    
-    # 2. 移除交叉盘口
+        price_cols = [c for c in df.columns if c.endswith("_p")]
+        if price_cols:
+            px = df[price_cols].to_numpy(dtype=float)
+            bad_price = ((px <= 0) | np.isnan(px)).any(axis=1)
+            report.bad_price = int(bad_price.sum())
+            keep &= ~bad_price
+    
+    # 2. 交叉盘口
     if remove_crossed:
-        crossed = out["a1_p"] <= out["b1_p"]
-        out = out[~crossed]
+        crossed = df["a1_p"].to_numpy(dtype=float) <= df["b1_p"].to_numpy(dtype=float)
+        crossed &= keep
+        report.crossed = int(crossed.sum())
+        keep &= ~crossed
     
-    # 3. 移除重复时间戳（保留最后一个）
+    # 3. 重复时间戳（保留最后一个）
     if remove_duplicates:
-        if "ts" in out.columns:
-            out = out.drop_duplicates(subset=["ts"], keep="last")
-        elif out.index.name == "ts" or isinstance(out.index, pd.DatetimeIndex):
-            out = out[~out.index.duplicated(keep="last")]
-    
-    # 4. 移除异常价格跳动
-    if remove_outliers and len(out) > 0:
-        mid = (out["a1_p"] + out["b1_p"]) / 2.0
-        mid_ret = mid.pct_change().abs()
-        outlier_mask = mid_ret > outlier_threshold
-        out = out[~outlier_mask]
-    
-    n_final = len(out)
-    removed = n_orig - n_final
-    
-    if removed > 0:
-        print(f"Cleaned: removed {removed}/{n_orig} rows ({removed/n_orig*100:.2f}%)")
-    
-    return out
+        if "ts" in df.columns:
+            ts = df["ts"].to_numpy()
+        elif df.index.name == "ts" or isinstance(df.index, pd.DatetimeIndex):
+            ts = df.index.to_numpy()
+        else:
+            ts = None
+        if ts is not None:
+            idx = np.flatnonzero(keep)
+            dup = pd.Series(ts[idx]).duplicated(keep="last").to_numpy()
+            report.duplicate_ts = int(dup.sum())
+            keep[idx[dup]] = False
+    
+    # 4. 异常价格跳动（相对前一条保留行）
+    if remove_outliers and keep.any():
+        idx = np.flatnonzero(keep)
+        mid = (df["a1_p"].to_numpy(dtype=float)[idx] + df["b1_p"].to_numpy(dtype=float)[idx]) / 2.0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mid_ret = np.abs(mid[1:] / mid[:-1] - 1.0)
+        outlier = mid_ret > outlier_threshold
+        report.outlier = int(outlier.sum())
+        keep[idx[1:][outlier]] = False
+    
+    return df[keep], report
 
 
 def qc_one_day(df: pd.DataFrame) -> dict:
@@ -112,7 +156,7 @@ def qc_one_day(df: pd.DataFrame) -> dict:
     # 价差统计
     mid = (a1 + b1) / 2.0
     spread = a1 - b1
-    spread_median = float(np.nanmedian(spread))
+    spread_median = float(np.nanmedian(spread)) * price_scale(df)
     rel_spread_median = float(np.nanmedian(spread / mid))
     
     return {
@@ -135,7 +179,7 @@ def qc_parquet_file(pq_path: Path) -> dict:
     Returns:
         质量指标字典（包含文件信息）
     """
-    df = pd.read_parquet(pq_path)
+    df = read_processed(pq_path)
     
     qc = qc_one_day(df)
     
@@ -89,6 +89,56 @@ def compute_rank_ic(
     return ic
 
 
+def grouped_rank_ic(
+    df: pd.DataFrame,
+    by: List[str],
+    signal_col: str = "signal",
+    return_col: str = "returns",
+    min_obs: int = 10
+) -> pd.DataFrame:
+    """
+    分组Rank IC（向量化）
+    
+    在组内求平均秩后，用一次 groupby 求和得到各组的 Pearson 相关，
+    等价于逐组调用 scipy.stats.spearmanr，但没有 Python 层的组循环。
+    
+    Args:
+        df: 长表，包含分组列、信号列和收益列
+        by: 分组列
+        signal_col: 信号列名
+        return_col: 收益列名
+        min_obs: 组内最少有效样本数，不足的组丢弃
+    
+    Returns:
+        DataFrame，列为 by + [ic, n_obs]
+    """
+    data = df[by + [signal_col, return_col]].dropna(subset=[signal_col, return_col])
+    if len(data) == 0:
+        return pd.DataFrame(columns=by + ["ic", "n_obs"])
+    
+    g = data.groupby(by, observed=True, sort=True)
+    x = g[signal_col].rank(method="average").to_numpy(dtype=float)
+    y = g[return_col].rank(method="average").to_numpy(dtype=float)
+    
+    moments = pd.DataFrame({
+        "n": 1.0, "x": x, "y": y, "xx": x * x, "yy": y * y, "xy": x * y
+    }, index=data.index)
+    for col in by:
+        moments[col] = data[col].values
+    sums = moments.groupby(by, observed=True, sort=True)[["n", "x", "y", "xx", "yy", "xy"]].sum()
+    
+    n = sums["n"]
+    cov = sums["xy"] - sums["x"] * sums["y"] / n
+    var_x = sums["xx"] - sums["x"] ** 2 / n
+    var_y = sums["yy"] - sums["y"] ** 2 / n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ic = cov / np.sqrt(var_x * var_y)
+    
+    out = pd.DataFrame({"ic": ic.where((var_x > 0) & (var_y > 0)), "n_obs": n.astype(int)})
+    out = out[out["n_obs"] >= min_obs]
+    return out.reset_index()
+
+
 def ic_summary(ic_series: pd.Series) -> Dict[str, float]:
     """
     IC统计摘要
@@ -416,6 +466,10 @@ def classification_analysis(
         }
 
 
+# rolling_ic_analysis 每块处理的窗口元素数（块数 × window）
+_ROLLING_BLOCK = 1 << 18
+
+
 def rolling_ic_analysis(
     signal: pd.Series,
     returns: pd.Series,
@@ -424,6 +478,10 @@ def rolling_ic_analysis(
 ) -> pd.Series:
     """
     滚动IC分析
+
+    第 t 个值为 [t-window+1, t] 窗口内信号与收益的相关系数（spearman 为窗口内重新求秩），
+    前 window-1 个为 NaN。窗口按块分批向量化计算，每块最多 _ROLLING_BLOCK 个元素，
+    内存与序列长度无关。
     
     Args:
         signal: 信号序列
@@ -439,19 +497,25 @@ def rolling_ic_analysis(
     if len(df) < window:
         return pd.Series(dtype=float)
     
-    def calc_ic(s, r):
+    from numpy.lib.stride_tricks import sliding_window_view
+    s_all = sliding_window_view(df["signal"].to_numpy(dtype=float), window)
+    r_all = sliding_window_view(df["returns"].to_numpy(dtype=float), window)
+    out = np.full(len(df), np.nan)
+    step = max(1, _ROLLING_BLOCK // window)
+    for start in range(0, len(s_all), step):
+        # 视图切片不复制；只有当前块的秩/去均值结果占用 (step, window) 内存
+        s = s_all[start:start + step]
+        r = r_all[start:start + step]
         if method == "spearman":
-            ic, _ = stats.spearmanr(s, r)
-        else:
-            ic, _ = stats.pearsonr(s, r)
-        return ic
-    
-    rolling_ic = df.rolling(window).apply(
-        lambda x: calc_ic(x["signal"], x["returns"]) if len(x) == window else np.nan,
-        raw=False
-    )
-    
-    return rolling_ic["signal"]
+            s = stats.rankdata(s, axis=1)
+            r = stats.rankdata(r, axis=1)
+        s = s - s.mean(axis=1, keepdims=True)
+        r = r - r.mean(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ic = (s * r).sum(axis=1) / np.sqrt((s * s).sum(axis=1) * (r * r).sum(axis=1))
+        out[window - 1 + start:window - 1 + start + len(ic)] = ic
+    
+    return pd.Series(out, index=df.index, name="signal")
 
 
 def subsample_analysis(
@@ -489,20 +553,141 @@ def subsample_analysis(
     else:
         raise ValueError(f"Unknown subsample_by: {subsample_by}")
     
-    results = []
-    for group_val, group_df in df.groupby("group"):
-        if len(group_df) < 10:
-            continue
-        
-        ic, _ = stats.spearmanr(group_df["signal"], group_df["returns"])
-        
-        results.append({
-            "group": group_val,
-            "ic_mean": ic,
-            "n_obs": len(group_df)
-        })
+    res = grouped_rank_ic(df, ["group"], min_obs=10)
+    return res.rename(columns={"ic": "ic_mean"})
+
+
+def walk_forward_ols(
+    panel: pd.DataFrame,
+    signal_col: str = "ofi",
+    return_col: str = "ret",
+    fold_size: Optional[int] = None,
+    n_splits: int = 5,
+    window: str = "expanding",
+    train_folds: int = 1,
+    min_train: int = 20,
+    min_test: int = 10,
+    by: str = "symbol"
+) -> pd.DataFrame:
+    """
+    Walk-forward 样本外检验：r = α + β·OFI
+    
+    每个分组（默认按标的）按时间顺序切成若干折，第 k 折作为测试集，
+    训练集为之前的全部折（expanding）或最近 train_folds 折（rolling）。
     
-    return pd.DataFrame(results)
+    实现上只扫描一次数据：先按 (分组, 折) 求一次充分统计量
+    (n, Σx, Σy, Σx², Σxy, Σy²)，训练窗口的矩由折级累加和的差分得到，
+    OLS 系数、样本外 R² 和 Pearson IC 都由统计量闭式计算；
+    Rank IC 与命中率各需要一次对测试样本的向量化分组汇总。
+    因此折数增加不会导致训练数据被重复扫描。
+    
+    Args:
+        panel: 长表，按 by、时间排序
+        signal_col: 信号列名
+        return_col: 收益列名
+        fold_size: 每折样本数（如 240 表示按天滚动）；None 时按 n_splits 等分
+        n_splits: fold_size 为 None 时每个分组的分割数量（余数样本丢弃）
+        window: "expanding" 或 "rolling"
+        train_folds: rolling 模式下的训练折数
+        min_train: 训练集最少样本数
+        min_test: 测试集最少样本数
+        by: 分组列
+    
+    Returns:
+        DataFrame，列为 by, fold, train_size, test_size, alpha, beta,
+        ic（样本外Rank IC）, pearson_ic, r2_oos（相对训练集均值）, hit_rate
+    """
+    if window not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown window: {window}")
+    
+    out_cols = [by, "fold", "train_size", "test_size", "alpha", "beta",
+                "ic", "pearson_ic", "r2_oos", "hit_rate"]
+    data = panel[[by, signal_col, return_col]].dropna()
+    if len(data) == 0:
+        return pd.DataFrame(columns=out_cols)
+    
+    x = data[signal_col].to_numpy(dtype=float)
+    y = data[return_col].to_numpy(dtype=float)
+    
+    # 折编号
+    pos = data.groupby(by, sort=False).cumcount().to_numpy()
+    if fold_size is None:
+        size = (data.groupby(by, sort=False)[signal_col].transform("size") // n_splits).to_numpy()
+        fold = np.where(size > 0, pos // np.maximum(size, 1), -1)
+        fold = np.where(fold < n_splits, fold, -1)
+    else:
+        fold = pos // fold_size
+    
+    keep = fold >= 0
+    data = data.loc[keep]
+    x, y, fold = x[keep], y[keep], fold[keep]
+    
+    # 一次扫描：各折充分统计量
+    moments = pd.DataFrame({
+        by: data[by].values, "fold": fold,
+        "n": 1.0, "sx": x, "sy": y, "sxx": x * x, "sxy": x * y, "syy": y * y
+    })
+    stat_cols = ["n", "sx", "sy", "sxx", "sxy", "syy"]
+    folds = moments.groupby([by, "fold"], sort=True)[stat_cols].sum().reset_index()
+    
+    # 训练窗口矩：折级累加和（不含当前折）的差分
+    grp = folds.groupby(by, sort=False)
+    cum = grp[stat_cols].cumsum() - folds[stat_cols]
+    if window == "rolling":
+        # 第 k 折的训练窗口为 [k-train_folds, k)：cum(k) - cum(k-train_folds)
+        cum_lag = cum.groupby(folds[by], sort=False).shift(train_folds).fillna(0.0)
+        train = cum - cum_lag
+    else:
+        train = cum
+    
+    n_tr = train["n"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        var_x = train["sxx"].to_numpy() - train["sx"].to_numpy() ** 2 / n_tr
+        cov_xy = train["sxy"].to_numpy() - train["sx"].to_numpy() * train["sy"].to_numpy() / n_tr
+        beta = np.where(var_x > 0, cov_xy / var_x, np.nan)
+        alpha = (train["sy"].to_numpy() - beta * train["sx"].to_numpy()) / n_tr
+        y_bar_tr = train["sy"].to_numpy() / n_tr
+    
+    folds["train_size"] = n_tr.astype(int)
+    folds["alpha"] = alpha
+    folds["beta"] = beta
+    
+    # 样本外 R²：SSE 与 SST 均由测试折统计量闭式展开
+    n_te, sx, sy = folds["n"].to_numpy(), folds["sx"].to_numpy(), folds["sy"].to_numpy()
+    sxx, sxy, syy = folds["sxx"].to_numpy(), folds["sxy"].to_numpy(), folds["syy"].to_numpy()
+    sse = (syy - 2 * alpha * sy - 2 * beta * sxy + n_te * alpha ** 2
+           + 2 * alpha * beta * sx + beta ** 2 * sxx)
+    sst = syy - 2 * y_bar_tr * sy + n_te * y_bar_tr ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        folds["r2_oos"] = np.where(sst > 0, 1 - sse / sst, np.nan)
+        te_var_x = sxx - sx ** 2 / n_te
+        te_var_y = syy - sy ** 2 / n_te
+        te_cov = sxy - sx * sy / n_te
+        folds["pearson_ic"] = np.sign(beta) * te_cov / np.sqrt(te_var_x * te_var_y)
+    
+    # 样本外 Rank IC：预测值是 x 的仿射变换，秩相关 = sign(β) × Spearman(x, y)
+    rank_ic = grouped_rank_ic(moments.rename(columns={"sx": "_x", "sy": "_y"}),
+                              [by, "fold"], "_x", "_y", min_obs=1)
+    folds = folds.merge(rank_ic[[by, "fold", "ic"]], on=[by, "fold"], how="left")
+    folds["ic"] = np.sign(folds["beta"]) * folds["ic"]
+    
+    # 命中率：逐行预测方向与实际方向一致的比例（忽略零收益）
+    fold_key = pd.MultiIndex.from_frame(folds[[by, "fold"]])
+    row_key = pd.MultiIndex.from_arrays([moments[by].values, moments["fold"].values])
+    loc = fold_key.get_indexer(row_key)
+    pred = alpha[loc] + beta[loc] * x
+    nonzero = y != 0
+    hit = pd.DataFrame({"loc": loc[nonzero],
+                        "hit": (np.sign(pred[nonzero]) == np.sign(y[nonzero])).astype(float)})
+    hit_rate = hit.groupby("loc")["hit"].mean()
+    folds["hit_rate"] = hit_rate.reindex(np.arange(len(folds))).to_numpy()
+    
+    folds = folds.rename(columns={"n": "test_size"})
+    folds["test_size"] = folds["test_size"].astype(int)
+    valid = (folds["train_size"] >= min_train) & (folds["test_size"] >= min_test)
+    if window == "rolling":
+        valid &= folds["fold"] >= train_folds
+    return folds.loc[valid, out_cols].reset_index(drop=True)
 
 
 def walk_forward_cv(
@@ -513,47 +698,92 @@ def walk_forward_cv(
     """
     Walk-forward交叉验证
     
+    基于 walk_forward_ols（expanding 窗口）：第 i 折为测试集，之前各折为训练集。
+    
     Args:
         signal: 信号序列
         returns: 收益序列
         n_splits: 分割数量
     
     Returns:
-        各fold的评估结果
+        各fold的评估结果（fold, train_size, test_size, ic, p_value 及 OLS 样本外指标）
     """
     df = pd.DataFrame({"signal": signal, "returns": returns}).dropna()
+    df.insert(0, "series", 0)
+    
+    res = walk_forward_ols(df, "signal", "returns", n_splits=n_splits,
+                           min_train=1, min_test=10, by="series")
+    if len(res) == 0:
+        return pd.DataFrame(columns=["fold", "train_size", "test_size", "ic", "p_value"])
+    
+    # Spearman 相关的 t 检验 p 值（与 scipy.stats.spearmanr 一致）
+    n = res["test_size"].to_numpy(dtype=float)
+    r = res["ic"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = r * np.sqrt((n - 2) / (1 - r ** 2))
+    res["p_value"] = 2 * stats.t.sf(np.abs(t), n - 2)
+    
+    return res.drop(columns=["series"])[
+        ["fold", "train_size", "test_size", "ic", "p_value",
+         "alpha", "beta", "pearson_ic", "r2_oos", "hit_rate"]
+    ]
+
+
+def add_subsample_groups(
+    panel: pd.DataFrame,
+    return_col: str = "ret",
+    vol_window: int = 20
+) -> pd.DataFrame:
+    """
+    为面板添加子样本分组列：hour, day_of_week, volatility
     
-    n = len(df)
-    fold_size = n // n_splits
+    波动率分组：每个标的内收益率滚动标准差的三分位（low/mid/high）
     
-    results = []
+    Args:
+        panel: 长表，包含 symbol, minute 和收益列
+        return_col: 收益列名
+        vol_window: 滚动波动率窗口（分钟数）
     
-    for i in range(n_splits):
-        # 训练集：前i+1个fold
-        train_end = (i + 1) * fold_size
-        if i == 0:
-            continue  # 第一个fold没有训练集
-        
-        train = df.iloc[:train_end]
-        
-        # 测试集：第i+1个fold
-        test_start = i * fold_size
-        test_end = (i + 1) * fold_size
-        test = df.iloc[test_start:test_end]
-        
-        if len(test) < 10:
-            continue
-        
-        # 计算测试集IC
-        ic, p_val = stats.spearmanr(test["signal"], test["returns"])
-        
-        results.append({
-            "fold": i,
-            "train_size": len(train),
-            "test_size": len(test),
-            "ic": ic,
-            "p_value": p_val
-        })
+    Returns:
+        添加了分组列的DataFrame（新对象）
+    """
+    out = panel.copy()
+    minute = pd.to_datetime(out["minute"])
+    out["hour"] = minute.dt.hour
+    out["day_of_week"] = minute.dt.dayofweek
     
-    return pd.DataFrame(results)
+    vol = out.groupby("symbol", sort=False)[return_col].transform(
+        lambda r: r.rolling(vol_window).std()
+    )
+    pct = vol.groupby(out["symbol"], sort=False).rank(pct=True)
+    out["volatility"] = pd.cut(pct, [0, 1 / 3, 2 / 3, 1], labels=["low", "mid", "high"],
+                               include_lowest=True)
+    return out
+
 
+def panel_subsample_ic(
+    panel: pd.DataFrame,
+    by: str,
+    signal_col: str = "ofi",
+    return_col: str = "ret",
+    min_obs: int = 10
+) -> pd.DataFrame:
+    """
+    面板子样本IC：逐标的 + 全样本合并（symbol="ALL"）
+    
+    Args:
+        panel: add_subsample_groups 的输出
+        by: 分组列 ("hour", "day_of_week", "volatility")
+        signal_col: 信号列名
+        return_col: 收益列名
+        min_obs: 组内最少样本数
+    
+    Returns:
+        DataFrame，列为 symbol, <by>, ic, n_obs
+    """
+    per_symbol = grouped_rank_ic(panel, ["symbol", by], signal_col, return_col, min_obs)
+    pooled = grouped_rank_ic(panel, [by], signal_col, return_col, min_obs)
+    pooled.insert(0, "symbol", "ALL")
+    out = pd.concat([per_symbol, pooled], ignore_index=True)
+    out[by] = out[by].astype(str) if by == "volatility" else out[by]
+    return out
@@ -4,7 +4,31 @@ OFI (Order Flow Imbalance) 特征计算
 from __future__ import annotations
 import numpy as np
 import pandas as pd
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .io import price_scale
+
+# data.yaml feature.ofi.precision 的可选值
+PRECISIONS = {"float64": np.float64, "float32": np.float32}
+
+
+def resolve_dtype(precision: Union[str, type, np.dtype, None]) -> np.dtype:
+    """
+    精度配置转为 NumPy dtype
+
+    Args:
+        precision: "float64" / "float32"、dtype，或 None（float64）
+    """
+    if precision is None:
+        return np.dtype(np.float64)
+    if isinstance(precision, str):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision={precision}, expected one of {list(PRECISIONS)}")
+        return np.dtype(PRECISIONS[precision])
+    dtype = np.dtype(precision)
+    if dtype not in (np.float64, np.float32):
+        raise ValueError(f"Unsupported dtype={dtype}, expected float64 or float32")
+    return dtype
 
 
 def _col(level: int, side: str, kind: str) -> str:
@@ -38,12 +62,94 @@ def ensure_datetime_index(df: pd.DataFrame, time_col: str = None) -> pd.DataFram
     if not pd.api.types.is_datetime64_any_dtype(out[time_col]):
         out[time_col] = pd.to_datetime(out[time_col], errors="coerce")
     
-    out = out.dropna(subset=[time_col]).sort_values(time_col)
+    # 稳定排序：同一时间戳的快照保持文件内顺序（上一 tick 的取法与 features_sql 一致）
+    out = out.dropna(subset=[time_col]).sort_values(time_col, kind="mergesort")
     out = out.set_index(time_col)
     return out
 
 
-def compute_ofi_per_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
+def weight_matrix(
+    weights: Union[Sequence[float], Sequence[Sequence[float]], Dict[str, Sequence[float]], None],
+    levels: int,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    档位权重转为 (输出列名, shape (k, levels) 的权重矩阵)
+
+    与 sweep 相同，权重按 levels 截取前几档。
+
+    Args:
+        weights: 单个权重向量、k 个权重向量组成的矩阵，或 {名称: 权重向量}
+        levels: 档位数
+
+    Returns:
+        列名为 ofi_{名称}（dict）或 ofi_w0..ofi_w{k-1}（向量/矩阵）
+    """
+    if weights is None:
+        return [], np.zeros((0, levels))
+    if isinstance(weights, dict):
+        names = [f"ofi_{k}" for k in weights]
+        rows = [np.asarray(w, dtype=float) for w in weights.values()]
+    else:
+        # 单个向量或向量列表（各向量长度可以不同，截取前 levels 档）
+        if len(weights) and np.ndim(weights[0]) == 0:
+            weights = [weights]
+        rows = [np.asarray(w, dtype=float) for w in weights]
+        names = [f"ofi_w{j}" for j in range(len(rows))]
+    short = {name: w.shape for name, w in zip(names, rows) if w.ndim != 1 or len(w) < levels}
+    if short:
+        raise ValueError(f"weight vectors need at least levels={levels} entries, got {short}")
+    mat = np.array([w[:levels] for w in rows]).reshape(len(rows), levels)
+    clash = set(names) & set(_variant_reserved(levels))
+    if clash:
+        raise ValueError(f"weight names clash with OFI columns: {sorted(clash)}")
+    return names, mat
+
+
+def _variant_reserved(levels: int) -> List[str]:
+    """OFI 核心与归一化/积分变体占用的列名"""
+    return ([f"ofi{i}" for i in range(1, levels + 1)] + ["ofi"]
+            + [f"ofi{i}_norm" for i in range(1, levels + 1)] + ["ofi_norm", "ofi_int"])
+
+
+def fit_integrated_loadings(level_ofi: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+    """
+    积分 OFI 的档位载荷：深度归一化分档 OFI 的第一主成分
+
+    每个标的用其历史（如全部分钟的 ofi{i}_norm）拟合一次；载荷按 L1 范数归一，
+    符号取载荷和为正，因此 ofi_int = Σ_i w_i · ofi{i}_norm 与总 OFI 同向、量纲相同。
+
+    Args:
+        level_ofi: shape (n, levels) 的分档归一化 OFI；含非有限值的行被忽略
+
+    Returns:
+        shape (levels,) 的载荷
+    """
+    x = np.asarray(level_ofi, dtype=float)
+    x = x[np.isfinite(x).all(axis=1)]
+    if len(x) < 2:
+        raise ValueError(f"need at least 2 finite rows to fit PCA loadings, got {len(x)}")
+    _, vecs = np.linalg.eigh(np.cov(x, rowvar=False))
+    w = vecs[:, -1]
+    if w.sum() < 0:
+        w = -w
+    return w / np.abs(w).sum()
+
+
+def _price_array(s: pd.Series) -> np.ndarray:
+    """价格列转 numpy：整数档位保持整数（精确比较），其余转 float64"""
+    if pd.api.types.is_integer_dtype(s.dtype):
+        return s.to_numpy()
+    return s.to_numpy(dtype=float)
+
+
+def compute_ofi_per_tick(
+    df: pd.DataFrame,
+    levels: int = 5,
+    dtype=None,
+    weights=None,
+    normalize: bool = False,
+    loadings: Optional[Sequence[float]] = None,
+) -> pd.DataFrame:
     """
     计算每个tick的OFI（Order Flow Imbalance）
     
@@ -52,39 +158,62 @@ def compute_ofi_per_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
     - 卖方OFI (Δa): 如果ask价格下降，加卖量；价格不变，加卖量变化；价格上升，减前一tick卖量
     - OFI_i = Δb_i - Δa_i
     
+    价格比较、量差与档位求和都在 float64 下进行，只有输出的 OFI 列按 dtype 存储。
+    报价为整数价格档位（io.prices_to_ticks）时价格比较直接在整数上进行，不转浮点。
+
+    OFI 变体在同一次遍历中由分档 OFI 矩阵 (n, levels) 得到，不重新比较盘口：
+    - 加权总 OFI：分档 OFI 矩阵乘以权重矩阵，多组权重一次算出
+    - 深度归一化 OFI：分档 OFI 除以当前快照 L1-L{levels} 买卖平均深度
+      Σ_i (b{i}_v + a{i}_v) / (2·levels)，深度为 0 时记 0
+    - 积分 OFI：归一化分档 OFI 按 PCA 载荷（fit_integrated_loadings）加权
+    
     Args:
-        df: 输入DataFrame，需要包含 b{i}_p, b{i}_v, a{i}_p, a{i}_v 列
+        df: 输入DataFrame，需要包含 b{i}_p, b{i}_v, a{i}_p, a{i}_v 列；
+            价格列可为浮点价格或整数档位
         levels: 使用的深度档位，默认5档
+        dtype: OFI 列的精度，"float64"（默认）或 "float32"
+        weights: 档位权重向量、矩阵或 {名称: 向量}（见 weight_matrix），输出加权总 OFI
+        normalize: 是否输出深度归一化的 ofi{i}_norm 与 ofi_norm
+        loadings: 每标的拟合一次的 PCA 载荷，shape (levels,)，输出积分 OFI ofi_int
     
     Returns:
-        添加了 ofi1, ofi2, ..., ofi{levels}, ofi 列的DataFrame
+        添加了 ofi1, ofi2, ..., ofi{levels}, ofi 列（及所选变体列）的DataFrame
     """
+    weight_names, weight_mat = weight_matrix(weights, levels)
     out = df.copy()
+    n = len(out)
+    want_norm = normalize or loadings is not None
+    depth = np.zeros(n)
 
     for i in range(1, levels + 1):
-        bp = out[_col(i, "b", "p")].astype(float)
-        ap = out[_col(i, "a", "p")].astype(float)
-        bv = out[_col(i, "b", "v")].astype(float)
-        av = out[_col(i, "a", "v")].astype(float)
-
-        bp_prev = bp.shift(1)
-        ap_prev = ap.shift(1)
-        bv_prev = bv.shift(1)
-        av_prev = av.shift(1)
-
-        # Δb_i: 买方订单流变化
-        db = np.where(
-            bp > bp_prev, bv,
-            np.where(bp == bp_prev, bv - bv_prev, -bv_prev)
-        )
-
-        # Δa_i: 卖方订单流变化
-        da = np.where(
-            ap < ap_prev, av,
-            np.where(ap == ap_prev, av - av_prev, -av_prev)
-        )
-
-        ofi_i = db - da
+        bp = _price_array(out[_col(i, "b", "p")])
+        ap = _price_array(out[_col(i, "a", "p")])
+        bv = out[_col(i, "b", "v")].to_numpy(dtype=float)
+        av = out[_col(i, "a", "v")].to_numpy(dtype=float)
+        if want_norm:
+            depth += bv + av
+
+        # 当前 tick 与上一 tick 对齐比较（[1:] 对 [:-1]），首行没有上一 tick，记为 NaN
+        ofi_i = np.full(n, np.nan)
+        if n > 1:
+            bp_cur, bp_prev = bp[1:], bp[:-1]
+            ap_cur, ap_prev = ap[1:], ap[:-1]
+            bv_cur, bv_prev = bv[1:], bv[:-1]
+            av_cur, av_prev = av[1:], av[:-1]
+
+            # Δb_i: 买方订单流变化
+            db = np.where(
+                bp_cur > bp_prev, bv_cur,
+                np.where(bp_cur == bp_prev, bv_cur - bv_prev, -bv_prev)
+            )
+
+            # Δa_i: 卖方订单流变化
+            da = np.where(
+                ap_cur < ap_prev, av_cur,
+                np.where(ap_cur == ap_prev, av_cur - av_prev, -av_prev)
+            )
+
+            ofi_i[1:] = db - da
         out[f"ofi{i}"] = ofi_i
 
     # 汇总所有档位的OFI
@@ -93,13 +222,45 @@ def compute_ofi_per_tick(df: pd.DataFrame, levels: int = 5) -> pd.DataFrame:
 
     # 第一行填 0.0（因为没有前一tick）
     out[ofi_cols + ["ofi"]] = out[ofi_cols + ["ofi"]].replace([np.inf, -np.inf], np.nan).fillna(0.0)
+    out_cols = ofi_cols + ["ofi"]
+
+    if len(weight_names) or want_norm:
+        level_mat = out[ofi_cols].to_numpy(dtype=np.float64)
+        variants = {}
+        for name, w in zip(weight_names, weight_mat):
+            variants[name] = level_mat @ w
+        if want_norm:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                norm_mat = level_mat / (depth / (2 * levels))[:, None]
+            norm_mat[~np.isfinite(norm_mat)] = 0.0
+            if normalize:
+                for i in range(levels):
+                    variants[f"ofi{i + 1}_norm"] = norm_mat[:, i]
+                variants["ofi_norm"] = norm_mat.sum(axis=1)
+            if loadings is not None:
+                w = np.asarray(loadings, dtype=float)
+                if w.shape != (levels,):
+                    raise ValueError(f"loadings shape {w.shape} != ({levels},)")
+                variants["ofi_int"] = norm_mat @ w
+        for name, values in variants.items():
+            out[name] = values
+        out_cols += list(variants)
+
+    dtype = resolve_dtype(dtype)
+    if dtype != np.float64:
+        out[out_cols] = out[out_cols].astype(dtype)
     return out
 
 
 def compute_ofi_minute(
     df: pd.DataFrame, 
     levels: int = 5,
-    add_features: bool = True
+    add_features: bool = True,
+    dtype=None,
+    tick_size: float = None,
+    weights=None,
+    normalize: bool = False,
+    loadings: Optional[Sequence[float]] = None,
 ) -> pd.DataFrame:
     """
     计算分钟级别OFI特征
@@ -113,6 +274,11 @@ def compute_ofi_minute(
         df: tick级别的LOB数据
         levels: OFI计算使用的档位数
         add_features: 是否添加额外特征
+        dtype: 输出精度，"float64"（默认）或 "float32"；tick 级计算与分钟求和
+               仍在 float64 下进行，只在最后转换
+        tick_size: 报价为整数档位时换算 mid/spread 的最小报价单位，
+                   默认取 df.attrs["tick_size"]；浮点价格时忽略
+        weights, normalize, loadings: OFI 变体（见 compute_ofi_per_tick），变体列同样按分钟求和
     
     Returns:
         分钟级别的OFI特征DataFrame
@@ -122,12 +288,12 @@ def compute_ofi_minute(
         df = ensure_datetime_index(df)
     
     # 计算tick级别OFI
-    df_ofi = compute_ofi_per_tick(df, levels=levels)
+    df_ofi = compute_ofi_per_tick(df, levels=levels, weights=weights, normalize=normalize, loadings=loadings)
     
     # 分钟聚合
     df_ofi["minute"] = df_ofi.index.floor("min")
     
-    ofi_cols = [f"ofi{i}" for i in range(1, levels + 1)] + ["ofi"]
+    ofi_cols = [c for c in df_ofi.columns if c.startswith("ofi")]
     
     # 基础聚合：OFI求和
     result = df_ofi.groupby("minute")[ofi_cols].sum()
@@ -136,22 +302,28 @@ def compute_ofi_minute(
         # 添加额外特征
         g = df_ofi.groupby("minute")
         
-        # 中间价和价差
-        mid = (df_ofi["a1_p"] + df_ofi["b1_p"]) / 2.0
-        spread = df_ofi["a1_p"] - df_ofi["b1_p"]
+        # 中间价和价差（整数档位按 tick_size 换算回价格单位）
+        scale = price_scale(df, tick_size)
+        mid = (df_ofi["a1_p"] + df_ofi["b1_p"]) / 2.0 * scale
+        spread = (df_ofi["a1_p"] - df_ofi["b1_p"]) * scale
         
         result["mid_last"] = g.apply(lambda x: mid.loc[x.index].iloc[-1])
         result["spread_mean"] = g.apply(lambda x: spread.loc[x.index].mean())
         result["spread_median"] = g.apply(lambda x: spread.loc[x.index].median())
         result["n_ticks"] = g.size()
     
+    dtype = resolve_dtype(dtype)
+    if dtype != np.float64:
+        float_cols = [c for c in result.columns if c != "n_ticks"]
+        result[float_cols] = result[float_cols].astype(dtype)
     return result
 
 
 def aggregate_to_minute(
     ofi_tick: pd.DataFrame, 
     bar: str = "1min", 
-    agg: str = "sum"
+    agg: str = "sum",
+    dtype=None
 ) -> pd.DataFrame:
     """
     将tick级别OFI聚合到指定时间周期
@@ -160,18 +332,24 @@ def aggregate_to_minute(
         ofi_tick: 包含OFI列的tick数据
         bar: 时间周期，如 "1min", "5min"
         agg: 聚合方式，"sum" 或 "mean"
+        dtype: 输出精度，默认与输入的 OFI 列相同；累加总在 float64 下进行
     
     Returns:
         聚合后的DataFrame
     """
     cols = [c for c in ofi_tick.columns if c.startswith("ofi")]
+    if dtype is None and cols and all(ofi_tick[c].dtype == np.float32 for c in cols):
+        dtype = np.float32
+    dtype = resolve_dtype(dtype)
+    # float32 输入先升为 float64 再累加，避免分钟内求和的舍入误差累积
+    values = ofi_tick[cols].astype(np.float64)
     
     if agg == "sum":
-        res = ofi_tick[cols].resample(bar).sum()
+        res = values.resample(bar).sum()
     elif agg == "mean":
-        res = ofi_tick[cols].resample(bar).mean()
+        res = values.resample(bar).mean()
     else:
         raise ValueError(f"Unsupported agg={agg}")
 
     res = res.dropna(how="all")
-    return res
+    return res.astype(dtype) if dtype != np.float64 else res
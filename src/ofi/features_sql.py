@@ -0,0 +1,150 @@
+"""
+在 DuckDB 中计算分钟 OFI
+
+把 compute_ofi_per_tick 的逐档规则写成窗口函数（LAG 取上一 tick 的价与量，
+三分支 CASE 比较），分钟聚合写成 GROUP BY，一条查询直接扫描一个标的
+多个交易日（如一整年）的 processed parquet，不为每一天构造 pandas DataFrame。
+
+输出与 scripts/build_ofi_features.py（ensure_datetime_index -> compute_ofi_per_tick
+-> aggregate_to_minute）逐日一致：
+- 上一 tick 取同一交易日内按 (ts, 文件行号) 排序的前一行，首行及缺失值的 OFI 记为 0
+- agg="sum" 时每日从第一个到最后一个 bar 的每个 bar 都输出，无 tick 的 bar（如午休）为 0，
+  与 resample(bar).sum() 相同；agg="mean" 时只输出有 tick 的 bar
+
+DuckDB 为可选依赖（pip install duckdb）。
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import pandas as pd
+
+AGGS = ("sum", "mean")
+
+
+def _bar_seconds(bar: str) -> int:
+    """bar 周期的秒数；须整除一天，保证分桶与 pandas resample 的日内对齐一致"""
+    seconds = pd.Timedelta(bar).total_seconds()
+    if seconds <= 0 or seconds != int(seconds) or 86400 % int(seconds) != 0:
+        raise ValueError(f"bar={bar} must be a whole number of seconds dividing one day")
+    return int(seconds)
+
+
+def _sql_str(s: str) -> str:
+    return "'" + str(s).replace("'", "''") + "'"
+
+
+def _side_flow(side: str, level: int) -> str:
+    """单档单边的订单流变化（买方 Δb / 卖方 Δa）"""
+    p, v = f"{side}{level}_p", f"{side}{level}_v"
+    better = ">" if side == "b" else "<"
+    return (f"CASE WHEN {p} {better} LAG({p}) OVER w THEN {v} "
+            f"WHEN {p} = LAG({p}) OVER w THEN {v} - LAG({v}) OVER w "
+            f"ELSE -LAG({v}) OVER w END")
+
+
+def ofi_minute_sql(files: Sequence[Tuple[str, Path]], levels: int = 5,
+                   bar: str = "1min", agg: str = "sum") -> str:
+    """
+    生成分钟 OFI 查询
+
+    Args:
+        files: [(date_str, processed parquet 路径), ...]，同一标的
+        levels: 档位数
+        bar: 聚合周期，如 "1min", "5min"
+        agg: "sum" 或 "mean"
+
+    Returns:
+        SQL；结果列为 date, ts（bar 起点）, ofi1..ofi{levels}, ofi，按 date, ts 排序
+    """
+    if agg not in AGGS:
+        raise ValueError(f"Unsupported agg={agg}")
+    step = f"INTERVAL {_bar_seconds(bar)} SECOND"
+    ofi_cols = [f"ofi{i}" for i in range(1, levels + 1)] + ["ofi"]
+    book_cols = [f"{s}{i}_{k}" for i in range(1, levels + 1) for s in "ab" for k in "pv"]
+
+    paths = ", ".join(_sql_str(p) for _, p in files)
+    dates = ", ".join(f"({_sql_str(p)}, {_sql_str(d)})" for d, p in files)
+    # 单档 OFI = Δb - Δa；任一项缺失（首行）时为 0，与 pandas 的 fillna(0) 一致
+    level_ofi = [f"COALESCE(({_side_flow('b', i)}) - ({_side_flow('a', i)}), 0) AS ofi{i}"
+                 for i in range(1, levels + 1)]
+    total = " + ".join(f"ofi{i}" for i in range(1, levels + 1))
+    func = "SUM" if agg == "sum" else "AVG"
+    bar_aggs = ", ".join(f"{func}({c}) AS {c}" for c in ofi_cols)
+
+    sql = f"""
+WITH day_files(filename, date) AS (VALUES {dates}),
+src AS (
+    SELECT f.date, t.ts, t.file_row_number, {", ".join("t." + c for c in book_cols)}
+    FROM read_parquet([{paths}], filename = true, file_row_number = true) t
+    JOIN day_files f USING (filename)
+    WHERE t.ts IS NOT NULL
+),
+level_ofi AS (
+    SELECT date, ts, {", ".join(level_ofi)}
+    FROM src
+    WINDOW w AS (PARTITION BY date ORDER BY ts, file_row_number)
+),
+ticks AS (
+    SELECT *, {total} AS ofi FROM level_ofi
+),
+bars AS (
+    SELECT date, time_bucket({step}, ts) AS ts, {bar_aggs}
+    FROM ticks
+    GROUP BY date, time_bucket({step}, ts)
+)"""
+    if agg == "mean":
+        return sql + f"\nSELECT date, ts, {', '.join(ofi_cols)} FROM bars ORDER BY date, ts"
+
+    # sum：补齐每日首末 bar 之间没有 tick 的 bar
+    filled = ", ".join(f"COALESCE(b.{c}, 0) AS {c}" for c in ofi_cols)
+    return sql + f""",
+grid AS (
+    SELECT date, UNNEST(generate_series(MIN(ts), MAX(ts), {step})) AS ts
+    FROM bars
+    GROUP BY date
+)
+SELECT g.date, g.ts, {filled}
+FROM grid g
+LEFT JOIN bars b USING (date, ts)
+ORDER BY g.date, g.ts"""
+
+
+def compute_ofi_minute_duckdb(
+    files: Sequence[Tuple[str, Path]],
+    levels: int = 5,
+    bar: str = "1min",
+    agg: str = "sum",
+    con=None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    一条查询计算一个标的多日的分钟 OFI
+
+    Args:
+        files: [(date_str, processed parquet 路径), ...]，同一标的（通常为一整年）
+        levels: 档位数
+        bar: 聚合周期
+        agg: "sum" 或 "mean"
+        con: duckdb 连接，默认新建内存连接
+
+    Returns:
+        {date_str: DataFrame}，index 为 bar 起点 ts，列为 ofi1..ofi{levels}, ofi；
+        与 build_ofi_features.py 的 process_one_day 输出一致
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("engine=duckdb requires: pip install duckdb") from e
+    if not files:
+        return {}
+    con = con or duckdb.connect()
+    table = con.execute(ofi_minute_sql(files, levels, bar, agg)).fetch_arrow_table()
+    df = table.to_pandas()
+
+    ofi_cols: List[str] = [f"ofi{i}" for i in range(1, levels + 1)] + ["ofi"]
+    out = {}
+    for date_str, day in df.groupby("date", sort=False):
+        day = day.set_index("ts")[ofi_cols]
+        day.index = pd.DatetimeIndex(day.index, name="ts")
+        out[date_str] = day
+    return out
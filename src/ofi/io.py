@@ -4,9 +4,12 @@ LOB数据读写模块
 from __future__ import annotations
 
 from pathlib import Path
+import os
 import re
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 
 PX_COLS = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
@@ -16,6 +19,114 @@ OPTIONAL_COLS = ["maybe_truncated"]
 
 REQUIRED_COLS = BASE_COLS + PX_COLS + VOL_COLS
 
+# 整数价格档位：L1-L5 报价存为 round(price / tick_size) 的 int32，
+# tick_size 记在 DataFrame.attrs 与 parquet schema 元数据中
+DEFAULT_TICK_SIZE = 0.001          # 交易所 ETF 最小报价单位
+TICK_SIZE_KEY = "tick_size"
+TICK_SIZE_META = b"ofi.tick_size"
+
+
+def tick_size_for(symbol: str, tick_sizes: dict | None = None, default: float = DEFAULT_TICK_SIZE) -> float:
+    """标的的最小报价单位：tick_sizes 中有则用之，否则取默认值"""
+    return float((tick_sizes or {}).get(symbol, default))
+
+
+def prices_to_ticks(
+    df: pd.DataFrame,
+    tick_size: float = DEFAULT_TICK_SIZE,
+    cols: list[str] | None = None,
+    tolerance: float = 0.01,
+) -> pd.DataFrame:
+    """
+    把报价列转为整数价格档位（int32）
+
+    CSV 中 3.2549999 之类的浮点误差会被四舍五入到最近的档位；偏离档位超过
+    tolerance 个 tick（通常是 tick_size 配错）或含缺失值时报错，不做静默取整。
+
+    Args:
+        df: LOB数据
+        tick_size: 最小报价单位
+        cols: 报价列，默认 PX_COLS 中存在的列
+        tolerance: 允许偏离档位的比例（以 tick 计）
+
+    Returns:
+        报价列为 int32 的副本，attrs["tick_size"] 记录 tick_size
+    """
+    cols = [c for c in PX_COLS if c in df.columns] if cols is None else cols
+    px = df[cols].to_numpy(dtype=float)
+    if np.isnan(px).any():
+        raise ValueError(f"Cannot convert missing prices to ticks ({int(np.isnan(px).any(axis=1).sum())} rows)")
+    scaled = px / tick_size
+    ticks = np.rint(scaled)
+    off_grid = np.abs(scaled - ticks) > tolerance
+    if off_grid.any():
+        r, c = np.argwhere(off_grid)[0]
+        raise ValueError(f"{int(off_grid.sum())} prices are off the tick_size={tick_size} grid "
+                         f"(e.g. {cols[c]}={px[r, c]})")
+    if np.abs(ticks).max(initial=0) >= np.iinfo(np.int32).max:
+        raise ValueError(f"Prices too large for int32 ticks at tick_size={tick_size}")
+
+    out = df.copy()
+    for j, c in enumerate(cols):
+        out[c] = ticks[:, j].astype(np.int32)
+    out.attrs[TICK_SIZE_KEY] = float(tick_size)
+    return out
+
+
+def price_scale(df: pd.DataFrame, tick_size: float | None = None) -> float:
+    """
+    报价列乘以该系数得到价格：整数档位时为 tick_size，浮点价格时为 1
+
+    Args:
+        df: LOB数据
+        tick_size: 显式指定；默认取 attrs["tick_size"]，再否则 DEFAULT_TICK_SIZE
+    """
+    if "a1_p" not in df.columns or not pd.api.types.is_integer_dtype(df["a1_p"].dtype):
+        return 1.0
+    if tick_size is not None:
+        return float(tick_size)
+    return float(df.attrs.get(TICK_SIZE_KEY, DEFAULT_TICK_SIZE))
+
+
+def ticks_to_prices(df: pd.DataFrame, tick_size: float | None = None, cols: list[str] | None = None) -> pd.DataFrame:
+    """整数档位转回浮点价格（已是浮点价格时原样返回）"""
+    scale = price_scale(df, tick_size)
+    if scale == 1.0:
+        return df
+    cols = [c for c in PX_COLS if c in df.columns] if cols is None else cols
+    out = df.copy()
+    for c in cols:
+        out[c] = out[c].to_numpy() * scale
+    out.attrs.pop(TICK_SIZE_KEY, None)
+    return out
+
+
+def read_tick_size(path: Path) -> float | None:
+    """parquet 文件元数据中记录的 tick_size；浮点价格文件返回 None"""
+    meta = pq.read_schema(path).metadata or {}
+    value = meta.get(TICK_SIZE_META)
+    return float(value) if value is not None else None
+
+
+def read_processed(path: Path, columns: list[str] | None = None) -> pd.DataFrame:
+    """读取 processed parquet；整数档位文件的 tick_size 恢复到 attrs"""
+    df = pd.read_parquet(path, columns=columns)
+    tick_size = read_tick_size(path)
+    if tick_size is not None:
+        df.attrs[TICK_SIZE_KEY] = tick_size
+    return df
+
+
+def write_processed(df: pd.DataFrame, path: Path):
+    """写出 processed parquet；整数档位时把 tick_size 写入 schema 元数据"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tick_size = df.attrs.get(TICK_SIZE_KEY)
+    if tick_size is not None:
+        meta = dict(table.schema.metadata or {})
+        meta[TICK_SIZE_META] = repr(float(tick_size)).encode()
+        table = table.replace_schema_metadata(meta)
+    pq.write_table(table, path)
+
 def _clean_time_to_digits(s: pd.Series) -> pd.Series:
     # time 可能是 float(20210324093000.0)，也可能带非数字
     x = s.astype(str)
@@ -60,7 +171,24 @@ def _parse_ts(df: pd.DataFrame) -> pd.Series:
     return ts
 
 
-def read_raw_lob_csv(path: Path, default_symbol: str | None = None, default_date: str | None = None) -> pd.DataFrame:
+def read_raw_lob_csv(
+    path: Path,
+    default_symbol: str | None = None,
+    default_date: str | None = None,
+    drop_invalid: bool = True,
+) -> pd.DataFrame:
+    """
+    读取原始五档 csv.gz，补全 code/date、解析时间戳并按时间排序
+
+    Args:
+        path: 原始文件路径
+        default_symbol: 文件缺 code 列时使用的标的代码
+        default_date: 文件缺 date 列时使用的日期
+        drop_invalid: 是否丢弃任一档价格缺失或非正的快照；QC 统计原始质量时传 False
+
+    Returns:
+        快照 DataFrame（ts 列在最前）
+    """
     df = pd.read_csv(path, compression="gzip")
     df.columns = [c.strip().lower() for c in df.columns]
 
@@ -98,9 +226,10 @@ def read_raw_lob_csv(path: Path, default_symbol: str | None = None, default_date
     if "maybe_truncated" not in df.columns:
         df["maybe_truncated"] = np.nan
     
-    px_cols = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
-    valid = df[px_cols].notna().all(axis=1) & (df[px_cols] > 0).all(axis=1)
-    df = df.loc[valid].copy()
+    if drop_invalid:
+        px_cols = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
+        valid = df[px_cols].notna().all(axis=1) & (df[px_cols] > 0).all(axis=1)
+        df = df.loc[valid].copy()
 
     return df
 
@@ -113,7 +242,70 @@ def raw_path(root: Path, year: int, symbol: str, date_str: str) -> Path:
 def processed_path(root: Path, symbol: str, date_str: str) -> Path:
     return root / "ticks" / symbol / date_str / "part.parquet"
 
-def convert_one_day(raw_file: Path, processed_root: Path) -> Path:
+
+def in_date_range(date_str: str, start: str | None = None, end: str | None = None) -> bool:
+    """YYYY-MM-DD 字符串区间判断（闭区间，None 表示不限）"""
+    if start is not None and date_str < start:
+        return False
+    if end is not None and date_str > end:
+        return False
+    return True
+
+
+def list_day_files(
+    symbol_dir: Path,
+    start: str | None = None,
+    end: str | None = None,
+    layout: str = "file",
+) -> list[tuple[str, Path]]:
+    """
+    列出单个标的目录下日期区间内的日文件
+    
+    只按目录项名称判断日期，区间外的文件不会被 stat 或打开。
+    
+    Args:
+        symbol_dir: 标的目录，如 data/features/ofi_minute/510050.XSHG
+        start: 开始日期 YYYY-MM-DD（含）
+        end: 结束日期 YYYY-MM-DD（含）
+        layout: "file" 表示 {date}.parquet；"dir" 表示 {date}/part.parquet
+    
+    Returns:
+        按日期排序的 [(date_str, path), ...]
+    """
+    symbol_dir = Path(symbol_dir)
+    if not symbol_dir.exists():
+        return []
+    
+    out = []
+    for name in os.listdir(symbol_dir):
+        if layout == "file":
+            if not name.endswith(".parquet"):
+                continue
+            date_str = name[:-len(".parquet")]
+            if in_date_range(date_str, start, end):
+                out.append((date_str, symbol_dir / name))
+        elif layout == "dir":
+            if in_date_range(name, start, end):
+                part = symbol_dir / name / "part.parquet"
+                if part.exists():
+                    out.append((name, part))
+        else:
+            raise ValueError(f"Unknown layout={layout}")
+    
+    return sorted(out)
+
+def convert_one_day(raw_file: Path, processed_root: Path, tick_size: float | None = None) -> Path:
+    """
+    单日 raw csv.gz 转为 processed parquet
+
+    Args:
+        raw_file: raw 文件，如 .../raw_ticks/2021/159915.XSHE/2021-01-04.csv.gz
+        processed_root: processed 根目录
+        tick_size: 给出时 L1-L5 报价存为整数价格档位（见 prices_to_ticks）
+
+    Returns:
+        输出路径
+    """
     # raw_file: .../raw_ticks/2021/159915.XSHE/2021-01-04.csv.gz
     symbol = raw_file.parent.name                      # 159915.XSHE
     date_str = raw_file.stem.split(".")[0]             # 2021-01-04  (stem: "2021-01-04.csv")
@@ -126,9 +318,12 @@ def convert_one_day(raw_file: Path, processed_root: Path) -> Path:
     symbol = df["code"].iloc[0]
     date_str = df["date"].iloc[0]
 
+    if tick_size is not None:
+        df = prices_to_ticks(df, tick_size)
+
     out = processed_path(processed_root, symbol, date_str)
     out.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(out, index=False)
+    write_processed(df, out)
     return out
 
 
@@ -153,7 +348,7 @@ def load_processed_day(symbol: str, date_str: str, root: Path = None) -> pd.Data
     if not path.exists():
         raise FileNotFoundError(f"Processed data not found: {path}")
     
-    return pd.read_parquet(path)
+    return read_processed(path)
 
 
 def load_ofi_features(symbol: str, date_str: str, root: Path = None) -> pd.DataFrame:
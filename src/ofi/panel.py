@@ -0,0 +1,140 @@
+"""
+分钟级 OFI / 标签面板加载
+
+把多个标的、多个交易日的分钟 OFI 特征与未来收益标签一次性读入一张长表，
+供稳健性检验、回测和参数扫描等批量分析共用。
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Iterable, List, Optional
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .io import list_day_files
+from .features_ofi import resolve_dtype
+from .paths import OFI_FEATURES_DIR, LABELS_DIR, PROCESSED_TICKS_DIR
+
+
+PANEL_KEYS = ["symbol", "date", "minute"]
+
+
+def _read_label(label_file: Path) -> pd.Series:
+    """读取标签文件：优先 ret_fwd_1m，否则取第一列"""
+    label_df = pd.read_parquet(label_file)
+    if "ret_fwd_1m" in label_df.columns:
+        return label_df["ret_fwd_1m"]
+    return label_df.iloc[:, 0]
+
+
+def minute_rel_spread(tick_file: Path) -> pd.Series:
+    """
+    由 processed tick 计算每分钟最后一笔有效报价的相对点差 (a1-b1)/mid
+
+    只读取 ts, a1_p, b1_p 三列；与策略在再平衡时取最后一条快照的口径一致。
+
+    Args:
+        tick_file: processed tick parquet 路径
+
+    Returns:
+        index 为分钟（向下取整）的 rel_spread Series
+    """
+    table = pq.read_table(tick_file, columns=["ts", "a1_p", "b1_p"])
+    ts = pd.to_datetime(table.column("ts").to_numpy())
+    a1 = table.column("a1_p").to_numpy().astype(float)
+    b1 = table.column("b1_p").to_numpy().astype(float)
+
+    valid = (a1 > 0) & (b1 > 0) & (a1 > b1)
+    if not valid.any():
+        return pd.Series(dtype=float, name="rel_spread")
+    mid = (a1[valid] + b1[valid]) / 2.0
+    rel = pd.Series((a1[valid] - b1[valid]) / mid, index=ts[valid].floor("min"), name="rel_spread")
+    return rel.groupby(level=0).last()
+
+
+def load_minute_panel(
+    symbols: Iterable[str],
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    allowed: Optional[set] = None,
+    feature_cols: Optional[List[str]] = None,
+    ofi_root: Path = None,
+    label_root: Path = None,
+    with_spread: bool = False,
+    processed_root: Path = None,
+    dtype=None,
+) -> pd.DataFrame:
+    """
+    加载分钟级面板（长表）
+
+    Args:
+        symbols: 标的列表
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        allowed: QC可用的 {(symbol, date)} 集合，None 表示不过滤
+        feature_cols: 读取的特征列，默认 ["ofi"]
+        ofi_root: 分钟OFI根目录，默认 paths.OFI_FEATURES_DIR
+        label_root: 标签根目录，默认 paths.LABELS_DIR
+        with_spread: 是否附加 rel_spread 列（由 processed tick 计算，缺失为 NaN）
+        processed_root: processed tick 根目录，默认 paths.PROCESSED_TICKS_DIR
+        dtype: 数值列精度，如 "float32"（见 features_ofi.resolve_dtype）；None 保持文件中的类型
+
+    Returns:
+        DataFrame，列为 symbol, date, minute, <feature_cols>, ret[, rel_spread]；
+        按 symbol, minute 排序，只保留特征与标签都存在的分钟
+    """
+    ofi_root = OFI_FEATURES_DIR if ofi_root is None else Path(ofi_root)
+    label_root = LABELS_DIR if label_root is None else Path(label_root)
+    processed_root = PROCESSED_TICKS_DIR if processed_root is None else Path(processed_root)
+    feature_cols = feature_cols or ["ofi"]
+    extra_cols = ["rel_spread"] if with_spread else []
+
+    frames = []
+    for symbol in symbols:
+        label_dir = label_root / symbol
+        for date_str, ofi_file in list_day_files(ofi_root / symbol, start_date, end_date):
+            if allowed is not None and (symbol, date_str) not in allowed:
+                continue
+            label_file = label_dir / f"{date_str}.parquet"
+            if not label_file.exists():
+                continue
+
+            feat = pd.read_parquet(ofi_file, columns=feature_cols)
+            ret = _read_label(label_file)
+
+            day = feat.join(ret.rename("ret"), how="inner")
+            if len(day) == 0:
+                continue
+            if with_spread:
+                tick_file = processed_root / symbol / date_str / "part.parquet"
+                spread = minute_rel_spread(tick_file) if tick_file.exists() else pd.Series(dtype=float)
+                day["rel_spread"] = spread.reindex(day.index).to_numpy(dtype=float)
+            day.index.name = "minute"
+            day = day.reset_index()
+            day.insert(0, "date", date_str)
+            day.insert(0, "symbol", symbol)
+            frames.append(day)
+
+    if not frames:
+        return pd.DataFrame(columns=PANEL_KEYS + feature_cols + ["ret"] + extra_cols)
+
+    panel = pd.concat(frames, ignore_index=True)
+    panel["minute"] = pd.to_datetime(panel["minute"])
+    panel = panel.sort_values(["symbol", "minute"], kind="mergesort").reset_index(drop=True)
+    if dtype is not None:
+        value_cols = feature_cols + ["ret"] + extra_cols
+        panel[value_cols] = panel[value_cols].astype(resolve_dtype(dtype))
+    return panel
+
+
+def to_wide(panel: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    """
+    长表转宽表（时间 × 标的）
+
+    Args:
+        panel: load_minute_panel 的输出
+        value_col: 取值列
+
+    Returns:
+        index 为 minute、columns 为 symbol 的 DataFrame
+    """
+    return panel.pivot_table(index="minute", columns="symbol", values=value_col, aggfunc="last").sort_index()
@@ -9,3 +9,4 @@ RAW_TICKS_DIR = DATA_DIR / "raw" / "ticks"
 OFI_FEATURES_DIR = DATA_DIR / "features" / "ofi_minute"
 LABELS_DIR = DATA_DIR / "labels" / "minute_returns"
 REPORTS_DIR = ROOT / "reports"
+QC_STORE_PATH = DATA_DIR / "features" / "qc_all.parquet"
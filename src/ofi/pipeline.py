@@ -3,20 +3,26 @@ OFI Research Pipeline - 完整评估流程
 """
 from __future__ import annotations
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Dict
 import pandas as pd
 import numpy as np
 import yaml
 import json
 from datetime import datetime
 
-from .paths import OFI_FEATURES_DIR, LABELS_DIR, REPORTS_DIR, PROCESSED_TICKS_DIR
-from .io import load_ofi_features
-from .clean import qc_parquet_file
+from .paths import OFI_FEATURES_DIR, LABELS_DIR, PROCESSED_TICKS_DIR, QC_STORE_PATH
+from .io import list_day_files, in_date_range
+from .qc import refresh_qc_store, load_qc_store
+from .scheduler import TaskGraph
+from .profiling import StageProfiler, profile_session
+from .panel import load_minute_panel
+from .store import STORE_DIR, build_feature_store, open_feature_store
+from .prefetch import prefetch
+from .backtest import run_backtest
+from .sweep import expand_grid, sample_grid, run_sweep
 from .evaluate import (
-    compute_ic, ic_summary, compute_quantile_returns,
-    regression_analysis, classification_analysis,
-    subsample_analysis, walk_forward_cv
+    compute_rank_ic, regression_analysis, classification_analysis,
+    add_subsample_groups, panel_subsample_ic, walk_forward_ols
 )
 
 
@@ -29,42 +35,80 @@ def load_config(config_path: str) -> dict:
 def load_universe(universe_path: str) -> List[str]:
     """加载标的池"""
     config = load_config(universe_path)
-    return config.get('symbols', [])
+    return config.get('universe', config.get('symbols', []))
 
 
-def quality_check_task(symbols: List[str], outdir: Path, verbose: bool = False):
+def load_day_filters(universe_path: str) -> Dict[str, float]:
+    """加载日级别质量过滤阈值（universe.yaml 中的 filters 块）"""
+    config = load_config(universe_path)
+    return config.get('filters') or {}
+
+
+def build_eligibility(qc_df: pd.DataFrame, filters: Dict[str, float]) -> pd.Series:
+    """
+    根据QC表和阈值构建 (symbol, date) 日级别可用性索引
+    
+    Args:
+        qc_df: QC表，需包含 symbol, date 及过滤涉及的指标列
+        filters: {"<列名>_max": 阈值, "<列名>_min": 阈值}
+    
+    Returns:
+        bool Series，MultiIndex 为 (symbol, date)
+    """
+    ok = pd.Series(True, index=qc_df.index)
+    
+    for key, threshold in filters.items():
+        if key.endswith("_max"):
+            col, op = key[:-4], "max"
+        elif key.endswith("_min"):
+            col, op = key[:-4], "min"
+        else:
+            raise ValueError(f"Unknown filter '{key}', expected <column>_max or <column>_min")
+        
+        if col not in qc_df.columns:
+            raise ValueError(f"Filter '{key}' refers to missing QC column '{col}'")
+        
+        # NaN 比较结果为 False，指标缺失的交易日同样视为不合格
+        if op == "max":
+            ok &= qc_df[col] <= threshold
+        else:
+            ok &= qc_df[col] >= threshold
+    
+    return pd.Series(ok.values, index=pd.MultiIndex.from_arrays(
+        [qc_df["symbol"].astype(str), qc_df["date"].astype(str)], names=["symbol", "date"]
+    ))
+
+
+def _eligible_days(eligible: Optional[pd.Series]) -> Optional[set]:
+    """可用性索引 -> {(symbol, date)} 集合，None 表示不过滤"""
+    if eligible is None:
+        return None
+    return set(eligible.index[eligible.values])
+
+
+def quality_check_task(symbols: List[str], outdir: Path, verbose: bool = False,
+                       start_date: Optional[str] = None, end_date: Optional[str] = None,
+                       n_jobs: Optional[int] = None):
     """任务1: 数据质量检查"""
     print("\n" + "="*80)
     print("Task 1: Data Quality Check")
     print("="*80)
     
-    results = []
-    
-    for symbol in symbols:
-        symbol_dir = PROCESSED_TICKS_DIR / symbol
-        if not symbol_dir.exists():
-            if verbose:
-                print(f"⚠️  {symbol}: No data directory")
-            continue
-        
-        # 检查所有日期的数据
-        files = sorted(symbol_dir.glob("*/part.parquet"))
-        
-        for file_path in files:
-            try:
-                qc = qc_parquet_file(file_path)
-                results.append(qc)
-            except Exception as e:
-                if verbose:
-                    print(f"⚠️  Error in {file_path}: {e}")
-        
-        if verbose:
-            print(f"✓ {symbol}: Checked {len(files)} files")
+    # 读取持久化QC表，只对新增/修改过的交易日重新计算
+    store = refresh_qc_store(
+        QC_STORE_PATH, PROCESSED_TICKS_DIR,
+        ofi_root=OFI_FEATURES_DIR, symbols=symbols,
+        start=start_date, end=end_date, n_jobs=n_jobs, verbose=verbose
+    )
     
     # 汇总结果
-    if results:
-        qc_df = pd.DataFrame(results)
-        
+    if len(store) and "symbol" in store.columns:
+        in_range = store["date"].astype(str).map(lambda d: in_date_range(d, start_date, end_date))
+        qc_df = store[store["symbol"].isin(symbols) & in_range].reset_index(drop=True)
+    else:
+        qc_df = store
+    
+    if len(qc_df):
         # 保存详细结果
         outfile = outdir / "tables" / "quality_check_full.csv"
         outfile.parent.mkdir(parents=True, exist_ok=True)
@@ -73,11 +117,11 @@ def quality_check_task(symbols: List[str], outdir: Path, verbose: bool = False):
         # 生成摘要
         summary = {
             "total_files": len(qc_df),
-            "total_symbols": qc_df["symbol"].nunique() if "symbol" in qc_df.columns else 0,
-            "avg_rows_per_file": qc_df["n_rows"].mean(),
-            "avg_dup_ratio": qc_df["dup_ts_ratio"].mean(),
-            "avg_crossed_ratio": qc_df["crossed_ratio"].mean(),
-            "total_bad_price": qc_df["bad_price_cnt"].sum(),
+            "total_symbols": int(qc_df["symbol"].nunique()) if "symbol" in qc_df.columns else 0,
+            "avg_rows_per_file": float(qc_df["n_rows"].mean()),
+            "avg_dup_ratio": float(qc_df["dup_ts_ratio"].mean()),
+            "avg_crossed_ratio": float(qc_df["crossed_ratio"].mean()),
+            "total_bad_price": int(qc_df["bad_price_cnt"].sum()),
         }
         
         summary_file = outdir / "tables" / "quality_summary.json"
@@ -94,69 +138,153 @@ def quality_check_task(symbols: List[str], outdir: Path, verbose: bool = False):
         return None, None
 
 
-def ic_analysis_task(symbols: List[str], outdir: Path, verbose: bool = False):
-    """任务2: IC分析"""
-    print("\n" + "="*80)
-    print("Task 2: IC Analysis (Single Variable Information)")
-    print("="*80)
+def _symbol_day_files(symbol: str, allowed: Optional[set] = None,
+                      start_date: Optional[str] = None, end_date: Optional[str] = None):
+    """
+    单个标的待评估的 (date, ofi_file, label_file) 列表
     
-    ic_results = []
+    Returns:
+        (文件列表, 因QC过滤跳过的天数)；缺少OFI或标签目录时返回 (None, 0)
+    """
+    ofi_dir = OFI_FEATURES_DIR / symbol
+    label_dir = LABELS_DIR / symbol
     
-    for symbol in symbols:
-        ofi_dir = OFI_FEATURES_DIR / symbol
-        label_dir = LABELS_DIR / symbol
-        
-        if not ofi_dir.exists() or not label_dir.exists():
-            if verbose:
-                print(f"⚠️  {symbol}: Missing OFI or label data")
+    if not ofi_dir.exists() or not label_dir.exists():
+        return None, 0
+    
+    days = []
+    n_filtered = 0
+    
+    # 日期区间下推到文件发现：区间外的文件不会被打开
+    for date_str, ofi_file in list_day_files(ofi_dir, start_date, end_date):
+        # QC不合格的交易日在打开任何文件之前跳过
+        if allowed is not None and (symbol, date_str) not in allowed:
+            n_filtered += 1
             continue
         
-        # 加载所有日期的数据
-        ofi_files = sorted(ofi_dir.glob("*.parquet"))
-        
-        for ofi_file in ofi_files:
-            date_str = ofi_file.stem
-            label_file = label_dir / f"{date_str}.parquet"
-            
-            if not label_file.exists():
+        label_file = label_dir / f"{date_str}.parquet"
+        if label_file.exists():
+            days.append((date_str, ofi_file, label_file))
+    
+    return days, n_filtered
+
+
+def _load_signal_returns(ofi_file: Path, label_file: Path):
+    """加载单日OFI信号与未来收益，按分钟对齐"""
+    ofi_df = pd.read_parquet(ofi_file)
+    label_df = pd.read_parquet(label_file)
+    
+    common_idx = ofi_df.index.intersection(label_df.index)
+    
+    ofi_signal = ofi_df.loc[common_idx, "ofi"] if "ofi" in ofi_df.columns else ofi_df.loc[common_idx, "ofi1"]
+    returns = label_df.loc[common_idx, "ret_fwd_1m"] if "ret_fwd_1m" in label_df.columns else label_df.loc[common_idx].iloc[:, 0]
+    return ofi_signal, returns
+
+
+def _signal_return_days(symbol: str, allowed: Optional[set] = None,
+                        start_date: Optional[str] = None, end_date: Optional[str] = None,
+                        store_dir: Optional[str] = None):
+    """
+    单个标的待评估的交易日及其 (OFI信号, 未来收益) 加载函数
+    
+    store_dir 不为 None 时从内存映射特征库读取，否则逐日读取 parquet。
+    
+    Returns:
+        ([(date_str, loader), ...], 因QC过滤跳过的天数)；无数据时返回 (None, 0)
+    """
+    if store_dir is None:
+        days, n_filtered = _symbol_day_files(symbol, allowed, start_date, end_date)
+        if days is None:
+            return None, 0
+        return [(d, lambda o=o, l=l: _load_signal_returns(o, l)) for d, o, l in days], n_filtered
+    
+    store = open_feature_store(Path(store_dir))
+    dates = store.days(symbol, start_date, end_date)
+    if not dates:
+        return None, 0
+    signal_col = "ofi" if "ofi" in store.columns else "ofi1"
+    kept = [d for d in dates if allowed is None or (symbol, d) in allowed]
+    loaders = [(d, lambda d=d: tuple(store.day(symbol, d, [signal_col, "ret"])[c] for c in (signal_col, "ret")))
+               for d in kept]
+    return loaders, len(dates) - len(kept)
+
+
+# 逐日循环中后台预取的天数（特征库为内存映射，不需要预取）
+PREFETCH_DEPTH = 4
+
+
+def _prefetch_days(days, store_dir: Optional[str] = None):
+    """在后台线程中预取 _signal_return_days 给出的各日数据，产出 ((date_str, loader), get)"""
+    return prefetch(days, lambda day: day[1](), depth=0 if store_dir is not None else PREFETCH_DEPTH)
+
+
+def _load_panel(symbols: List[str], start_date: Optional[str], end_date: Optional[str],
+                allowed: Optional[set], feature_cols: Optional[List[str]] = None,
+                with_spread: bool = False, store_dir: Optional[str] = None,
+                dtype=None) -> pd.DataFrame:
+    """加载分钟面板：有特征库时从内存映射读取，否则逐日读取 parquet"""
+    if store_dir is not None:
+        return open_feature_store(Path(store_dir)).panel(
+            symbols, start_date, end_date, allowed=allowed,
+            feature_cols=feature_cols, with_spread=with_spread, dtype=dtype)
+    return load_minute_panel(symbols, start_date, end_date, allowed=allowed,
+                             feature_cols=feature_cols, with_spread=with_spread, dtype=dtype)
+
+
+def _ic_symbol(symbol: str, allowed: Optional[set] = None,
+               start_date: Optional[str] = None, end_date: Optional[str] = None,
+               verbose: bool = False, store_dir: Optional[str] = None) -> dict:
+    """IC分析的单标的单元：返回逐日IC记录和日志"""
+    days, n_filtered = _signal_return_days(symbol, allowed, start_date, end_date, store_dir)
+    out = {"rows": [], "n_filtered": n_filtered, "log": []}
+    
+    if days is None:
+        if verbose:
+            out["log"].append(f"⚠️  {symbol}: Missing OFI or label data")
+        return out
+    
+    days = _prefetch_days(days, store_dir)
+    for (date_str, _), get in days:
+        try:
+            ofi_signal, returns = get()
+            if len(ofi_signal) < 10:
                 continue
             
-            try:
-                # 加载数据
-                ofi_df = pd.read_parquet(ofi_file)
-                label_df = pd.read_parquet(label_file)
-                
-                # 对齐数据
-                common_idx = ofi_df.index.intersection(label_df.index)
-                if len(common_idx) < 10:
-                    continue
-                
-                ofi_signal = ofi_df.loc[common_idx, "ofi"] if "ofi" in ofi_df.columns else ofi_df.loc[common_idx, "ofi1"]
-                returns = label_df.loc[common_idx, "ret_fwd_1m"] if "ret_fwd_1m" in label_df.columns else label_df.iloc[:, 0]
-                
-                # 计算IC
-                ic_series = compute_ic(
-                    pd.DataFrame({"ofi": ofi_signal}),
-                    pd.DataFrame({"ret": returns}),
-                    method="spearman"
-                )
-                
-                if len(ic_series) > 0:
-                    ic_val = ic_series.iloc[0]
-                    
-                    ic_results.append({
-                        "symbol": symbol,
-                        "date": date_str,
-                        "ic": ic_val,
-                        "n_obs": len(common_idx)
-                    })
+            # 计算单日 Rank IC（分钟截面上的 Spearman 相关）
+            ic_val = compute_rank_ic(ofi_signal, returns)
             
-            except Exception as e:
-                if verbose:
-                    print(f"⚠️  Error in {symbol} {date_str}: {e}")
+            out["rows"].append({
+                "symbol": symbol,
+                "date": date_str,
+                "ic": ic_val,
+                "n_obs": len(ofi_signal)
+            })
         
-        if verbose:
-            print(f"✓ {symbol}: Analyzed {len([r for r in ic_results if r['symbol'] == symbol])} days")
+        except Exception as e:
+            if verbose:
+                out["log"].append(f"⚠️  Error in {symbol} {date_str}: {e}")
+    
+    if verbose:
+        out["log"].append(f"✓ {symbol}: Analyzed {len(out['rows'])} days ({days.stats})")
+    return out
+
+
+def _ic_merge(parts: List[dict], outdir: Path):
+    """IC分析汇总：合并各标的结果并落盘"""
+    print("\n" + "="*80)
+    print("Task 2: IC Analysis (Single Variable Information)")
+    print("="*80)
+    
+    ic_results = []
+    n_filtered = 0
+    for part in parts:
+        for line in part["log"]:
+            print(line)
+        ic_results += part["rows"]
+        n_filtered += part["n_filtered"]
+    
+    if n_filtered:
+        print(f"  Skipped {n_filtered} days failing QC filters")
     
     # 汇总结果
     if ic_results:
@@ -205,58 +333,69 @@ def ic_analysis_task(symbols: List[str], outdir: Path, verbose: bool = False):
         return None, None
 
 
-def model_eval_task(symbols: List[str], outdir: Path, verbose: bool = False):
-    """任务3: 预测模型评估"""
+def ic_analysis_task(symbols: List[str], outdir: Path, verbose: bool = False,
+                     allowed: Optional[set] = None,
+                     start_date: Optional[str] = None, end_date: Optional[str] = None,
+                     store_dir: Optional[str] = None):
+    """任务2: IC分析"""
+    parts = [_ic_symbol(s, allowed, start_date, end_date, verbose, store_dir) for s in symbols]
+    return _ic_merge(parts, outdir)
+
+
+def _model_symbol(symbol: str, allowed: Optional[set] = None,
+                  start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  verbose: bool = False, store_dir: Optional[str] = None) -> dict:
+    """模型评估的单标的单元：返回逐日回归/分类结果和日志"""
+    days, n_filtered = _signal_return_days(symbol, allowed, start_date, end_date, store_dir)
+    out = {"regression": [], "classification": [], "n_filtered": n_filtered, "log": []}
+    
+    if days is None:
+        return out
+    
+    days = _prefetch_days(days, store_dir)
+    for (date_str, _), get in days:
+        try:
+            ofi_signal, returns = get()
+            if len(ofi_signal) < 20:
+                continue
+            
+            # 回归分析
+            reg_result = regression_analysis(ofi_signal, returns)
+            reg_result.update({"symbol": symbol, "date": date_str})
+            out["regression"].append(reg_result)
+            
+            # 分类分析
+            clf_result = classification_analysis(ofi_signal, returns)
+            clf_result.update({"symbol": symbol, "date": date_str})
+            out["classification"].append(clf_result)
+            
+        except Exception as e:
+            if verbose:
+                out["log"].append(f"⚠️  Error in {symbol} {date_str}: {e}")
+    
+    if verbose:
+        out["log"].append(f"✓ {symbol}: Evaluated {len(out['regression'])} days ({days.stats})")
+    return out
+
+
+def _model_merge(parts: List[dict], outdir: Path):
+    """模型评估汇总：合并各标的结果并落盘"""
     print("\n" + "="*80)
     print("Task 3: Predictive Model Evaluation")
     print("="*80)
     
     regression_results = []
     classification_results = []
+    n_filtered = 0
+    for part in parts:
+        for line in part["log"]:
+            print(line)
+        regression_results += part["regression"]
+        classification_results += part["classification"]
+        n_filtered += part["n_filtered"]
     
-    for symbol in symbols:
-        ofi_dir = OFI_FEATURES_DIR / symbol
-        label_dir = LABELS_DIR / symbol
-        
-        if not ofi_dir.exists() or not label_dir.exists():
-            continue
-        
-        ofi_files = sorted(ofi_dir.glob("*.parquet"))
-        
-        for ofi_file in ofi_files:
-            date_str = ofi_file.stem
-            label_file = label_dir / f"{date_str}.parquet"
-            
-            if not label_file.exists():
-                continue
-            
-            try:
-                ofi_df = pd.read_parquet(ofi_file)
-                label_df = pd.read_parquet(label_file)
-                
-                common_idx = ofi_df.index.intersection(label_df.index)
-                if len(common_idx) < 20:
-                    continue
-                
-                ofi_signal = ofi_df.loc[common_idx, "ofi"] if "ofi" in ofi_df.columns else ofi_df.loc[common_idx, "ofi1"]
-                returns = label_df.loc[common_idx, "ret_fwd_1m"] if "ret_fwd_1m" in label_df.columns else label_df.iloc[:, 0]
-                
-                # 回归分析
-                reg_result = regression_analysis(ofi_signal, returns)
-                reg_result.update({"symbol": symbol, "date": date_str})
-                regression_results.append(reg_result)
-                
-                # 分类分析
-                clf_result = classification_analysis(ofi_signal, returns)
-                clf_result.update({"symbol": symbol, "date": date_str})
-                classification_results.append(clf_result)
-                
-            except Exception as e:
-                if verbose:
-                    print(f"⚠️  Error in {symbol} {date_str}: {e}")
-        
-        if verbose:
-            print(f"✓ {symbol}: Evaluated {len([r for r in regression_results if r['symbol'] == symbol])} days")
+    if n_filtered:
+        print(f"  Skipped {n_filtered} days failing QC filters")
     
     # 保存结果
     if regression_results:
@@ -301,22 +440,215 @@ def model_eval_task(symbols: List[str], outdir: Path, verbose: bool = False):
     return regression_results, classification_results
 
 
-def robustness_task(symbols: List[str], outdir: Path, verbose: bool = False):
+def model_eval_task(symbols: List[str], outdir: Path, verbose: bool = False,
+                    allowed: Optional[set] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    store_dir: Optional[str] = None):
+    """任务3: 预测模型评估"""
+    parts = [_model_symbol(s, allowed, start_date, end_date, verbose, store_dir) for s in symbols]
+    return _model_merge(parts, outdir)
+
+
+def _qc_filter_unit(filters: Dict[str, float], qc_result=None,
+                    symbols: Optional[List[str]] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None) -> Optional[set]:
+    """
+    由QC结果（或持久化QC表）构建可用性集合；未配置过滤时返回 None
+
+    没有QC记录的交易日（OFI特征已存在但未跑QC）不做过滤，打印警告；
+    QC表整体不存在时不应用过滤。
+    """
+    if not filters:
+        return None
+    
+    qc_df = qc_result[0] if qc_result is not None else None
+    if qc_df is None:
+        qc_df = load_qc_store(QC_STORE_PATH)
+    
+    if not len(qc_df):
+        print("\n⚠️  QC table not found, day-level filters not applied "
+              "(run --task quality_check first)")
+        return None
+    
+    # 只统计本次运行的标的与日期区间（持久化QC表覆盖全部历史）
+    in_scope = qc_df["date"].astype(str).map(lambda d: in_date_range(d, start_date, end_date))
+    if symbols is not None:
+        in_scope &= qc_df["symbol"].astype(str).isin(symbols)
+    qc_df = qc_df[in_scope]
+    
+    eligible = build_eligibility(qc_df, filters)
+    print(f"\nQC filters {filters}: {int(eligible.sum())}/{len(eligible)} days eligible")
+    allowed = _eligible_days(eligible)
+    
+    # 有OFI特征但没有QC记录的交易日按未过滤处理
+    missing = set()
+    for symbol in symbols or []:
+        for date_str, _ in list_day_files(OFI_FEATURES_DIR / symbol, start_date, end_date):
+            if (symbol, date_str) not in eligible.index:
+                missing.add((symbol, date_str))
+    if missing:
+        print(f"⚠️  {len(missing)} days have no QC record and are not filtered "
+              f"(run --task quality_check to cover them)")
+        allowed |= missing
+    return allowed
+
+
+def robustness_task(symbols: List[str], outdir: Path, verbose: bool = False,
+                    allowed: Optional[set] = None,
+                    start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    wf_fold_size: int = 240, wf_window: str = "expanding",
+                    store_dir: Optional[str] = None, precision: Optional[str] = None):
     """任务4: 稳健性检验"""
+    # 面板只加载一次，所有子样本/Walk-forward 在同一张长表上批量计算；
+    # precision="float32" 时面板按 float32 加载（IC/回归内部仍以 float64 累加）
+    panel = _load_panel(symbols, start_date, end_date, allowed, store_dir=store_dir, dtype=precision)
+    
     print("\n" + "="*80)
     print("Task 4: Robustness Tests")
     print("="*80)
     
-    # 这里简化实现，只做子样本分析示例
-    print("  Sub-sample analysis (by hour)...")
+    if len(panel) == 0:
+        print("⚠️  No OFI/label data found for robustness tests")
+        return None
+    
+    print(f"  Panel: {len(panel)} minutes, {panel['symbol'].nunique()} symbols, "
+          f"{panel[['symbol', 'date']].drop_duplicates().shape[0]} symbol-days")
     
-    # 可以添加更多稳健性测试
-    # - 按时间段分组
-    # - 按波动率分组
-    # - Walk-forward CV
+    panel = add_subsample_groups(panel, return_col="ret")
+    tables_dir = outdir / "tables"
+    tables_dir.mkdir(parents=True, exist_ok=True)
     
-    print("✓ Robustness tests completed")
-    return None
+    results = {}
+    for by, fname in [("hour", "subsample_by_hour.csv"),
+                      ("day_of_week", "subsample_by_dow.csv"),
+                      ("volatility", "subsample_by_volatility.csv")]:
+        res = panel_subsample_ic(panel, by, signal_col="ofi", return_col="ret")
+        res.to_csv(tables_dir / fname, index=False)
+        results[by] = res
+        if verbose:
+            print(f"  Sub-sample by {by}: {len(res)} groups")
+    
+    # Walk-forward：默认每折240分钟（约一个交易日），训练集为之前全部样本
+    wf = walk_forward_ols(panel, signal_col="ofi", return_col="ret",
+                          fold_size=wf_fold_size, window=wf_window)
+    wf.to_csv(tables_dir / "walk_forward_cv.csv", index=False)
+    results["walk_forward"] = wf
+    
+    # 摘要：全样本各组IC + 各标的 Walk-forward 平均IC
+    def _pooled(res: pd.DataFrame, by: str) -> Dict[str, float]:
+        pooled = res[res["symbol"] == "ALL"]
+        return {str(k): float(v) for k, v in zip(pooled[by], pooled["ic"])}
+    
+    summary = {
+        "ic_by_hour": _pooled(results["hour"], "hour"),
+        "ic_by_day_of_week": _pooled(results["day_of_week"], "day_of_week"),
+        "ic_by_volatility": _pooled(results["volatility"], "volatility"),
+        "walk_forward_mean_ic": {s: float(v) for s, v in wf.groupby("symbol")["ic"].mean().items()},
+        "walk_forward_mean_r2_oos": {s: float(v) for s, v in wf.groupby("symbol")["r2_oos"].mean().items()},
+        "walk_forward_mean_hit_rate": {s: float(v) for s, v in wf.groupby("symbol")["hit_rate"].mean().items()},
+        "walk_forward_n_folds": int(len(wf)),
+    }
+    with open(tables_dir / "robustness_summary.json", 'w') as f:
+        json.dump(summary, f, indent=2)
+    
+    print(f"\n✓ Robustness tests completed")
+    print(f"  IC by volatility: " + ", ".join(f"{k}={v:.4f}" for k, v in summary["ic_by_volatility"].items()))
+    print(f"  Walk-forward folds: {summary['walk_forward_n_folds']}")
+    print(f"  Results saved to: {tables_dir}")
+    return results
+
+
+def backtest_task(symbols: List[str], outdir: Path, verbose: bool = False,
+                  allowed: Optional[set] = None,
+                  start_date: Optional[str] = None, end_date: Optional[str] = None,
+                  strategy: Optional[dict] = None, store_dir: Optional[str] = None):
+    """任务5: long top-k 策略本地回测（参数见 data.yaml 的 strategy 块）"""
+    strategy = dict(strategy or {})
+    levels = strategy.pop("levels", None)
+    # weight 与 sweep.expand_grid 相同：按 levels 截取前几档
+    if strategy.get("weight") is not None:
+        if not levels:
+            raise ValueError("strategy.weight requires strategy.levels")
+        weight = [float(w) for w in list(strategy["weight"])[:int(levels)]]
+        if len(weight) != levels:
+            raise ValueError(f"len(strategy.weight)={len(weight)} < strategy.levels={levels}")
+        strategy["weight"] = weight
+    feature_cols = [f"ofi{i}" for i in range(1, levels + 1)] if levels else ["ofi"]
+    panel = _load_panel(symbols, start_date, end_date, allowed, feature_cols,
+                        with_spread=True, store_dir=store_dir)
+    
+    print("\n" + "="*80)
+    print("Task 5: Strategy Backtest")
+    print("="*80)
+    
+    if len(panel) == 0:
+        print("⚠️  No OFI/label data found for backtest")
+        return None
+    
+    result = run_backtest(panel, levels=levels, **strategy)
+    summary = result.summary()
+    
+    tables_dir = outdir / "tables"
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    day = result.pnl.index.normalize()
+    daily = result.pnl.groupby(day).agg(
+        ret_gross=("ret_gross", lambda r: float(np.prod(1 + r) - 1)),
+        ret_net=("ret_net", lambda r: float(np.prod(1 + r) - 1)),
+        cost=("cost", "sum"),
+        turnover=("turnover", "sum"),
+        trades=("trades", "sum"),
+    )
+    daily.index.name = "date"
+    daily.to_csv(tables_dir / "backtest_daily.csv")
+    with open(tables_dir / "backtest_summary.json", 'w') as f:
+        json.dump({"params": result.params, **summary}, f, indent=2)
+    
+    print(f"\n✓ Backtest completed: {summary['n_days']} days, {summary['n_rebalances']} rebalances")
+    print(f"  Total return: {summary['total_return']:.4%} (gross {summary['gross_return']:.4%}), "
+          f"Sharpe: {summary['sharpe']:.2f}, MaxDD: {summary['max_drawdown']:.4%}")
+    print(f"  Turnover: {summary['turnover']:.2f}, Cost: {summary['cost']:.6f}")
+    print(f"  Results saved to: {tables_dir}")
+    return summary
+
+
+def sweep_task(symbols: List[str], outdir: Path, verbose: bool = False,
+               allowed: Optional[set] = None,
+               start_date: Optional[str] = None, end_date: Optional[str] = None,
+               strategy: Optional[dict] = None, sweep: Optional[dict] = None,
+               n_jobs: int = 1, store_dir: Optional[str] = None):
+    """任务6: 策略参数扫描（参数空间见 data.yaml 的 sweep 块）"""
+    sweep = sweep or {}
+    space = {k: [v] for k, v in (strategy or {}).items()}
+    space.update(sweep.get("space") or {})
+    n_random = sweep.get("n_random")
+    configs = sample_grid(space, int(n_random), seed=sweep.get("seed", 0)) if n_random else expand_grid(space)
+    
+    max_levels = max(int(c["levels"]) for c in configs)
+    panel = _load_panel(symbols, start_date, end_date, allowed,
+                        [f"ofi{i}" for i in range(1, max_levels + 1)],
+                        with_spread=True, store_dir=store_dir)
+    
+    print("\n" + "="*80)
+    print("Task 6: Strategy Parameter Sweep")
+    print("="*80)
+    
+    if len(panel) == 0:
+        print("⚠️  No OFI/label data found for parameter sweep")
+        return None
+    
+    print(f"  {len(configs)} configurations, {n_jobs} process(es)")
+    results = run_sweep(panel, configs, n_jobs=n_jobs, verbose=verbose)
+    
+    tables_dir = outdir / "tables"
+    tables_dir.mkdir(parents=True, exist_ok=True)
+    results.to_csv(tables_dir / "sweep_results.csv", index=False)
+    
+    cols = ["balance_interval", "k_long", "ofi_window", "levels", "weight", "k_spread",
+            "sharpe", "max_drawdown", "turnover", "cost"]
+    print(f"\n✓ Parameter sweep completed, top 5 by Sharpe:")
+    print(results[cols].head(5).to_string(index=False))
+    print(f"  Results saved to: {tables_dir}")
+    return results
 
 
 def run_all(
@@ -327,21 +659,33 @@ def run_all(
     symbols: Optional[List[str]] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    verbose: bool = False
+    verbose: bool = False,
+    jobs: int = 1,
+    profile: Optional[str] = None,
+    store: Optional[str] = None
 ):
     """
     运行完整的评估pipeline
     
+    每个 (task, symbol) 单元的耗时、CPU 时间、读取字节数与峰值 RSS 写入
+    outdir/run_profile.json（与 run_metadata.json 同目录）。
+    
     Args:
         config_path: 数据配置路径
         universe_path: 标的池配置路径
         outdir: 输出目录
         task: 任务类型
         symbols: 指定标的列表（覆盖universe配置）
-        start_date: 开始日期
-        end_date: 结束日期
+        start_date: 开始日期（默认取 data.yaml 中的 data.start）
+        end_date: 结束日期（默认取 data.yaml 中的 data.end）
         verbose: 详细输出
+        jobs: 并行进程数；1 表示串行执行
+        profile: 额外用 "cprofile" 或 "pyinstrument" 剖析主进程，结果写入 outdir/profile.*
+        store: 分钟特征库目录（见 store.py）；指定后 IC/模型/稳健性/回测/扫描从内存映射的
+               特征库读取，task="build_store" 时为输出目录（默认 data/features/minute_store）
     """
+    profiler = StageProfiler()
+    
     # 创建输出目录
     outdir = Path(outdir)
     outdir.mkdir(parents=True, exist_ok=True)
@@ -352,26 +696,72 @@ def run_all(
     if symbols is None:
         symbols = load_universe(universe_path)
     
+    # 日期区间：命令行优先，否则使用数据配置
+    cfg = load_config(config_path) if Path(config_path).exists() else {}
+    data_cfg = cfg.get("data", {})
+    start_date = start_date or data_cfg.get("start")
+    end_date = end_date or data_cfg.get("end")
+    if start_date is not None:
+        start_date = str(start_date)
+    if end_date is not None:
+        end_date = str(end_date)
+    
     print(f"\nAnalyzing {len(symbols)} symbols: {', '.join(symbols[:5])}{'...' if len(symbols) > 5 else ''}")
+    print(f"Date range: {start_date or '-'} ~ {end_date or '-'}")
     
-    # 执行任务
-    results = {}
+    # 构建 (task, symbol) 依赖图：QC -> 可用性索引 -> 各标的IC/模型评估 -> 汇总
+    run_tasks = ["quality_check", "ic_analysis", "model_eval", "robustness"] if task == "all" else [task]
+    filters = load_day_filters(universe_path)
+    
+    graph = TaskGraph()
     
-    if task in ["all", "quality_check"]:
-        qc_df, qc_summary = quality_check_task(symbols, outdir, verbose)
-        results["quality_check"] = (qc_df, qc_summary)
+    if "build_store" in run_tasks:
+        graph.add(("build_store", "*"), build_feature_store, symbols, store or STORE_DIR,
+                  start_date=start_date, end_date=end_date, verbose=verbose, inline=True)
     
-    if task in ["all", "ic_analysis"]:
-        ic_df, ic_stats = ic_analysis_task(symbols, outdir, verbose)
-        results["ic_analysis"] = (ic_df, ic_stats)
+    if "quality_check" in run_tasks:
+        graph.add(("quality_check", "*"), quality_check_task, symbols, outdir, verbose,
+                  start_date=start_date, end_date=end_date, n_jobs=jobs, inline=True)
     
-    if task in ["all", "model_eval"]:
-        reg_results, clf_results = model_eval_task(symbols, outdir, verbose)
-        results["model_eval"] = (reg_results, clf_results)
+    if any(t in run_tasks for t in ("ic_analysis", "model_eval", "robustness", "backtest", "sweep")):
+        # 日级别QC过滤：QC表只读一次，构建 (symbol, date) 可用性索引
+        qc_input = {"qc_result": ("quality_check", "*")} if "quality_check" in run_tasks else {}
+        graph.add(("qc_filter", "*"), _qc_filter_unit, filters, symbols=symbols,
+                  start_date=start_date, end_date=end_date, inputs=qc_input, inline=True)
+    
+    for name, unit_func, merge_func in [("ic_analysis", _ic_symbol, _ic_merge),
+                                        ("model_eval", _model_symbol, _model_merge)]:
+        if name not in run_tasks:
+            continue
+        for symbol in symbols:
+            graph.add((name, symbol), unit_func, symbol,
+                      start_date=start_date, end_date=end_date, verbose=verbose, store_dir=store,
+                      inputs={"allowed": ("qc_filter", "*")})
+        graph.add((name, "*"), merge_func, outdir=outdir,
+                  inputs={"parts": [(name, s) for s in symbols]}, inline=True)
     
-    if task in ["all", "robustness"]:
-        rob_results = robustness_task(symbols, outdir, verbose)
-        results["robustness"] = rob_results
+    if "robustness" in run_tasks:
+        graph.add(("robustness", "*"), robustness_task, symbols, outdir, verbose,
+                  start_date=start_date, end_date=end_date, store_dir=store,
+                  precision=cfg.get("feature", {}).get("ofi", {}).get("precision"),
+                  inputs={"allowed": ("qc_filter", "*")})
+    
+    if "backtest" in run_tasks:
+        graph.add(("backtest", "*"), backtest_task, symbols, outdir, verbose,
+                  start_date=start_date, end_date=end_date, strategy=cfg.get("strategy"),
+                  store_dir=store, inputs={"allowed": ("qc_filter", "*")})
+    
+    if "sweep" in run_tasks:
+        # 扫描内部自带进程池，单元本身在主进程执行
+        graph.add(("sweep", "*"), sweep_task, symbols, outdir, verbose,
+                  start_date=start_date, end_date=end_date, strategy=cfg.get("strategy"),
+                  sweep=cfg.get("sweep"), n_jobs=jobs, store_dir=store,
+                  inputs={"allowed": ("qc_filter", "*")}, inline=True)
+    
+    with profile_session(profile, outdir):
+        unit_results = graph.run(jobs=jobs, profiler=profiler)
+    results = {t: unit_results[(t, "*")] for t in run_tasks}
+    allowed = unit_results.get(("qc_filter", "*"))
     
     # 生成最终报告元数据
     metadata = {
@@ -379,10 +769,22 @@ def run_all(
         "task": task,
         "n_symbols": len(symbols),
         "symbols": symbols,
-        "output_dir": str(outdir)
+        "start_date": start_date,
+        "end_date": end_date,
+        "filters": filters,
+        "n_days_eligible": len(allowed) if allowed is not None else None,
+        "jobs": jobs,
+        "store": str(store) if store is not None else None,
+        "output_dir": str(outdir),
+        "profile_file": "run_profile.json"
     }
     
     with open(outdir / "run_metadata.json", 'w') as f:
         json.dump(metadata, f, indent=2)
     
+    profiler.write(outdir / "run_profile.json")
+    if verbose:
+        print(f"\nStage profile ({outdir / 'run_profile.json'}):")
+        print(profiler.summary())
+    
     return results
@@ -0,0 +1,164 @@
+"""
+后台预取的逐日迭代器
+
+逐个 (symbol, date) 的循环通常是"读 parquet -> 计算"交替进行，读盘与解压时计算空闲。
+prefetch 在线程池中提前加载后面 depth 个条目（有界，内存占用不超过 depth+1 天），
+消费者处理当前条目时后续文件已在解压（pyarrow 读取时释放 GIL）。
+
+    it = prefetch(days, lambda d: pd.read_parquet(d[1]), depth=4)
+    for (date, path), get in it:
+        try:
+            df = get()          # 阻塞直到该条目加载完成；加载异常在这里抛出
+        except Exception as e:
+            ...
+    print(it.stats)             # 加载总耗时、实际等待时间与被隐藏的比例
+
+depth=0 时退化为同步加载（get() 里直接调用 load），便于对比或调试。
+"""
+from __future__ import annotations
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Callable, Deque, Generic, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class PrefetchStats:
+    """预取统计：load_seconds 为各条目加载耗时之和，wait_seconds 为消费者阻塞等待的时间"""
+    n_items: int = 0
+    load_seconds: float = 0.0
+    wait_seconds: float = 0.0
+
+    @property
+    def hidden_seconds(self) -> float:
+        """与计算重叠、没有让消费者等待的加载时间"""
+        return max(self.load_seconds - self.wait_seconds, 0.0)
+
+    @property
+    def hidden_ratio(self) -> float:
+        return self.hidden_seconds / self.load_seconds if self.load_seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "hidden_seconds": self.hidden_seconds, "hidden_ratio": self.hidden_ratio}
+
+    def __str__(self) -> str:
+        return (f"prefetch: {self.n_items} items, load {self.load_seconds:.2f}s, "
+                f"waited {self.wait_seconds:.2f}s, hidden {self.hidden_seconds:.2f}s ({self.hidden_ratio:.0%})")
+
+
+class PrefetchIterator(Generic[T, R]):
+    """
+    按输入顺序产出 (item, get) 的迭代器，后台最多同时加载 depth 个条目
+
+    get() 返回 load(item) 的结果（或抛出其异常），多次调用返回同一结果。
+    提前结束循环时调用 close()（或用 with 语句）取消尚未开始的加载。
+    """
+
+    def __init__(self, items: Iterable[T], load: Callable[[T], R], depth: int = 4, workers: int = 2):
+        if depth < 0:
+            raise ValueError(f"depth must be >= 0, got {depth}")
+        self._items = iter(items)
+        self._load = load
+        self._depth = depth
+        self._pool = ThreadPoolExecutor(max_workers=max(1, min(workers, depth)),
+                                        thread_name_prefix="prefetch") if depth > 0 else None
+        self._pending: Deque[Tuple[T, Future]] = deque()
+        self.stats = PrefetchStats()
+        self._fill()
+
+    def _timed_load(self, item: T) -> Tuple[R, float]:
+        t0 = time.perf_counter()
+        try:
+            return self._load(item), time.perf_counter() - t0
+        except BaseException as e:
+            # 耗时随异常带回，由消费者线程计入统计
+            e.prefetch_seconds = time.perf_counter() - t0
+            raise
+
+    def _fill(self):
+        while self._pool is not None and len(self._pending) < self._depth:
+            try:
+                item = next(self._items)
+            except StopIteration:
+                return
+            self._pending.append((item, self._pool.submit(self._timed_load, item)))
+
+    def _getter(self, item: T, future: Optional[Future]) -> Callable[[], R]:
+        done = []
+
+        def get() -> R:
+            if done:
+                return done[0]
+            t0 = time.perf_counter()
+            try:
+                if future is None:
+                    value, load_seconds = self._timed_load(item)
+                else:
+                    value, load_seconds = future.result()
+            except BaseException as e:
+                self._account(t0, getattr(e, "prefetch_seconds", 0.0), future is None)
+                raise
+            self._account(t0, load_seconds, future is None)
+            done.append(value)
+            return value
+
+        return get
+
+    def _account(self, t0: float, load_seconds: float, inline: bool):
+        self.stats.load_seconds += load_seconds
+        # 同步加载时整个加载时间都是等待
+        self.stats.wait_seconds += load_seconds if inline else time.perf_counter() - t0
+
+    def __iter__(self) -> "PrefetchIterator[T, R]":
+        return self
+
+    def __next__(self) -> Tuple[T, Callable[[], R]]:
+        if self._pool is None:
+            item = next(self._items)
+            self.stats.n_items += 1
+            return item, self._getter(item, None)
+        if not self._pending:
+            self.close()
+            raise StopIteration
+        item, future = self._pending.popleft()
+        # 取走一个就补一个，保持后台始终有 depth 个在加载
+        self._fill()
+        self.stats.n_items += 1
+        return item, self._getter(item, future)
+
+    def close(self):
+        """取消未开始的加载并关闭线程池"""
+        for _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            self._depth = 0
+            self._items = iter(())
+
+    def __enter__(self) -> "PrefetchIterator[T, R]":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def prefetch(items: Iterable[T], load: Callable[[T], R], depth: int = 4, workers: int = 2) -> PrefetchIterator[T, R]:
+    """
+    在后台线程中预取 load(item)
+
+    Args:
+        items: 条目序列，如 [(date, ofi_file, label_file), ...]
+        load: 加载函数（在工作线程中调用，应只做 I/O 与解码）
+        depth: 最多提前加载的条目数；0 表示同步加载
+        workers: 加载线程数（不超过 depth）
+
+    Returns:
+        PrefetchIterator，产出 (item, get)；统计见 .stats
+    """
+    return PrefetchIterator(items, load, depth=depth, workers=workers)
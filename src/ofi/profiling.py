@@ -0,0 +1,229 @@
+"""
+运行阶段计时与资源统计
+
+轻量的插桩层，用于查看一次完整运行的时间花在哪里：
+- StageProfiler.stage(name, symbol) 上下文管理器记录墙钟时间、CPU 时间、
+  读取字节数与进程峰值 RSS，同一 (阶段, 标的) 多次调用累加
+- 进程池中执行的单元用 timed_call 在子进程内测量，结果随返回值带回主进程合并
+- profile_session 按 CLI 开关启用 cProfile 或 pyinstrument（可选依赖）
+
+资源数据来自标准库：读取字节数取 /proc/self/io 的 rchar（包含命中页缓存的读取，
+非 Linux 平台为 None），峰值 RSS 取 resource.getrusage 的 ru_maxrss（进程生命周期内的最大值）。
+"""
+from __future__ import annotations
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+def _bytes_read() -> Optional[int]:
+    """本进程累计读取字节数（/proc/self/io 的 rchar）"""
+    try:
+        with open("/proc/self/io", "rb") as f:
+            for line in f:
+                if line.startswith(b"rchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _max_rss_mb() -> Optional[float]:
+    """本进程峰值 RSS（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def resource_snapshot() -> dict:
+    """当前进程的时间与资源读数"""
+    return {
+        "wall": time.perf_counter(),
+        "cpu": time.process_time(),
+        "bytes_read": _bytes_read(),
+    }
+
+
+def _delta(start: dict, end: dict) -> dict:
+    bytes_read = None
+    if start["bytes_read"] is not None and end["bytes_read"] is not None:
+        bytes_read = end["bytes_read"] - start["bytes_read"]
+    return {
+        "calls": 1,
+        "seconds": end["wall"] - start["wall"],
+        "cpu_seconds": end["cpu"] - start["cpu"],
+        "bytes_read": bytes_read,
+        "max_rss_mb": _max_rss_mb(),
+        "pid": os.getpid(),
+    }
+
+
+def timed_call(func: Callable, *args, **kwargs) -> Tuple[Any, dict]:
+    """
+    执行 func 并测量（模块级函数，可提交到进程池）
+
+    Returns:
+        (func 的返回值, 单次测量记录)
+    """
+    start = resource_snapshot()
+    value = func(*args, **kwargs)
+    return value, _delta(start, resource_snapshot())
+
+
+class StageProfiler:
+    """
+    按 (阶段, 标的) 累计的耗时与资源统计
+
+    用法：
+        prof = StageProfiler()
+        with prof.stage("convert_one_day", symbol):
+            convert_one_day(f, processed_root)
+        prof.write(outdir / "run_profile.json")
+    """
+
+    def __init__(self):
+        self.records: Dict[Tuple[str, str], dict] = {}
+        self._start = resource_snapshot()
+        self.started_at = datetime.now().isoformat()
+
+    @contextmanager
+    def stage(self, name: str, symbol: str = "*") -> Iterator[None]:
+        """测量 with 块（块内异常照常抛出，已花费的时间仍计入）"""
+        start = resource_snapshot()
+        try:
+            yield
+        finally:
+            self.add(name, symbol, _delta(start, resource_snapshot()))
+
+    def add(self, name: str, symbol: str, record: dict):
+        """合并一条测量记录（如 timed_call 在子进程中的结果）"""
+        key = (name, symbol)
+        acc = self.records.get(key)
+        if acc is None:
+            self.records[key] = {k: v for k, v in record.items() if k != "pid"}
+            self.records[key]["pids"] = {record.get("pid", os.getpid())}
+            return
+        acc["calls"] += record["calls"]
+        acc["seconds"] += record["seconds"]
+        acc["cpu_seconds"] += record["cpu_seconds"]
+        if acc["bytes_read"] is not None and record["bytes_read"] is not None:
+            acc["bytes_read"] += record["bytes_read"]
+        if record["max_rss_mb"] is not None:
+            acc["max_rss_mb"] = max(acc["max_rss_mb"] or 0.0, record["max_rss_mb"])
+        acc["pids"].add(record.get("pid", os.getpid()))
+
+    def to_dict(self) -> dict:
+        """结构化结果：总览、按阶段汇总、按 (阶段, 标的) 明细（按耗时降序）"""
+        total = _delta(self._start, resource_snapshot())
+        rows = []
+        for (name, symbol), r in self.records.items():
+            rows.append({"stage": name, "symbol": symbol, **{k: v for k, v in r.items() if k != "pids"},
+                         "processes": len(r["pids"])})
+        rows.sort(key=lambda r: r["seconds"], reverse=True)
+
+        by_stage: Dict[str, dict] = {}
+        for r in rows:
+            s = by_stage.setdefault(r["stage"], {"calls": 0, "seconds": 0.0, "cpu_seconds": 0.0,
+                                                  "bytes_read": 0, "max_rss_mb": None, "n_symbols": 0})
+            s["calls"] += r["calls"]
+            s["seconds"] += r["seconds"]
+            s["cpu_seconds"] += r["cpu_seconds"]
+            s["bytes_read"] = None if s["bytes_read"] is None or r["bytes_read"] is None \
+                else s["bytes_read"] + r["bytes_read"]
+            if r["max_rss_mb"] is not None:
+                s["max_rss_mb"] = max(s["max_rss_mb"] or 0.0, r["max_rss_mb"])
+            s["n_symbols"] += 1
+
+        return {
+            "started_at": self.started_at,
+            "finished_at": datetime.now().isoformat(),
+            "wall_seconds": total["seconds"],
+            "cpu_seconds_main": total["cpu_seconds"],
+            "bytes_read_main": total["bytes_read"],
+            "max_rss_mb_main": total["max_rss_mb"],
+            "by_stage": by_stage,
+            "stages": rows,
+        }
+
+    def write(self, path: Path) -> dict:
+        """写出 JSON，返回写出的内容"""
+        out = self.to_dict()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(out, f, indent=2)
+        return out
+
+    def summary(self, top: int = 10) -> str:
+        """按阶段汇总的文本表（耗时降序）"""
+        by_stage = self.to_dict()["by_stage"]
+        lines = [f"{'stage':<24s} {'calls':>6s} {'seconds':>9s} {'cpu s':>9s} {'read MB':>9s} {'max RSS MB':>11s}"]
+        for name, s in sorted(by_stage.items(), key=lambda kv: kv[1]["seconds"], reverse=True)[:top]:
+            read = "-" if s["bytes_read"] is None else f"{s['bytes_read'] / 2 ** 20:.1f}"
+            rss = "-" if s["max_rss_mb"] is None else f"{s['max_rss_mb']:.0f}"
+            lines.append(f"{name:<24s} {s['calls']:>6d} {s['seconds']:>9.2f} {s['cpu_seconds']:>9.2f} "
+                         f"{read:>9s} {rss:>11s}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile_session(kind: Optional[str], outdir: Path, name: str = "profile") -> Iterator[None]:
+    """
+    用 cProfile 或 pyinstrument 剖析 with 块（只覆盖主进程）
+
+    Args:
+        kind: None（不剖析）、"cprofile" 或 "pyinstrument"
+        outdir: 输出目录；cprofile 写 {name}.pstats 与按累计时间排序的 {name}.txt，
+                pyinstrument 写 {name}.html
+        name: 输出文件名前缀
+    """
+    if kind is None:
+        yield
+        return
+    if kind not in PROFILERS:
+        raise ValueError(f"Unknown profiler={kind}, expected one of {PROFILERS}")
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+
+    if kind == "cprofile":
+        import cProfile
+        import io
+        import pstats
+
+        prof = cProfile.Profile()
+        prof.enable()
+        try:
+            yield
+        finally:
+            prof.disable()
+            prof.dump_stats(str(outdir / f"{name}.pstats"))
+            buf = io.StringIO()
+            pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(50)
+            (outdir / f"{name}.txt").write_text(buf.getvalue())
+        return
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError as e:
+        raise ImportError("--profile pyinstrument requires: pip install pyinstrument") from e
+    prof = Profiler()
+    prof.start()
+    try:
+        yield
+    finally:
+        prof.stop()
+        (outdir / f"{name}.html").write_text(prof.output_html())
@@ -0,0 +1,424 @@
+"""
+全量数据质量检查（QC）引擎
+
+按列投影读取 tick/OFI 文件，用数组运算一次性计算每日全部质量指标：
+- 分钟覆盖率（相对连续竞价时段网格）
+- 盘口异常率（交叉盘口、负点差、负中间价）
+- 重复时间戳比例、异常价格数量、点差统计
+- OFI 分布统计（均值、标准差、分位数）
+
+多个交易日在进程池中并行计算，结果汇总为一张 QC parquet 表。
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import os
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .clean import PX_COLS
+from .io import DEFAULT_TICK_SIZE, in_date_range, list_day_files, read_raw_lob_csv, read_tick_size
+
+
+# 连续竞价时段（分钟，左闭右开）：09:30-11:30, 13:00-15:00，共240分钟
+SESSIONS = [(9 * 60 + 30, 11 * 60 + 30), (13 * 60, 15 * 60)]
+
+SESSION_GRID = np.zeros(24 * 60, dtype=bool)
+for _start, _end in SESSIONS:
+    SESSION_GRID[_start:_end] = True
+EXPECTED_MINUTES = int(SESSION_GRID.sum())
+
+TICK_QC_COLS = ["ts"] + PX_COLS + ["maybe_truncated"]
+OFI_QC_COLS = ["ofi"]
+
+OFI_STAT_KEYS = ["ofi_mean", "ofi_std", "ofi_q25", "ofi_q50", "ofi_q75", "ofi_min", "ofi_max"]
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+
+
+def _read_columns(path: Path, columns: List[str]) -> dict:
+    """只读取文件中存在的列，返回 {列名: numpy数组}"""
+    pf = pq.ParquetFile(path)
+    present = [c for c in columns if c in pf.schema_arrow.names]
+    table = pf.read(columns=present)
+    return {c: table.column(c).to_numpy() for c in present}
+
+
+def _to_ns(ts: np.ndarray) -> np.ndarray:
+    """时间戳数组统一转为 int64 纳秒"""
+    if not np.issubdtype(ts.dtype, np.datetime64):
+        ts = pd.to_datetime(ts).values
+    return ts.astype("datetime64[ns]").view("int64")
+
+
+def tick_qc_metrics(cols: dict, tick_size: Optional[float] = None) -> dict:
+    """
+    由列数组计算单日tick质量指标
+
+    Args:
+        cols: {列名: numpy数组}，至少包含 ts, a1_p, b1_p
+        tick_size: 报价为整数档位时的最小报价单位（换算 spread_median），默认 DEFAULT_TICK_SIZE
+
+    Returns:
+        质量指标字典
+    """
+    n = len(cols["a1_p"]) if "a1_p" in cols else 0
+    if n == 0:
+        return {
+            "n_rows": 0,
+            "n_minutes": 0,
+            "expected": EXPECTED_MINUTES,
+            "coverage": 0.0,
+            "dup_ts_ratio": 0.0,
+            "crossed_ratio": 0.0,
+            "spread_negative": 0.0,
+            "mid_negative": 0.0,
+            "bid_ge_ask": 0.0,
+            "bad_price_cnt": 0,
+            "spread_median": np.nan,
+            "rel_spread_median": np.nan,
+            "maybe_truncated_ratio": np.nan,
+            "ts_min": pd.NaT,
+            "ts_max": pd.NaT,
+        }
+
+    a1 = cols["a1_p"].astype(float)
+    b1 = cols["b1_p"].astype(float)
+
+    # 分钟覆盖率：落在连续竞价网格内的不同分钟数
+    ts_ns = _to_ns(cols["ts"])
+    minute_of_day = (ts_ns // _NS_PER_MINUTE) % (24 * 60)
+    present = np.zeros(24 * 60, dtype=bool)
+    present[minute_of_day] = True
+    n_minutes = int((present & SESSION_GRID).sum())
+
+    # 重复时间戳：processed 数据已按 ts 排序，直接比较相邻元素
+    if n > 1 and np.all(ts_ns[1:] >= ts_ns[:-1]):
+        dup_cnt = int((ts_ns[1:] == ts_ns[:-1]).sum())
+    else:
+        dup_cnt = n - len(np.unique(ts_ns))
+
+    spread = a1 - b1
+    mid = (a1 + b1) / 2.0
+    # 整数档位：比较类指标与 rel_spread 与单位无关，只有 spread_median 需换算回价格
+    scale = (tick_size or DEFAULT_TICK_SIZE) if np.issubdtype(cols["a1_p"].dtype, np.integer) else 1.0
+
+    px = [cols[c].astype(float) for c in PX_COLS if c in cols]
+    if px:
+        px_mat = np.column_stack(px)
+        bad_price_cnt = int(((px_mat <= 0) | np.isnan(px_mat)).any(axis=1).sum())
+    else:
+        bad_price_cnt = 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_spread = spread / mid
+
+    if "maybe_truncated" in cols:
+        mt = pd.to_numeric(pd.Series(cols["maybe_truncated"]), errors="coerce").to_numpy(dtype=float)
+        mt_ratio = float(np.mean(mt > 0))
+    else:
+        mt_ratio = np.nan
+
+    return {
+        "n_rows": n,
+        "n_minutes": n_minutes,
+        "expected": EXPECTED_MINUTES,
+        "coverage": n_minutes / EXPECTED_MINUTES,
+        "dup_ts_ratio": dup_cnt / n,
+        "crossed_ratio": float(np.mean(a1 <= b1)),
+        "spread_negative": float(np.mean(spread <= 0)),
+        "mid_negative": float(np.mean(mid <= 0)),
+        "bid_ge_ask": float(np.mean(b1 >= a1)),
+        "bad_price_cnt": bad_price_cnt,
+        "spread_median": float(np.nanmedian(spread)) * scale,
+        "rel_spread_median": float(np.nanmedian(rel_spread)),
+        "maybe_truncated_ratio": mt_ratio,
+        "ts_min": pd.Timestamp(ts_ns.min()),
+        "ts_max": pd.Timestamp(ts_ns.max()),
+    }
+
+
+def ofi_qc_metrics(ofi: Optional[np.ndarray]) -> dict:
+    """
+    OFI分布统计
+
+    Args:
+        ofi: 分钟OFI数组，None表示没有对应的OFI文件
+
+    Returns:
+        ofi_mean/ofi_std/ofi_q25/ofi_q50/ofi_q75/ofi_min/ofi_max
+    """
+    if ofi is None:
+        return {k: np.nan for k in OFI_STAT_KEYS}
+
+    x = ofi.astype(float)
+    x = x[~np.isnan(x)]
+    if len(x) == 0:
+        return {k: np.nan for k in OFI_STAT_KEYS}
+
+    q25, q50, q75 = np.quantile(x, [0.25, 0.5, 0.75])
+    return {
+        "ofi_mean": float(x.mean()),
+        "ofi_std": float(x.std(ddof=1)) if len(x) > 1 else np.nan,
+        "ofi_q25": float(q25),
+        "ofi_q50": float(q50),
+        "ofi_q75": float(q75),
+        "ofi_min": float(x.min()),
+        "ofi_max": float(x.max()),
+    }
+
+
+def qc_day(symbol: str, date: str, tick_path: Path, ofi_path: Optional[Path] = None,
+           source: str = "processed") -> dict:
+    """
+    计算单个交易日的全部QC指标
+
+    Args:
+        symbol: 标的代码
+        date: 日期字符串
+        tick_path: tick文件路径（processed parquet 或 raw csv.gz）
+        ofi_path: 分钟OFI文件路径（可选）
+        source: "processed" 或 "raw"
+
+    Returns:
+        一行QC记录
+    """
+    if source == "processed":
+        cols = _read_columns(Path(tick_path), TICK_QC_COLS)
+        tick_size = read_tick_size(Path(tick_path))
+    elif source == "raw":
+        # 不过滤坏价格，n_rows / bad_price_cnt / mid_negative 反映原始文件
+        df = read_raw_lob_csv(Path(tick_path), default_symbol=symbol, default_date=date, drop_invalid=False)
+        cols = {c: df[c].to_numpy() for c in TICK_QC_COLS if c in df.columns}
+        tick_size = None
+    else:
+        raise ValueError(f"unknown source={source}")
+
+    ofi = None
+    if ofi_path is not None and Path(ofi_path).exists():
+        ofi = _read_columns(Path(ofi_path), OFI_QC_COLS).get("ofi")
+
+    return {
+        "symbol": symbol,
+        "date": date,
+        "source": source,
+        **tick_qc_metrics(cols, tick_size),
+        **ofi_qc_metrics(ofi),
+        "file": str(tick_path),
+    }
+
+
+def _qc_task(task: Tuple) -> dict:
+    """进程池工作函数：异常时返回带 error 字段的记录"""
+    symbol, date, tick_path, ofi_path, source = task
+    try:
+        return qc_day(symbol, date, tick_path, ofi_path, source)
+    except Exception as e:
+        return {"symbol": symbol, "date": date, "source": source,
+                "file": str(tick_path), "error": f"{type(e).__name__}: {e}"}
+
+
+def discover_qc_tasks(
+    processed_root: Path,
+    ofi_root: Optional[Path] = None,
+    symbols: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+) -> List[Tuple]:
+    """
+    扫描 processed 目录，生成QC任务列表
+
+    Args:
+        processed_root: processed tick 根目录（.../processed/ticks）
+        ofi_root: 分钟OFI根目录（可选）
+        symbols: 只检查这些标的（默认全部）
+        start: 开始日期 YYYY-MM-DD（含，默认不限）
+        end: 结束日期 YYYY-MM-DD（含，默认不限）
+
+    Returns:
+        [(symbol, date, tick_path, ofi_path, "processed"), ...]，路径均为绝对路径
+    """
+    processed_root = Path(processed_root).resolve()
+    if ofi_root is not None:
+        ofi_root = Path(ofi_root).resolve()
+    if symbols is None:
+        sym_dirs = sorted(p for p in processed_root.iterdir() if p.is_dir()) if processed_root.exists() else []
+    else:
+        sym_dirs = [processed_root / s for s in symbols]
+
+    tasks = []
+    for sym_dir in sym_dirs:
+        for date, part in list_day_files(sym_dir, start, end, layout="dir"):
+            ofi_path = Path(ofi_root) / sym_dir.name / f"{date}.parquet" if ofi_root is not None else None
+            tasks.append((sym_dir.name, date, part, ofi_path, "processed"))
+    return tasks
+
+
+def run_qc(tasks: List[Tuple], n_jobs: Optional[int] = None, verbose: bool = False) -> pd.DataFrame:
+    """
+    并行执行QC任务
+
+    Args:
+        tasks: discover_qc_tasks 生成的任务列表
+        n_jobs: 进程数，默认 CPU 核数；1 表示串行
+        verbose: 打印失败文件
+
+    Returns:
+        QC DataFrame（按 symbol, date 排序），失败记录保留在 error 列
+    """
+    if not tasks:
+        return pd.DataFrame()
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(tasks) == 1:
+        rows = [_qc_task(t) for t in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (n_jobs * 8))
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            rows = list(ex.map(_qc_task, tasks, chunksize=chunksize))
+
+    qc = pd.DataFrame(rows)
+    if "error" in qc.columns and verbose:
+        for r in qc.loc[qc["error"].notna(), ["file", "error"]].itertuples(index=False):
+            print(f"[FAIL] {r.file} -> {r.error}")
+
+    return qc.sort_values(["symbol", "date"]).reset_index(drop=True)
+
+
+def build_qc_table(
+    processed_root: Path,
+    out_file: Path,
+    ofi_root: Optional[Path] = None,
+    symbols: Optional[Iterable[str]] = None,
+    n_jobs: Optional[int] = None,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """
+    扫描全部 processed 数据，计算QC并写出单一 parquet
+
+    与 refresh_qc_store 相同（out_file 即持久化QC表），已有且未变化的交易日不重算。
+
+    Args:
+        processed_root: processed tick 根目录
+        out_file: 输出 parquet 路径
+        ofi_root: 分钟OFI根目录（可选）
+        symbols: 只检查这些标的（默认全部）
+        n_jobs: 并行进程数
+        verbose: 详细输出
+
+    Returns:
+        QC DataFrame
+    """
+    return refresh_qc_store(out_file, processed_root, ofi_root=ofi_root, symbols=symbols,
+                            n_jobs=n_jobs, verbose=verbose)
+
+
+def file_fingerprint(path: Path) -> str:
+    """文件指纹：大小 + 修改时间（纳秒），文件不存在返回空串"""
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return ""
+    return f"{st.st_size}-{st.st_mtime_ns}"
+
+
+def _task_fingerprint(task: Tuple) -> str:
+    """任务指纹：tick 文件与 OFI 文件任一变化都需要重算"""
+    _, _, tick_path, ofi_path, _ = task
+    fp = file_fingerprint(tick_path)
+    if ofi_path is not None:
+        fp += "|" + file_fingerprint(ofi_path)
+    return fp
+
+
+def load_qc_store(store_path: Path) -> pd.DataFrame:
+    """
+    读取持久化QC表
+
+    Args:
+        store_path: QC表 parquet 路径
+
+    Returns:
+        QC DataFrame；文件不存在或缺少指纹列（旧格式）时返回空表
+    """
+    store_path = Path(store_path)
+    if not store_path.exists():
+        return pd.DataFrame()
+    qc = pd.read_parquet(store_path)
+    if "fingerprint" not in qc.columns or "file" not in qc.columns:
+        return pd.DataFrame()
+    return qc
+
+
+def refresh_qc_store(
+    store_path: Path,
+    processed_root: Path,
+    ofi_root: Optional[Path] = None,
+    symbols: Optional[Iterable[str]] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    n_jobs: Optional[int] = None,
+    verbose: bool = False,
+) -> pd.DataFrame:
+    """
+    增量刷新持久化QC表
+
+    以 (symbol, date) 为键、文件指纹判断是否变化：只对新增或修改过的交易日计算QC，
+    与已有结果合并后写回；扫描范围内已删除的交易日同时从表中移除。
+    键与根目录的写法（相对/绝对路径）无关，不同入口共用同一张表。
+
+    Args:
+        store_path: QC表 parquet 路径
+        processed_root: processed tick 根目录
+        ofi_root: 分钟OFI根目录（可选）
+        symbols: 只刷新这些标的（其它标的的已有记录原样保留）
+        start: 只刷新该日期之后（含）的交易日
+        end: 只刷新该日期之前（含）的交易日
+        n_jobs: 并行进程数
+        verbose: 详细输出
+
+    Returns:
+        刷新后的完整QC表
+    """
+    store = load_qc_store(store_path)
+    tasks = discover_qc_tasks(processed_root, ofi_root, symbols, start, end)
+
+    fingerprints = {(t[0], t[1]): _task_fingerprint(t) for t in tasks}
+    store_keys = list(zip(store["symbol"].astype(str), store["date"].astype(str))) if len(store) else []
+    known = dict(zip(store_keys, store["fingerprint"])) if len(store) else {}
+    stale = [t for t in tasks if known.get((t[0], t[1])) != fingerprints[(t[0], t[1])]]
+
+    if verbose:
+        print(f"QC store: {len(tasks)} files scanned, {len(stale)} new/modified, "
+              f"{len(tasks) - len(stale)} cached")
+
+    if len(store):
+        # 扫描范围内：丢弃需要重算和已删除的交易日；范围外：原样保留
+        in_scope = store["date"].astype(str).map(lambda d: in_date_range(d, start, end))
+        if symbols is not None:
+            in_scope &= store["symbol"].isin(list(symbols))
+        stale_keys = {(t[0], t[1]) for t in stale}
+        current = [k in fingerprints and k not in stale_keys for k in store_keys]
+        store = store[~in_scope.to_numpy() | np.array(current, dtype=bool)]
+
+    fresh = run_qc(stale, n_jobs=n_jobs, verbose=verbose)
+    if len(fresh):
+        if "error" in fresh.columns:
+            # 失败的文件不入库，下次运行自动重试
+            fresh = fresh[fresh["error"].isna()].drop(columns=["error"])
+        fresh["fingerprint"] = [fingerprints[(s, d)] for s, d in zip(fresh["symbol"], fresh["date"])]
+
+    if len(fresh) == 0 and len(stale) == 0 and len(store) == len(known):
+        return store.reset_index(drop=True)
+
+    parts = [df for df in (store, fresh) if len(df)]
+    merged = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    if len(merged):
+        merged = merged.sort_values(["symbol", "date"]).reset_index(drop=True)
+
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    merged.to_parquet(store_path, index=False)
+    return merged
@@ -0,0 +1,357 @@
+"""
+按日分区数据的惰性查询
+
+在 processed tick（ticks/{symbol}/{date}/part.parquet）与分钟 OFI
+（ofi_minute/{symbol}/{date}.parquet）之上构建 pyarrow Dataset，
+过滤、投影、按分钟聚合都先以表达式记录，执行时逐个 (symbol, date) 文件流式扫描：
+- 标的/日期条件只按目录项名称裁剪文件，区间外的文件不会被打开
+- 只读取投影/过滤用到的列，过滤条件下推到 parquet 扫描
+- 按分钟聚合在 Arrow 上逐日完成（分钟不会跨日），内存占用与单日所选列相当
+
+用法：
+    from src.ofi.query import scan_ticks, field
+    q = (scan_ticks(["510050.XSHG"], "2021-01-01", "2021-12-31")
+         .filter((field("a1_p") > field("b1_p")) & (field("b1_p") > 0))
+         .with_columns(mid=(field("a1_p") + field("b1_p")) / 2,
+                       spread=field("a1_p") - field("b1_p")))
+    bars = q.resample({"mid": ("mid", "last"), "spread": ("spread", "mean"),
+                       "n_ticks": ("mid", "count")}).to_pandas()
+    for batch in q.select(["ts", "mid"]).to_batches():   # 流式 RecordBatch
+        ...
+
+可选引擎：to_polars() / to_duckdb() 把（流式）结果交给 Polars / DuckDB 继续处理。
+"""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .io import list_day_files
+from .paths import OFI_FEATURES_DIR, PROCESSED_TICKS_DIR
+
+# 表达式构造：field("a1_p") > field("b1_p")
+field = ds.field
+scalar = ds.scalar
+
+# 分区键：由文件路径得到，不依赖文件内的列
+PARTITION_KEYS = ["symbol", "date"]
+
+# resample 支持的聚合函数（pyarrow 分组聚合）
+AGGREGATIONS = ("first", "last", "sum", "mean", "min", "max", "count", "stddev", "variance")
+
+Expr = ds.Expression
+Aggs = Dict[str, Tuple[str, str]]
+
+
+def _list_symbols(root: Path) -> List[str]:
+    return sorted(p.name for p in Path(root).iterdir() if p.is_dir()) if Path(root).exists() else []
+
+
+def day_dataset(
+    root: Path,
+    symbols: Optional[Iterable[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    layout: str = "file",
+) -> ds.FileSystemDataset:
+    """
+    按 {symbol}/{date} 组织的日文件目录构建 Dataset
+
+    每个文件带分区表达式 symbol == s & date == d，Dataset 上的 symbol/date 条件
+    可以直接裁剪文件；两列在结果中总是 string 类型。
+
+    Args:
+        root: 标的目录的父目录，如 data/processed/ticks
+        symbols: 标的列表，None 表示 root 下全部
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        layout: "file" 为 {date}.parquet；"dir" 为 {date}/part.parquet（见 list_day_files）
+
+    Returns:
+        pyarrow FileSystemDataset；无文件时抛出 FileNotFoundError
+    """
+    root = Path(root)
+    symbols = _list_symbols(root) if symbols is None else list(symbols)
+    paths, partitions = [], []
+    for symbol in symbols:
+        for date_str, path in list_day_files(root / symbol, start_date, end_date, layout=layout):
+            paths.append(str(path))
+            partitions.append((field("symbol") == symbol) & (field("date") == date_str))
+    if not paths:
+        raise FileNotFoundError(f"No day files under {root} for symbols={symbols} "
+                                f"({start_date or '-'} ~ {end_date or '-'})")
+
+    # 只读第一个文件的 footer 取 schema（各日文件由同一流程写出）；
+    # 文件内已有的 date 等列统一为 string，分区键放在最前
+    file_schema = pq.read_schema(paths[0])
+    fields = [pa.field(k, pa.string()) for k in PARTITION_KEYS]
+    fields += [f for f in file_schema if f.name not in PARTITION_KEYS]
+    return ds.FileSystemDataset.from_paths(
+        paths,
+        schema=pa.schema(fields),
+        format=ds.ParquetFileFormat(),
+        filesystem=pa.fs.LocalFileSystem(),
+        partitions=partitions,
+    )
+
+
+class Query:
+    """
+    Dataset 上的惰性查询
+
+    filter / select / with_columns / resample 都返回新的 Query，不触发读取；
+    to_batches / to_table / to_pandas 等方法才逐文件执行。
+    过滤条件作用于源列（含 symbol、date），投影可以是列名或表达式。
+    """
+
+    def __init__(
+        self,
+        dataset: ds.Dataset,
+        filter: Optional[Expr] = None,
+        columns: Optional[Dict[str, Expr]] = None,
+        aggs: Optional[Aggs] = None,
+        time_col: str = "ts",
+        minutes: int = 1,
+    ):
+        self.dataset = dataset
+        self._filter = filter
+        self._columns = columns
+        self._aggs = aggs
+        self._time_col = time_col
+        self._minutes = minutes
+
+    def _replace(self, **kwargs) -> "Query":
+        state = dict(filter=self._filter, columns=self._columns, aggs=self._aggs,
+                     time_col=self._time_col, minutes=self._minutes)
+        state.update(kwargs)
+        return Query(self.dataset, **state)
+
+    def _check_not_aggregated(self, op: str):
+        if self._aggs is not None:
+            raise ValueError(f"{op}() must come before resample()")
+
+    @property
+    def columns(self) -> List[str]:
+        """结果列名"""
+        if self._aggs is not None:
+            return PARTITION_KEYS + ["minute"] + list(self._aggs)
+        if self._columns is not None:
+            return list(self._columns)
+        return self.dataset.schema.names
+
+    def filter(self, expr: Expr) -> "Query":
+        """追加过滤条件（与已有条件取交）"""
+        self._check_not_aggregated("filter")
+        return self._replace(filter=expr if self._filter is None else self._filter & expr)
+
+    def select(self, columns: Union[List[str], Dict[str, Expr]]) -> "Query":
+        """
+        投影：列名列表或 {输出列: 表达式}
+
+        列名可以引用 with_columns 定义的派生列。
+        """
+        self._check_not_aggregated("select")
+        current = self._projection()
+        if isinstance(columns, dict):
+            return self._replace(columns=dict(columns))
+        missing = [c for c in columns if c not in current]
+        if missing:
+            raise KeyError(f"Columns {missing} not found (available: {list(current)})")
+        return self._replace(columns={c: current[c] for c in columns})
+
+    def with_columns(self, **exprs: Expr) -> "Query":
+        """在当前投影上追加/覆盖派生列"""
+        self._check_not_aggregated("with_columns")
+        columns = self._projection()
+        columns.update(exprs)
+        return self._replace(columns=columns)
+
+    def resample(self, aggs: Aggs, minutes: int = 1, time_col: str = "ts") -> "Query":
+        """
+        按 (symbol, date, 分钟) 聚合
+
+        分钟由 time_col 向下取整（与 compute_ofi_minute 的 floor("min") 口径一致）。
+
+        Args:
+            aggs: {输出列: (输入列, 聚合函数)}，函数见 AGGREGATIONS；
+                  first/last 按文件内行顺序（processed tick 已按 ts 排序）
+            minutes: 聚合周期（分钟）
+            time_col: 时间列
+
+        Returns:
+            新的 Query，结果列为 symbol, date, minute, <aggs 的输出列>
+        """
+        self._check_not_aggregated("resample")
+        bad = [f for _, f in aggs.values() if f not in AGGREGATIONS]
+        if bad:
+            raise ValueError(f"Unknown aggregation {bad}, expected one of {AGGREGATIONS}")
+        return self._replace(aggs=dict(aggs), time_col=time_col, minutes=minutes)
+
+    def _projection(self) -> Dict[str, Expr]:
+        if self._columns is not None:
+            return dict(self._columns)
+        return {name: field(name) for name in self.dataset.schema.names}
+
+    def _scan_columns(self) -> Dict[str, Expr]:
+        """实际扫描的列：聚合时只取分区键、分钟与被聚合的输入列"""
+        if self._aggs is None:
+            return self._projection()
+        current = self._projection()
+        if self._time_col not in current:
+            raise KeyError(f"time_col={self._time_col} not in projection {list(current)}")
+        columns = {k: field(k) for k in PARTITION_KEYS}
+        columns["minute"] = pc.floor_temporal(current[self._time_col], self._minutes, "minute")
+        for src, _ in self._aggs.values():
+            if src not in current:
+                raise KeyError(f"Aggregation input {src} not in projection {list(current)}")
+            columns[src] = current[src]
+        return columns
+
+    def fragments(self) -> Iterator[ds.Fragment]:
+        """参与扫描的日文件（symbol/date 条件已用于裁剪）"""
+        return self.dataset.get_fragments(filter=self._filter) if self._filter is not None \
+            else self.dataset.get_fragments()
+
+    def _scanner(self, fragment: ds.Fragment, batch_size: int) -> ds.Scanner:
+        return ds.Scanner.from_fragment(
+            fragment, schema=self.dataset.schema, columns=self._scan_columns(),
+            filter=self._filter, batch_size=batch_size, use_threads=False,
+        )
+
+    def _aggregate(self, table: pa.Table) -> pa.Table:
+        keys = PARTITION_KEYS + ["minute"]
+        out = table.group_by(keys, use_threads=False).aggregate(
+            [(src, func) for src, func in self._aggs.values()])
+        # pyarrow 输出列名为 {src}_{func}，键列在最后
+        names = [f"{src}_{func}" for src, func in self._aggs.values()]
+        out = out.select(keys + names).rename_columns(keys + list(self._aggs))
+        return out.sort_by([("minute", "ascending")])
+
+    def to_batches(self, batch_size: int = 65536) -> Iterator[pa.RecordBatch]:
+        """
+        流式执行，逐个产出 RecordBatch
+
+        未聚合时每个文件按 batch_size 分批；聚合时每个 (symbol, date) 产出一批分钟结果。
+        """
+        for fragment in self.fragments():
+            scanner = self._scanner(fragment, batch_size)
+            if self._aggs is None:
+                for batch in scanner.to_batches():
+                    if batch.num_rows:
+                        yield batch
+                continue
+            table = scanner.to_table()
+            if table.num_rows:
+                yield from self._aggregate(table).to_batches()
+
+    def to_reader(self, batch_size: int = 65536) -> pa.RecordBatchReader:
+        """流式 RecordBatchReader（可交给 DuckDB 等按需拉取）"""
+        schema = self.schema()
+        return pa.RecordBatchReader.from_batches(schema, self.to_batches(batch_size))
+
+    def schema(self) -> pa.Schema:
+        """结果 schema（用空表推断，不读取数据）"""
+        empty = self.dataset.schema.empty_table()
+        table = ds.dataset(empty).to_table(columns=self._scan_columns())
+        if self._aggs is not None:
+            table = self._aggregate(table)
+        return table.schema
+
+    def to_table(self) -> pa.Table:
+        """执行并合并为一张 Arrow 表"""
+        batches = list(self.to_batches())
+        if not batches:
+            return self.schema().empty_table()
+        return pa.Table.from_batches(batches)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """执行并转为 DataFrame"""
+        return self.to_table().to_pandas()
+
+    def count_rows(self) -> int:
+        """满足过滤条件的行数（只读过滤用到的列）"""
+        return self.dataset.count_rows(filter=self._filter)
+
+    def to_polars(self):
+        """执行并转为 polars.DataFrame（可选依赖）"""
+        try:
+            import polars as pl
+        except ImportError as e:
+            raise ImportError("Query.to_polars requires: pip install polars") from e
+        return pl.from_arrow(self.to_table())
+
+    def to_duckdb(self, con=None, name: Optional[str] = None):
+        """
+        以流式 reader 注册到 DuckDB（可选依赖），返回 relation
+
+        Args:
+            con: duckdb 连接，默认新建内存连接
+            name: 若给出，同时注册为视图名，便于写 SQL
+        """
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("Query.to_duckdb requires: pip install duckdb") from e
+        con = con or duckdb.connect()
+        rel = con.from_arrow(self.to_reader())
+        if name is not None:
+            rel.create_view(name)
+        return rel
+
+    def __repr__(self) -> str:
+        n_files = len(self.dataset.files)
+        parts = [f"files={n_files}", f"columns={self.columns}"]
+        if self._filter is not None:
+            parts.append(f"filter={self._filter}")
+        if self._aggs is not None:
+            parts.append(f"resample={self._minutes}min")
+        return f"Query({', '.join(parts)})"
+
+
+def scan_ticks(
+    symbols: Optional[Iterable[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    root: Path = None,
+) -> Query:
+    """
+    processed tick 的惰性查询
+
+    Args:
+        symbols: 标的列表，None 表示全部
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        root: processed tick 根目录，默认 paths.PROCESSED_TICKS_DIR
+
+    Returns:
+        Query；列为 symbol, date 与 processed parquet 中的各列（ts, current, a1_p, ...）
+    """
+    root = PROCESSED_TICKS_DIR if root is None else Path(root)
+    return Query(day_dataset(root, symbols, start_date, end_date, layout="dir"))
+
+
+def scan_ofi_minute(
+    symbols: Optional[Iterable[str]] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    root: Path = None,
+) -> Query:
+    """
+    分钟 OFI 特征的惰性查询
+
+    Args:
+        symbols: 标的列表，None 表示全部
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        root: 分钟 OFI 根目录，默认 paths.OFI_FEATURES_DIR
+
+    Returns:
+        Query；列为 symbol, date, ofi1..ofi5, ofi 与分钟时间戳 ts
+    """
+    root = OFI_FEATURES_DIR if root is None else Path(root)
+    return Query(day_dataset(root, symbols, start_date, end_date, layout="file"))
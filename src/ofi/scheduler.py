@@ -0,0 +1,191 @@
+"""
+轻量任务调度器
+
+把 pipeline 中的任务建模为 (task, symbol) 单元组成的依赖图：
+- 每个单元声明依赖的其它单元，依赖全部完成后才会提交
+- 互相独立的单元在进程池中并发执行
+- 上游结果可以按参数名注入下游单元（如 QC -> 可用性索引 -> 各标的IC）
+- inline 单元在主进程内执行，适合汇总/落盘等轻量步骤
+- 传入 StageProfiler 时按 (task, symbol) 记录每个单元的耗时与资源（进程池单元在子进程内测量）
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from .profiling import StageProfiler, timed_call
+
+UnitKey = Tuple[str, str]
+InputSpec = Union[UnitKey, List[UnitKey]]
+
+
+@dataclass
+class Unit:
+    """调度单元"""
+    key: UnitKey
+    func: Callable
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    deps: Tuple[UnitKey, ...] = ()
+    inputs: Dict[str, InputSpec] = field(default_factory=dict)
+    inline: bool = False
+
+
+class TaskGraph:
+    """
+    (task, symbol) 依赖图
+
+    用法：
+        graph = TaskGraph()
+        graph.add(("ic_analysis", sym), _ic_symbol, sym, inputs={"allowed": ("qc_filter", "*")})
+        graph.add(("ic_analysis", "*"), _ic_merge, inputs={"parts": [("ic_analysis", s) for s in symbols]},
+                  inline=True)
+        results = graph.run(jobs=4)
+    """
+
+    def __init__(self):
+        self.units: Dict[UnitKey, Unit] = {}
+
+    def add(
+        self,
+        key: UnitKey,
+        func: Callable,
+        *args,
+        deps: Sequence[UnitKey] = (),
+        inputs: Optional[Dict[str, InputSpec]] = None,
+        inline: bool = False,
+        **kwargs,
+    ) -> UnitKey:
+        """
+        添加单元
+
+        Args:
+            key: (task, symbol)，全局单元用 symbol="*"
+            func: 执行函数（进程池执行时需为模块级函数）
+            *args, **kwargs: 传给 func 的固定参数
+            deps: 额外依赖（只要求先完成，不注入结果）
+            inputs: {参数名: 依赖键 或 依赖键列表}，结果注入为同名关键字参数
+            inline: True 表示在主进程执行
+
+        Returns:
+            单元键
+        """
+        if key in self.units:
+            raise ValueError(f"Duplicate unit {key}")
+        inputs = inputs or {}
+        all_deps = list(deps)
+        for spec in inputs.values():
+            all_deps += spec if isinstance(spec, list) else [spec]
+        self.units[key] = Unit(key, func, args, kwargs, tuple(dict.fromkeys(all_deps)), inputs, inline)
+        return key
+
+    def _check(self):
+        """检查依赖是否存在、是否有环"""
+        for unit in self.units.values():
+            for d in unit.deps:
+                if d not in self.units:
+                    raise ValueError(f"Unit {unit.key} depends on unknown unit {d}")
+
+        state: Dict[UnitKey, int] = {}
+
+        def visit(k: UnitKey):
+            if state.get(k) == 1:
+                raise ValueError(f"Dependency cycle at {k}")
+            if state.get(k) == 2:
+                return
+            state[k] = 1
+            for d in self.units[k].deps:
+                visit(d)
+            state[k] = 2
+
+        for k in self.units:
+            visit(k)
+
+    def _call_args(self, unit: Unit, results: Dict[UnitKey, Any]) -> Tuple[tuple, dict]:
+        kwargs = dict(unit.kwargs)
+        for name, spec in unit.inputs.items():
+            kwargs[name] = [results[k] for k in spec] if isinstance(spec, list) else results[spec]
+        return unit.args, kwargs
+
+    def run(self, jobs: int = 1, verbose: bool = False,
+            profiler: Optional[StageProfiler] = None) -> Dict[UnitKey, Any]:
+        """
+        执行依赖图
+
+        Args:
+            jobs: 并发进程数；1 表示全部在主进程按拓扑序串行执行
+            verbose: 打印单元完成情况
+            profiler: 记录每个单元的耗时与资源（可选）
+
+        Returns:
+            {单元键: 返回值}
+        """
+        self._check()
+
+        results: Dict[UnitKey, Any] = {}
+        remaining = {k: set(u.deps) for k, u in self.units.items()}
+        dependents: Dict[UnitKey, List[UnitKey]] = {k: [] for k in self.units}
+        for k, u in self.units.items():
+            for d in u.deps:
+                dependents[d].append(k)
+
+        # 按插入顺序维护就绪队列，串行时等价于原有的任务顺序
+        ready = [k for k in self.units if not remaining[k]]
+
+        def complete(k: UnitKey, value: Any):
+            results[k] = value
+            if verbose:
+                print(f"  [done] {k[0]}:{k[1]}")
+            for child in dependents[k]:
+                remaining[child].discard(k)
+                if not remaining[child]:
+                    ready.append(child)
+
+        def run_local(k: UnitKey):
+            args, kwargs = self._call_args(self.units[k], results)
+            if profiler is None:
+                complete(k, self.units[k].func(*args, **kwargs))
+                return
+            with profiler.stage(*k):
+                value = self.units[k].func(*args, **kwargs)
+            complete(k, value)
+
+        if jobs <= 1:
+            while ready:
+                run_local(ready.pop(0))
+            return results
+
+        running = {}
+        with ProcessPoolExecutor(max_workers=jobs) as ex:
+            while ready or running:
+                # 先提交所有就绪的进程池单元，再执行主进程单元
+                inline_ready = []
+                while ready:
+                    k = ready.pop(0)
+                    unit = self.units[k]
+                    if unit.inline:
+                        inline_ready.append(k)
+                        continue
+                    args, kwargs = self._call_args(unit, results)
+                    if profiler is None:
+                        running[ex.submit(unit.func, *args, **kwargs)] = k
+                    else:
+                        running[ex.submit(timed_call, unit.func, *args, **kwargs)] = k
+
+                for k in inline_ready:
+                    run_local(k)
+
+                if ready or not running:
+                    continue
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    k = running.pop(fut)
+                    if profiler is None:
+                        complete(k, fut.result())
+                    else:
+                        value, record = fut.result()
+                        profiler.add(*k, record)
+                        complete(k, value)
+
+        return results
@@ -0,0 +1,292 @@
+"""
+内存映射的分钟特征库
+
+把分钟 OFI、标签（及可选的相对点差）面板物化为未压缩的 Arrow IPC 文件，
+分析阶段直接内存映射打开，不再逐日读取、解压 parquet：
+- panel.arrow：按 symbol, date, minute 排序的长表，每个标的一个 record batch；
+  列为 symbol, date, minute, <特征列>, ret[, rel_spread]
+- index.parquet：每个 (symbol, date) 在表中的行区间 [start, stop)
+- meta.json：列、来源目录与构建时间
+
+打开时用 pyarrow.memory_map 映射文件，按索引切片是零拷贝的；
+多个进程映射同一文件时共享操作系统页缓存。
+
+用法：
+    build_feature_store(symbols, "data/features/minute_store")
+    store = FeatureStore.open("data/features/minute_store")
+    store.day("510050.XSHG", "2021-01-04")                  # 单日 DataFrame
+    store.panel(symbols, "2021-01-01", "2021-12-31")        # 与 load_minute_panel 相同的长表
+"""
+from __future__ import annotations
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .features_ofi import resolve_dtype
+from .io import in_date_range
+from .panel import PANEL_KEYS, load_minute_panel, minute_rel_spread
+from .paths import DATA_DIR, OFI_FEATURES_DIR, LABELS_DIR, PROCESSED_TICKS_DIR
+
+STORE_DIR = DATA_DIR / "features" / "minute_store"
+DEFAULT_FEATURES = [f"ofi{i}" for i in range(1, 6)] + ["ofi"]
+
+PANEL_FILE = "panel.arrow"
+INDEX_FILE = "index.parquet"
+META_FILE = "meta.json"
+
+
+def _to_arrow(day: pd.DataFrame, columns: List[str]) -> pa.RecordBatch:
+    arrays = [
+        # IPC 文件格式不允许各 batch 的字典不同，键列直接存字符串
+        pa.array(day["symbol"].to_numpy(), pa.string()),
+        pa.array(day["date"].to_numpy(), pa.string()),
+        pa.array(day["minute"].to_numpy().astype("datetime64[ns]"), pa.timestamp("ns")),
+    ] + [pa.array(day[c].to_numpy(dtype=np.float32 if day[c].dtype == np.float32 else np.float64))
+         for c in columns]  # float32 特征（precision: float32）按原精度存储
+    return pa.RecordBatch.from_arrays(arrays, names=PANEL_KEYS + columns)
+
+
+def build_feature_store(
+    symbols: Iterable[str],
+    store_dir: Path = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    feature_cols: Optional[List[str]] = None,
+    with_spread: bool = True,
+    ofi_root: Path = None,
+    label_root: Path = None,
+    processed_root: Path = None,
+    verbose: bool = False,
+) -> Path:
+    """
+    物化分钟特征库（整体重建；写临时文件后原子替换，已打开的旧映射不受影响）
+
+    Args:
+        symbols: 标的列表
+        store_dir: 输出目录，默认 data/features/minute_store
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+        feature_cols: 特征列，默认 ofi1..ofi5, ofi
+        with_spread: 是否附加 rel_spread 列（由 processed tick 计算，回测/扫描使用）
+        ofi_root, label_root, processed_root: 数据根目录，默认 paths 中的目录
+        verbose: 打印进度
+
+    Returns:
+        panel.arrow 路径
+    """
+    store_dir = STORE_DIR if store_dir is None else Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    feature_cols = list(feature_cols or DEFAULT_FEATURES)
+    columns = feature_cols + ["ret"] + (["rel_spread"] if with_spread else [])
+    schema = _to_arrow(pd.DataFrame(columns=PANEL_KEYS + columns), columns).schema
+
+    panel_path = store_dir / PANEL_FILE
+    tmp_path = store_dir / (PANEL_FILE + ".tmp")
+    index_rows = []
+    offset = 0
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for symbol in symbols:
+            panel = load_minute_panel(
+                [symbol], start_date, end_date, feature_cols=feature_cols,
+                ofi_root=ofi_root, label_root=label_root,
+                with_spread=with_spread, processed_root=processed_root,
+            )
+            if len(panel) == 0:
+                continue
+            # load_minute_panel 按 symbol, minute 排序，同一天的行是连续的
+            dates = panel["date"].to_numpy()
+            starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+            stops = np.r_[starts[1:], len(panel)]
+            for s, e in zip(starts, stops):
+                index_rows.append((symbol, dates[s], offset + int(s), offset + int(e)))
+            writer.write_batch(_to_arrow(panel, columns))
+            offset += len(panel)
+            if verbose:
+                print(f"  [store] {symbol}: {len(starts)} days, {len(panel)} rows")
+
+    index = pd.DataFrame(index_rows, columns=["symbol", "date", "start", "stop"])
+    index.to_parquet(store_dir / INDEX_FILE, index=False)
+    os.replace(tmp_path, panel_path)
+    meta = {
+        "created": datetime.now().isoformat(),
+        "columns": columns,
+        "feature_cols": feature_cols,
+        "with_spread": with_spread,
+        "n_rows": offset,
+        "n_days": len(index),
+        "start_date": start_date,
+        "end_date": end_date,
+        "ofi_root": str(ofi_root or OFI_FEATURES_DIR),
+        "label_root": str(label_root or LABELS_DIR),
+        "processed_root": str(processed_root or PROCESSED_TICKS_DIR),
+    }
+    with open(store_dir / META_FILE, "w") as f:
+        json.dump(meta, f, indent=2)
+    if verbose:
+        print(f"  [store] {offset} rows, {len(index)} symbol-days -> {panel_path}")
+    return panel_path
+
+
+class FeatureStore:
+    """
+    内存映射的分钟特征库（只读）
+
+    table 为映射在 panel.arrow 上的 Arrow 表；按 (symbol, date) 取切片不拷贝数据，
+    数值列的 NumPy 视图直接指向映射内存。
+    """
+
+    def __init__(self, table: pa.Table, index: pd.DataFrame, meta: dict, path: Path):
+        self.table = table
+        self.index = index
+        self.meta = meta
+        self.path = path
+        self._loc: Dict[Tuple[str, str], Tuple[int, int]] = {
+            (s, d): (int(a), int(b))
+            for s, d, a, b in index[["symbol", "date", "start", "stop"]].itertuples(index=False)
+        }
+
+    @classmethod
+    def open(cls, store_dir: Path = None) -> "FeatureStore":
+        """内存映射打开特征库"""
+        store_dir = STORE_DIR if store_dir is None else Path(store_dir)
+        path = store_dir / PANEL_FILE
+        if not path.exists():
+            raise FileNotFoundError(f"Feature store not found: {path} (run build_feature_store first)")
+        source = pa.memory_map(str(path), "r")
+        table = pa.ipc.open_file(source).read_all()
+        index = pd.read_parquet(store_dir / INDEX_FILE)
+        with open(store_dir / META_FILE) as f:
+            meta = json.load(f)
+        return cls(table, index, meta, path)
+
+    @property
+    def columns(self) -> List[str]:
+        """特征、标签等数值列"""
+        return list(self.meta["columns"])
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(dict.fromkeys(self.index["symbol"]))
+
+    def days(
+        self,
+        symbol: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+    ) -> List[str]:
+        """标的在日期区间内的交易日"""
+        dates = self.index.loc[self.index["symbol"] == symbol, "date"]
+        return [d for d in dates if in_date_range(d, start_date, end_date)]
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._loc
+
+    def slice(self, symbol: str, date: str) -> pa.Table:
+        """单个 (symbol, date) 的零拷贝切片"""
+        start, stop = self._loc[(symbol, date)]
+        return self.table.slice(start, stop - start)
+
+    def column(self, name: str, symbol: str, date: str) -> np.ndarray:
+        """单日某一数值列的 NumPy 视图（指向映射内存，只读）"""
+        return self.slice(symbol, date).column(name).chunk(0).to_numpy(zero_copy_only=True)
+
+    def day(self, symbol: str, date: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """单日数据，index 为 minute"""
+        part = self.slice(symbol, date)
+        columns = columns or self.columns
+        return pd.DataFrame(
+            {c: part.column(c).chunk(0).to_numpy(zero_copy_only=True) for c in columns},
+            index=pd.DatetimeIndex(part.column("minute").chunk(0).to_numpy(), name="minute"),
+        )
+
+    def iter_days(
+        self,
+        symbol: str,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        allowed: Optional[set] = None,
+        columns: Optional[List[str]] = None,
+    ) -> Iterator[Tuple[str, pd.DataFrame]]:
+        """按日期顺序迭代 (date, 单日 DataFrame)"""
+        for date in self.days(symbol, start_date, end_date):
+            if allowed is not None and (symbol, date) not in allowed:
+                continue
+            yield date, self.day(symbol, date, columns)
+
+    def panel(
+        self,
+        symbols: Iterable[str],
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        allowed: Optional[set] = None,
+        feature_cols: Optional[List[str]] = None,
+        with_spread: bool = False,
+        dtype=None,
+    ) -> pd.DataFrame:
+        """
+        与 load_minute_panel 格式相同的长表
+
+        Args:
+            symbols, start_date, end_date, allowed, feature_cols, with_spread, dtype: 见 load_minute_panel
+
+        Returns:
+            DataFrame，列为 symbol, date, minute, <feature_cols>, ret[, rel_spread]
+        """
+        feature_cols = feature_cols or ["ofi"]
+        missing = [c for c in feature_cols if c not in self.columns]
+        if missing:
+            raise KeyError(f"Columns {missing} not in feature store {self.path} (has {self.columns})")
+        spread_in_store = "rel_spread" in self.columns
+        value_cols = feature_cols + ["ret"] + (["rel_spread"] if with_spread and spread_in_store else [])
+
+        keys = []
+        for symbol in symbols:
+            for date in self.days(symbol, start_date, end_date):
+                if allowed is None or (symbol, date) in allowed:
+                    keys.append((symbol, date))
+        if not keys:
+            extra = ["rel_spread"] if with_spread else []
+            return pd.DataFrame(columns=PANEL_KEYS + feature_cols + ["ret"] + extra)
+
+        parts = pa.concat_tables([self.slice(s, d) for s, d in keys]).select(PANEL_KEYS + value_cols)
+        panel = parts.to_pandas()
+        panel["symbol"] = panel["symbol"].astype(str)
+        panel["date"] = panel["date"].astype(str)
+
+        if with_spread and not spread_in_store:
+            # 特征库未包含点差时回退为逐日由 processed tick 计算
+            processed_root = Path(self.meta.get("processed_root", PROCESSED_TICKS_DIR))
+            spread = np.full(len(panel), np.nan)
+            for (symbol, date), idx in panel.groupby(["symbol", "date"], sort=False).indices.items():
+                tick_file = processed_root / symbol / date / "part.parquet"
+                if tick_file.exists():
+                    minutes = pd.DatetimeIndex(panel["minute"].to_numpy()[idx])
+                    spread[idx] = minute_rel_spread(tick_file).reindex(minutes).to_numpy(dtype=float)
+            panel["rel_spread"] = spread
+
+        panel = panel.sort_values(["symbol", "minute"], kind="mergesort").reset_index(drop=True)
+        if dtype is not None:
+            value_cols = feature_cols + ["ret"] + (["rel_spread"] if with_spread else [])
+            panel[value_cols] = panel[value_cols].astype(resolve_dtype(dtype))
+        return panel
+
+
+# 每个进程缓存已打开的特征库（按路径与文件修改时间），避免每个单元重复映射
+_OPEN_STORES: Dict[str, Tuple[float, FeatureStore]] = {}
+
+
+def open_feature_store(store_dir: Path = None) -> FeatureStore:
+    """打开特征库（同一进程内复用已映射的实例；文件重建后自动重新打开）"""
+    store_dir = STORE_DIR if store_dir is None else Path(store_dir)
+    key = str(store_dir.resolve())
+    mtime = (store_dir / PANEL_FILE).stat().st_mtime
+    cached = _OPEN_STORES.get(key)
+    if cached is None or cached[0] != mtime:
+        cached = _OPEN_STORES[key] = (mtime, FeatureStore.open(store_dir))
+    return cached[1]
@@ -0,0 +1,314 @@
+"""
+流式 OFI 累加器
+
+逐笔（或分批）接收盘口快照，维护上一笔快照与分档 OFI 的分钟累加，
+在 O(1) 时间内给出最近 1/3/5 分钟等滚动窗口的 OFI 之和。
+口径与 features_ofi.compute_ofi_per_tick 一致：
+- 重置后的第一笔快照只作为基准，不产生 OFI
+- 单档缺失（NaN）的 OFI 记为 0
+- skip_crossed=True 时与 jq_strategy 的 get_ofi 一致：L1 价格非正或交叉的快照不计入 OFI，
+  但仍作为下一笔的基准
+
+窗口按自然分钟计算：window(3) 为当前分钟（可未走完）及之前 2 个分钟的 OFI 之和，
+无成交的分钟（含午休）记为 0；active_minutes(3) 为其中有 OFI 观测（至少一对相邻快照）的分钟数。
+已在别处算好的分档 OFI 可用 add() 直接计入某一分钟。
+
+分钟桶默认左闭 [m, m+1)，与 aggregate_to_minute 一致；closed="right" 时为 (m-1, m]，
+与以结束时刻标记的分钟 bar（聚宽 every_bar 在 dt 时刻处理 (dt-1min, dt] 的数据）一致。
+session_clock=True 时按 A 股交易分钟计数：午休 11:30-13:00 不占分钟（并入 11:30 所在分钟），
+window(N) 即最近 N 根分钟 bar，跨午休时不会因自然分钟的空档丢失观测。
+"""
+from __future__ import annotations
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+_NS_PER_MINUTE = 60 * 1_000_000_000
+_MINUTES_PER_DAY = 24 * 60
+# 午休：(11:30, 13:00] 的分钟并入 11:30
+_LUNCH_START = 11 * 60 + 30
+_LUNCH_END = 13 * 60
+_LUNCH_MINUTES = _LUNCH_END - _LUNCH_START
+
+
+def _to_ns(ts) -> np.ndarray:
+    """时间戳（标量或数组）统一转为 int64 纳秒"""
+    if np.ndim(ts) == 0 and not isinstance(ts, (int, np.integer)):
+        return np.int64(pd.Timestamp(ts).value)
+    arr = np.asarray(ts)
+    if np.issubdtype(arr.dtype, np.integer):
+        return arr.astype(np.int64)
+    if not np.issubdtype(arr.dtype, np.datetime64):
+        arr = np.asarray(pd.to_datetime(arr))
+    return arr.astype("datetime64[ns]").view(np.int64)
+
+
+def level_ofi(
+    prev: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+    curr: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+) -> np.ndarray:
+    """
+    分档 OFI：Δb - Δa（NaN 记为 0）
+
+    Args:
+        prev: 上一笔 (ask_p, ask_v, bid_p, bid_v)，每项 shape (..., levels)
+        curr: 当前 (ask_p, ask_v, bid_p, bid_v)，shape 与 prev 相同
+
+    Returns:
+        shape (..., levels) 的 OFI
+    """
+    ap0, av0, bp0, bv0 = prev
+    ap1, av1, bp1, bv1 = curr
+    with np.errstate(invalid="ignore"):
+        db = np.where(bp1 > bp0, bv1, np.where(bp1 == bp0, bv1 - bv0, -bv0))
+        da = np.where(ap1 < ap0, av1, np.where(ap1 == ap0, av1 - av0, -av0))
+    out = db - da
+    out[~np.isfinite(out)] = 0.0
+    return out
+
+
+class OfiAccumulator:
+    """
+    单标的流式 OFI 累加器
+
+    用法：
+        acc = OfiAccumulator(levels=5, windows=(1, 3, 5))
+        for snap in ticks:
+            acc.update(snap.ts, snap.ask_p, snap.ask_v, snap.bid_p, snap.bid_v)
+        acc.ofi(3)            # 最近3分钟加权 OFI
+        acc.window(3)         # 最近3分钟分档 OFI，shape (levels,)
+        acc.active_minutes(3) # 最近3分钟中有 OFI 观测的分钟数
+
+    分钟桶为长度 max(windows) 的环形数组；每个窗口维护一个分档累加和，
+    新分钟开始时减去滑出窗口的分钟桶，因此单笔更新与查询都是 O(1)
+    （与窗口长度、已处理 tick 数无关）。
+    """
+
+    def __init__(
+        self,
+        levels: int = 5,
+        weight: Optional[Sequence[float]] = None,
+        windows: Sequence[int] = (1, 3, 5),
+        skip_crossed: bool = False,
+        closed: str = "left",
+        session_clock: bool = False,
+    ):
+        """
+        Args:
+            levels: 档位数
+            weight: 各档权重（只在 ofi() 合成时使用），默认全 1
+            windows: 维护的滚动窗口（分钟）
+            skip_crossed: 是否跳过 L1 非正/交叉的快照（jq_strategy 口径）
+            closed: "left" 分钟桶为 [m, m+1)；"right" 为 (m-1, m]（分钟 bar 口径）
+            session_clock: 是否按交易分钟计数（午休不占分钟）
+        """
+        self.levels = levels
+        self.weight = np.ones(levels) if weight is None else np.asarray(weight, dtype=float)
+        if len(self.weight) != levels:
+            raise ValueError(f"len(weight)={len(self.weight)} != levels={levels}")
+        self.windows = tuple(sorted(set(int(w) for w in windows)))
+        if not self.windows or self.windows[0] < 1:
+            raise ValueError(f"Invalid windows: {windows}")
+        self.skip_crossed = skip_crossed
+        if closed not in ("left", "right"):
+            raise ValueError(f"closed must be 'left' or 'right', got {closed!r}")
+        self.closed = closed
+        self.session_clock = session_clock
+        self._n_buckets = self.windows[-1]
+        self.reset()
+
+    def reset(self):
+        """清空基准快照与所有窗口（如每日开盘前）"""
+        self._prev: Optional[Tuple[np.ndarray, ...]] = None
+        self._minute: Optional[int] = None
+        self._buckets = np.zeros((self._n_buckets, self.levels))
+        self._active = np.zeros(self._n_buckets, dtype=bool)
+        self._sums: Dict[int, np.ndarray] = {w: np.zeros(self.levels) for w in self.windows}
+        self._n_active: Dict[int, int] = {w: 0 for w in self.windows}
+        self.n_ticks = 0
+        self.last_ts: Optional[int] = None
+
+    # ------------------------------------------------------------------
+    # 分钟桶
+    # ------------------------------------------------------------------
+    def _minute_of(self, ns):
+        """纳秒时间戳（标量或数组）-> 分钟桶序号"""
+        ns = np.asarray(ns, dtype=np.int64)
+        minute = ns // _NS_PER_MINUTE if self.closed == "left" else -(-ns // _NS_PER_MINUTE)
+        if self.session_clock:
+            day, mod = np.divmod(minute, _MINUTES_PER_DAY)
+            mod = np.where(mod <= _LUNCH_START, mod,
+                           np.where(mod <= _LUNCH_END, _LUNCH_START, mod - _LUNCH_MINUTES))
+            minute = day * _MINUTES_PER_DAY + mod
+        return minute if minute.ndim else int(minute)
+
+    def _advance(self, minute: int):
+        """把时钟推进到 minute，滑出窗口的分钟桶从各累加和中减去"""
+        if self._minute is None:
+            self._minute = minute
+            return
+        gap = minute - self._minute
+        if gap <= 0:
+            return
+        if gap >= self._n_buckets:
+            self._buckets[:] = 0.0
+            self._active[:] = False
+            for s in self._sums.values():
+                s[:] = 0.0
+            for w in self._n_active:
+                self._n_active[w] = 0
+        else:
+            nb = self._n_buckets
+            for t in range(self._minute + 1, minute + 1):
+                for w, s in self._sums.items():
+                    s -= self._buckets[(t - w) % nb]
+                    self._n_active[w] -= int(self._active[(t - w) % nb])
+                self._buckets[t % nb] = 0.0
+                self._active[t % nb] = False
+        self._minute = minute
+
+    def _add(self, minute: int, values: np.ndarray, active: bool = True):
+        # 乱序到达的快照计入当前分钟
+        if self._minute is not None and minute < self._minute:
+            minute = self._minute
+        self._advance(minute)
+        b = minute % self._n_buckets
+        self._buckets[b] += values
+        for s in self._sums.values():
+            s += values
+        if active and not self._active[b]:
+            self._active[b] = True
+            for w in self._n_active:
+                self._n_active[w] += 1
+
+    def advance_to(self, ts):
+        """无新快照时推进时钟（如在整分钟 bar 上查询窗口前）"""
+        self._advance(self._minute_of(int(_to_ns(ts))))
+
+    # ------------------------------------------------------------------
+    # 更新
+    # ------------------------------------------------------------------
+    def _valid_l1(self, ask_p: np.ndarray, bid_p: np.ndarray) -> np.ndarray:
+        a1, b1 = ask_p[..., 0], bid_p[..., 0]
+        return (a1 > 0) & (b1 > 0) & (a1 > b1)
+
+    def update(self, ts, ask_p, ask_v, bid_p, bid_v) -> np.ndarray:
+        """
+        接收一笔快照
+
+        Args:
+            ts: 时间戳（datetime / Timestamp / int 纳秒）
+            ask_p, ask_v, bid_p, bid_v: 长度为 levels 的数组（1 档在前）
+
+        Returns:
+            本笔快照的分档 OFI，shape (levels,)
+        """
+        curr = tuple(np.asarray(x, dtype=float)[:self.levels] for x in (ask_p, ask_v, bid_p, bid_v))
+        ns = int(_to_ns(ts))
+        minute = self._minute_of(ns)
+
+        first = self._prev is None
+        if first or (self.skip_crossed and not self._valid_l1(curr[0], curr[2])):
+            values = np.zeros(self.levels)
+        else:
+            values = level_ofi(self._prev, curr)
+
+        self._prev = curr
+        self._add(minute, values, active=not first)
+        self.n_ticks += 1
+        self.last_ts = ns
+        return values
+
+    def update_batch(self, ts, ask_p, ask_v, bid_p, bid_v) -> np.ndarray:
+        """
+        按时间顺序接收一批快照（向量化计算，按分钟分段写入窗口）
+
+        Args:
+            ts: 长度 n 的时间戳数组
+            ask_p, ask_v, bid_p, bid_v: shape (n, levels) 数组
+
+        Returns:
+            每笔快照的分档 OFI，shape (n, levels)
+        """
+        ns = _to_ns(ts)
+        n = len(ns)
+        if n == 0:
+            return np.zeros((0, self.levels))
+        curr = tuple(np.asarray(x, dtype=float)[:, :self.levels] for x in (ask_p, ask_v, bid_p, bid_v))
+
+        values = np.zeros((n, self.levels))
+        if n > 1:
+            values[1:] = level_ofi(tuple(x[:-1] for x in curr), tuple(x[1:] for x in curr))
+        if self._prev is not None:
+            values[0] = level_ofi(self._prev, tuple(x[0] for x in curr))
+        if self.skip_crossed:
+            values[~self._valid_l1(curr[0], curr[2])] = 0.0
+
+        # 同一分钟内的快照先求和，再逐分钟写入环形桶；重置后的第一笔不构成 OFI 观测
+        minutes = self._minute_of(ns)
+        starts = np.flatnonzero(np.r_[True, minutes[1:] != minutes[:-1]])
+        sums = np.add.reduceat(values, starts, axis=0)
+        has_pair = np.ones(n, dtype=bool)
+        has_pair[0] = self._prev is not None
+        active = np.logical_or.reduceat(has_pair, starts)
+        for m, v, a in zip(minutes[starts], sums, active):
+            self._add(int(m), v, active=bool(a))
+
+        self._prev = tuple(x[-1] for x in curr)
+        self.n_ticks += n
+        self.last_ts = int(ns[-1])
+        return values
+
+    def add(self, ts, values):
+        """
+        把已算好的分档 OFI 计入 ts 所在分钟（如 jq_strategy 中一个 bar 窗口的 OFI），
+        该分钟计为有 OFI 观测；不改变上一笔快照
+
+        Args:
+            ts: 时间戳
+            values: 分档 OFI，长度为 levels
+        """
+        self._add(self._minute_of(int(_to_ns(ts))), np.asarray(values, dtype=float)[:self.levels])
+
+    def update_frame(self, df: pd.DataFrame, time_col: str = "ts") -> np.ndarray:
+        """
+        接收 DataFrame 形式的一批快照（列 ts/time, a{i}_p, a{i}_v, b{i}_p, b{i}_v）
+
+        Returns:
+            每笔快照的分档 OFI，shape (n, levels)
+        """
+        ts = df.index if time_col not in df.columns else df[time_col]
+        cols = lambda side, kind: df[[f"{side}{i}_{kind}" for i in range(1, self.levels + 1)]].to_numpy(dtype=float)
+        return self.update_batch(np.asarray(ts), cols("a", "p"), cols("a", "v"), cols("b", "p"), cols("b", "v"))
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def window(self, minutes: int) -> np.ndarray:
+        """最近 minutes 分钟（含当前分钟）的分档 OFI 之和，shape (levels,)"""
+        if minutes not in self._sums:
+            raise KeyError(f"Window {minutes} not maintained, available: {self.windows}")
+        return self._sums[minutes].copy()
+
+    def active_minutes(self, minutes: int) -> int:
+        """最近 minutes 分钟中有 OFI 观测的分钟数"""
+        if minutes not in self._n_active:
+            raise KeyError(f"Window {minutes} not maintained, available: {self.windows}")
+        return self._n_active[minutes]
+
+    def ofi(self, minutes: int) -> float:
+        """最近 minutes 分钟的加权 OFI"""
+        if minutes not in self._sums:
+            raise KeyError(f"Window {minutes} not maintained, available: {self.windows}")
+        return float(self._sums[minutes] @ self.weight)
+
+    @property
+    def current_minute(self) -> Optional[pd.Timestamp]:
+        """当前所在分钟（分钟桶的标记时刻）"""
+        if self._minute is None:
+            return None
+        minute = self._minute
+        if self.session_clock:
+            day, mod = divmod(minute, _MINUTES_PER_DAY)
+            minute = day * _MINUTES_PER_DAY + (mod if mod <= _LUNCH_START else mod + _LUNCH_MINUTES)
+        return pd.Timestamp(minute * _NS_PER_MINUTE)
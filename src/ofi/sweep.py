@@ -0,0 +1,220 @@
+"""
+策略超参数扫描
+
+在本地回测（backtest.long_topk_backtest）之上批量评估参数组合：
+- 分档 OFI 网格只构建一次；每个信号窗口下各档的滚动和也只算一次，
+  不同 levels / weight 的信号窗口和由各档窗口和线性组合得到
+- 参数组合分块提交到进程池，网格数据通过 initializer 每个进程只传一次
+- 进程只返回逐日收益/换手/成本，所有组合的汇总指标在主进程由 compute_metrics 一次向量化算出
+- 结果表每行一个组合：参数 + Sharpe、Sortino、回撤、换手、成本等汇总指标
+
+参数空间示例（data.yaml 的 sweep 块）：
+    balance_interval: [1, 3, 5]
+    k_long: [1, 2]
+    levels: [1, 3, 5]
+    k_spread: [0.5, 1.0]
+    weight: [[1, 1, 1, 1, 1], [1, 0.8, 0.6, 0.4, 0.2]]   # 按 levels 截取前几档
+"""
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from .backtest import (
+    MinuteGrid, build_minute_grid, session_window_sum, long_topk_backtest,
+    daily_pnl, DAILY_COLUMNS, _summary_rows,
+)
+
+
+DEFAULT_PARAMS = {
+    "balance_interval": 3,
+    "k_long": 2,
+    "ofi_window": 3,
+    "levels": 5,
+    "weight": None,
+    "k_spread": 0.5,
+    "gross": 0.98,
+}
+
+
+def expand_grid(space: Dict[str, Sequence]) -> List[dict]:
+    """
+    参数空间笛卡尔积
+
+    weight 按 levels 截取前几档；截取后等价的组合（如 levels=1 时不同的权重向量）只保留一个。
+
+    Args:
+        space: {参数名: 候选值列表}，未给出的参数取 DEFAULT_PARAMS
+
+    Returns:
+        参数字典列表
+    """
+    keys = list(space)
+    configs, seen = [], set()
+    for values in product(*(space[k] for k in keys)):
+        p = {**DEFAULT_PARAMS, **dict(zip(keys, values))}
+        if p["weight"] is not None:
+            p["weight"] = [float(w) for w in list(p["weight"])[:int(p["levels"])]]
+        key = tuple((k, tuple(v) if isinstance(v, list) else v) for k, v in p.items())
+        if key not in seen:
+            seen.add(key)
+            configs.append(p)
+    return configs
+
+
+def sample_grid(space: Dict[str, Sequence], n: int, seed: int = 0) -> List[dict]:
+    """
+    从参数空间中无放回随机抽取 n 个组合
+
+    Args:
+        space: {参数名: 候选值列表}
+        n: 抽样个数（超过组合总数时返回全部）
+        seed: 随机种子
+
+    Returns:
+        参数字典列表
+    """
+    configs = expand_grid(space)
+    if n >= len(configs):
+        return configs
+    rng = np.random.default_rng(seed)
+    return [configs[i] for i in sorted(rng.choice(len(configs), size=n, replace=False))]
+
+
+class LevelWindowCache:
+    """
+    各档 OFI 的会话窗口和缓存
+
+    对每个 ofi_window 只计算一次 (L, D, 240, N) 的分档窗口和；
+    任意 levels / weight 的信号窗口和 = Σ_l w_l · S_l。
+    """
+
+    def __init__(self, grid: MinuteGrid, max_levels: int):
+        self.grid = grid
+        self.max_levels = max_levels
+        self.levels = np.stack([grid.features[f"ofi{i}"] for i in range(1, max_levels + 1)])
+        self._sums: Dict[int, np.ndarray] = {}
+        self._counts: Dict[Tuple[int, int], np.ndarray] = {}
+
+    def window_sums(self, window: int, levels: int, weight: Optional[Sequence[float]] = None):
+        """返回 (信号窗口和, 窗口内有效分钟数)，与 session_window_sum(level_signal(...)) 一致"""
+        if levels > self.max_levels:
+            raise ValueError(f"levels={levels} > precomputed {self.max_levels}")
+        weight = np.ones(levels) if weight is None else np.asarray(weight, dtype=float)[:levels]
+        if len(weight) != levels:
+            raise ValueError(f"len(weight)={len(weight)} < levels={levels}")
+
+        if window not in self._sums:
+            self._sums[window] = np.stack([session_window_sum(x, window)[0] for x in self.levels])
+        if (window, levels) not in self._counts:
+            present = (~np.isnan(self.levels[:levels])).any(axis=0)
+            mask = np.where(present, 0.0, np.nan)
+            self._counts[(window, levels)] = session_window_sum(mask, window)[1]
+
+        sums = np.tensordot(weight, self._sums[window][:levels], axes=1)
+        return sums, self._counts[(window, levels)]
+
+
+# 进程池 worker 的共享状态（由 initializer 设置，每个进程只反序列化一次网格）
+_WORKER_CACHE: Optional[LevelWindowCache] = None
+
+
+def _init_worker(grid: MinuteGrid, max_levels: int):
+    global _WORKER_CACHE
+    _WORKER_CACHE = LevelWindowCache(grid, max_levels)
+
+
+def _params_row(p: dict) -> dict:
+    row = {k: p[k] for k in DEFAULT_PARAMS}
+    if row["weight"] is not None:
+        row["weight"] = ",".join(f"{w:g}" for w in list(row["weight"])[:int(p["levels"])])
+    return row
+
+
+def _run_config(cache: LevelWindowCache, params: dict) -> pd.DataFrame:
+    """回测单个参数组合，返回 daily_pnl 的逐日汇总"""
+    p = {**DEFAULT_PARAMS, **params}
+    sums, counts = cache.window_sums(p["ofi_window"], p["levels"], p["weight"])
+    result = long_topk_backtest(
+        cache.grid, sums, p["balance_interval"], p["k_long"], p["ofi_window"],
+        p["k_spread"], p["gross"], window_sums=(sums, counts),
+    )
+    return daily_pnl(result.pnl)
+
+
+def evaluate_config(cache: LevelWindowCache, params: dict, periods_per_year: int = 252) -> dict:
+    """
+    评估单个参数组合
+
+    Args:
+        cache: 分档窗口和缓存
+        params: 参数字典（缺省项取 DEFAULT_PARAMS）
+        periods_per_year: 年化交易日数
+
+    Returns:
+        参数与回测汇总指标合并后的字典
+    """
+    p = {**DEFAULT_PARAMS, **params}
+    daily = _run_config(cache, p)
+    row = _params_row(p)
+    row.update(_summary_rows(daily.to_numpy()[:, :, None], list(daily.columns), periods_per_year)[0]
+               if len(daily) else {"n_days": 0})
+    return row
+
+
+def _evaluate_chunk(configs: List[dict]) -> List[np.ndarray]:
+    return [_run_config(_WORKER_CACHE, p).to_numpy() for p in configs]
+
+
+def run_sweep(
+    panel: pd.DataFrame,
+    configs: List[dict],
+    n_jobs: int = 1,
+    chunk_size: int = 8,
+    verbose: bool = False,
+    periods_per_year: int = 252,
+) -> pd.DataFrame:
+    """
+    在分钟面板上批量回测参数组合
+
+    Args:
+        panel: load_minute_panel 的输出，需包含 ofi1..ofi{max levels}，
+               含 rel_spread 时计入点差成本
+        configs: 参数字典列表（expand_grid / sample_grid 的输出）
+        n_jobs: 进程数；1 表示在主进程串行
+        chunk_size: 每次提交给进程池的组合数
+        verbose: 打印进度
+        periods_per_year: 年化交易日数
+
+    Returns:
+        结果表（每行一个组合），按 sharpe 降序
+    """
+    configs = [{**DEFAULT_PARAMS, **c} for c in configs]
+    if not configs:
+        return pd.DataFrame()
+    max_levels = max(int(c["levels"]) for c in configs)
+    grid = build_minute_grid(panel, [f"ofi{i}" for i in range(1, max_levels + 1)])
+
+    if n_jobs <= 1:
+        cache = LevelWindowCache(grid, max_levels)
+        daily = []
+        for i, p in enumerate(configs, 1):
+            daily.append(_run_config(cache, p).to_numpy())
+            if verbose and i % 50 == 0:
+                print(f"  [sweep] {i}/{len(configs)}")
+    else:
+        chunks = [configs[i:i + chunk_size] for i in range(0, len(configs), chunk_size)]
+        daily = []
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(grid, max_levels)) as ex:
+            for part in ex.map(_evaluate_chunk, chunks):
+                daily.extend(part)
+                if verbose:
+                    print(f"  [sweep] {len(daily)}/{len(configs)}")
+
+    # 所有组合共用同一网格的交易日，逐日结果堆成 (天, 列, 组合) 后一次算出汇总指标
+    summaries = _summary_rows(np.stack(daily, axis=2), DAILY_COLUMNS, periods_per_year)
+    rows = [{**_params_row(p), **m} for p, m in zip(configs, summaries)]
+    return pd.DataFrame(rows).sort_values("sharpe", ascending=False, kind="mergesort").reset_index(drop=True)
@@ -0,0 +1,319 @@
+"""
+合成五档盘口数据生成器（规模测试用）
+
+为 N 个标的 × M 个交易日生成确定性的合成快照，按 io.raw_path 的布局写出原始 csv.gz
+（列结构与真实数据相同，可直接由 read_raw_lob_csv / convert_one_day 读取），
+可选同时写出 processed parquet：
+- 交易时段 09:30:00~11:30:00、13:00:00~15:00:00，默认每 3 秒一个快照槽位，
+  fill_rate < 1 时随机丢弃部分槽位（模拟成交不活跃的标的），午休无数据
+- 价格为最小变动价位（默认 0.001）的整数倍，点差大多为 1 个 tick
+- 订单流：每个快照有一个潜在订单流冲击 f_t；价位不变时各档挂单量随 f_t 累积变化，
+  因此逐笔 OFI 与 f_t 正相关；买一价的涨跌由 ofi_corr·(此前 lag 个快照的冲击之和) + 噪声 决定，
+  ofi_corr 控制分钟 OFI 与下一分钟收益的相关程度（lag=0 时只与同期冲击相关）
+- 缺陷注入：交叉盘口、重复时间戳、零价格，比例分别由 crossed_rate、duplicate_rate、
+  zero_price_rate 控制，用于检验清洗与 QC 各环节
+
+同一 (seed, symbol, date) 与参数总是生成完全相同的数据。
+
+用法：
+    python -m src.ofi.synthetic --n_symbols 300 --n_days 20 --raw_root data/synthetic/raw \\
+        --processed_root data/synthetic/processed --jobs 8
+"""
+from __future__ import annotations
+import argparse
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from .io import raw_path, convert_one_day
+
+LEVELS = 5
+SESSIONS = (("09:30:00", "11:30:00"), ("13:00:00", "15:00:00"))
+
+# 原始数据的列顺序
+RAW_COLUMNS = (
+    ["code", "date", "time", "current", "volume", "money"]
+    + [f"{s}{i}_{k}" for i in range(1, LEVELS + 1) for k in "pv" for s in "ab"]
+)
+
+
+@dataclass
+class SyntheticConfig:
+    """
+    合成数据参数
+
+    Attributes:
+        snapshot_seconds: 快照槽位间隔（秒）
+        fill_rate: 每个槽位出现快照的概率（1 表示每个槽位都有）
+        tick_size: 最小变动价位
+        start_price: 起始价格；None 表示按标的在 [1, 5) 内确定性地取值
+        move_prob: 每个快照买一价变动的概率
+        ofi_corr: 价格变动与订单流冲击的相关系数（-1~1）
+        lag: 驱动价格变动的订单流窗口（此前 lag 个快照，默认 20 个即 1 分钟）；
+            0 表示只由同一快照的冲击驱动
+        flow_scale: 单位订单流冲击对应的挂单量变化（股）
+        depth_decay: 第 l 档挂单对订单流的响应为 depth_decay**(l-1)
+        noise_scale: 各档挂单量的独立噪声标准差（股）
+        crossed_rate: 交叉盘口（a1 <= b1）的快照比例
+        duplicate_rate: 与上一笔时间戳重复的快照比例
+        zero_price_rate: 某一档价格为 0 的快照比例
+    """
+    snapshot_seconds: int = 3
+    fill_rate: float = 1.0
+    tick_size: float = 0.001
+    start_price: Optional[float] = None
+    move_prob: float = 0.3
+    ofi_corr: float = 0.5
+    lag: int = 20
+    flow_scale: float = 500.0
+    depth_decay: float = 0.6
+    noise_scale: float = 200.0
+    crossed_rate: float = 0.0
+    duplicate_rate: float = 0.0
+    zero_price_rate: float = 0.0
+
+
+def _rng(seed: int, symbol: str, date: str) -> np.random.Generator:
+    return np.random.default_rng([seed, zlib.crc32(symbol.encode()), int(date.replace("-", ""))])
+
+
+def synthetic_symbols(n: int) -> List[str]:
+    """n 个合成标的代码（沪深交替，如 510000.XSHG、159001.XSHE）"""
+    return [f"{510000 + i:06d}.XSHG" if i % 2 == 0 else f"{159000 + i:06d}.XSHE" for i in range(n)]
+
+
+def trading_dates(n_days: int, start: str = "2021-01-04") -> List[str]:
+    """从 start 起的 n_days 个工作日"""
+    return [d.strftime("%Y-%m-%d") for d in pd.bdate_range(start, periods=n_days)]
+
+
+def session_times(date: str, snapshot_seconds: int = 3) -> pd.DatetimeIndex:
+    """单日快照槽位（两个连续竞价时段，首尾均含）"""
+    parts = [
+        pd.date_range(f"{date} {start}", f"{date} {end}", freq=f"{snapshot_seconds}s")
+        for start, end in SESSIONS
+    ]
+    return parts[0].append(parts[1])
+
+
+def _start_price(symbol: str, cfg: SyntheticConfig) -> float:
+    if cfg.start_price is not None:
+        return cfg.start_price
+    return 1.0 + 4.0 * (zlib.crc32(symbol.encode()) % 10_000) / 10_000
+
+
+def _queues(rng: np.random.Generator, flow: np.ndarray, segment: np.ndarray, n_seg: int,
+            cfg: SyntheticConfig) -> tuple:
+    """
+    各档挂单量 (bid_v, ask_v)，shape (n, LEVELS)
+
+    价位不变的区间（segment）内，买方挂单随累计订单流增加、卖方减少，
+    因此逐笔 OFI ≈ Σ_l depth_decay^(l-1)·flow_scale·f_t；价位变动时各档重新随机。
+    """
+    n = len(flow)
+    cum = np.cumsum(flow)
+    seg_start = np.flatnonzero(np.r_[True, segment[1:] != segment[:-1]])
+    base = np.repeat(cum[seg_start] - flow[seg_start], np.diff(np.r_[seg_start, n]))
+    since = cum - base                                   # 区间内的累计订单流
+
+    resp = cfg.flow_scale * cfg.depth_decay ** np.arange(LEVELS)
+    bid0 = rng.integers(20, 80, size=(n_seg, LEVELS)) * 100.0
+    ask0 = rng.integers(20, 80, size=(n_seg, LEVELS)) * 100.0
+    noise = rng.normal(0.0, cfg.noise_scale, size=(2, n, LEVELS))
+    bid_v = bid0[segment] + since[:, None] * resp + noise[0]
+    ask_v = ask0[segment] - since[:, None] * resp + noise[1]
+    lot = lambda v: np.maximum(np.round(v / 100.0), 1.0) * 100.0
+    return lot(bid_v), lot(ask_v)
+
+
+def _inject_defects(rng: np.random.Generator, df: pd.DataFrame, cfg: SyntheticConfig) -> pd.DataFrame:
+    n = len(df)
+    if cfg.crossed_rate > 0:
+        bad = rng.random(n) < cfg.crossed_rate
+        df.loc[bad, "a1_p"] = df.loc[bad, "b1_p"]
+    if cfg.zero_price_rate > 0:
+        bad = np.flatnonzero(rng.random(n) < cfg.zero_price_rate)
+        cols = [f"{s}{i}_p" for i in range(1, LEVELS + 1) for s in "ab"]
+        which = rng.integers(0, len(cols), size=len(bad))
+        for j, col in enumerate(cols):
+            df.loc[df.index[bad[which == j]], col] = 0.0
+    if cfg.duplicate_rate > 0:
+        dup = np.flatnonzero(rng.random(n) < cfg.duplicate_rate)
+        dup = dup[dup > 0]
+        df.loc[df.index[dup], "time"] = df["time"].to_numpy()[dup - 1]
+    return df
+
+
+def generate_lob_day(
+    symbol: str,
+    date: str,
+    seed: int = 0,
+    config: Optional[SyntheticConfig] = None,
+    **overrides,
+) -> pd.DataFrame:
+    """
+    生成单个标的单日的原始格式快照
+
+    Args:
+        symbol: 标的代码，如 510050.XSHG
+        date: 日期 YYYY-MM-DD
+        seed: 随机种子
+        config: 合成参数，默认 SyntheticConfig()
+        **overrides: 覆盖 config 中的同名字段
+
+    Returns:
+        列为 RAW_COLUMNS 的 DataFrame
+    """
+    cfg = SyntheticConfig(**{**asdict(config or SyntheticConfig()), **overrides})
+    rng = _rng(seed, symbol, date)
+    ts = session_times(date, cfg.snapshot_seconds)
+    if cfg.fill_rate < 1.0:
+        keep = rng.random(len(ts)) < cfg.fill_rate
+        keep[0] = True
+        ts = ts[keep]
+    n = len(ts)
+
+    # 订单流冲击与价格变动：u = ρ·g_t + sqrt(1-ρ²)·e，|u| 超过阈值时买一价变动 1 tick，
+    # g_t 为驱动项（lag=0 时为 f_t）
+    flow = rng.standard_normal(n)
+    if cfg.lag > 0:
+        # 此前 lag 个快照的订单流冲击之和（标准化），同一窗口内的价格变动共享驱动
+        cum = np.r_[0.0, np.cumsum(flow)]
+        idx = np.arange(n)
+        lagged = (cum[idx] - cum[np.maximum(idx - cfg.lag, 0)]) / np.sqrt(cfg.lag)
+    else:
+        lagged = flow
+    rho = float(np.clip(cfg.ofi_corr, -1.0, 1.0))
+    u = rho * lagged + np.sqrt(1.0 - rho ** 2) * rng.standard_normal(n)
+    q = stats.norm.ppf(1.0 - cfg.move_prob / 2.0)
+    steps = np.where(u > q, 1, np.where(u < -q, -1, 0))
+    steps[0] = 0
+
+    bid1 = int(round(_start_price(symbol, cfg) / cfg.tick_size)) + np.cumsum(steps)
+    spread = np.where(rng.random(n) < 0.9, 1, 2)
+    ask1 = bid1 + spread
+    moved = np.r_[True, (np.diff(bid1) != 0) | (np.diff(ask1) != 0)]
+    segment = np.cumsum(moved) - 1
+    bid_v, ask_v = _queues(rng, flow, segment, int(segment[-1]) + 1, cfg)
+
+    offsets = np.arange(LEVELS)
+    bid_ticks = bid1[:, None] - offsets
+    ask_ticks = ask1[:, None] + offsets
+
+    # 成交价落在买一或卖一；累计成交量、成交额单调递增
+    trade_ticks = np.where(rng.random(n) < 0.5, bid1, ask1)
+    traded = rng.integers(0, 50, size=n) * 100
+    current = np.round(trade_ticks * cfg.tick_size, 3)
+
+    out = {
+        "code": symbol,
+        "date": date,
+        "time": ts.strftime("%Y%m%d%H%M%S").astype(float),
+        "current": current,
+        "volume": np.cumsum(traded),
+        "money": np.round(np.cumsum(traded * current), 2),
+    }
+    for i in range(LEVELS):
+        out[f"a{i + 1}_p"] = np.round(ask_ticks[:, i] * cfg.tick_size, 3)
+        out[f"a{i + 1}_v"] = ask_v[:, i]
+        out[f"b{i + 1}_p"] = np.round(bid_ticks[:, i] * cfg.tick_size, 3)
+        out[f"b{i + 1}_v"] = bid_v[:, i]
+    df = pd.DataFrame(out)[RAW_COLUMNS]
+    return _inject_defects(rng, df, cfg)
+
+
+def write_symbol_days(
+    raw_root: Path,
+    symbol: str,
+    dates: Iterable[str],
+    seed: int = 0,
+    config: Optional[SyntheticConfig] = None,
+    processed_root: Optional[Path] = None,
+) -> List[Path]:
+    """
+    写出单个标的多日的原始 csv.gz（root/年份/标的/日期.csv.gz），可选转换为 processed parquet
+
+    Returns:
+        写出的原始文件路径列表
+    """
+    paths = []
+    for date in dates:
+        path = raw_path(Path(raw_root), int(date[:4]), symbol, date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        generate_lob_day(symbol, date, seed, config).to_csv(
+            path, index=False, compression={"method": "gzip", "compresslevel": 1})
+        if processed_root is not None:
+            convert_one_day(path, Path(processed_root))
+        paths.append(path)
+    return paths
+
+
+def _write_symbol_task(args: tuple) -> List[Path]:
+    return write_symbol_days(*args)
+
+
+def write_raw_days(
+    raw_root: Path,
+    symbols: Sequence[str],
+    dates: Sequence[str],
+    seed: int = 0,
+    config: Optional[SyntheticConfig] = None,
+    processed_root: Optional[Path] = None,
+    n_jobs: int = 1,
+) -> List[Path]:
+    """
+    为 symbols × dates 写出合成数据
+
+    Args:
+        raw_root: 原始数据根目录（与 build_processed 的 --raw_root 相同）
+        symbols: 标的列表（可用 synthetic_symbols 生成）
+        dates: 交易日列表（可用 trading_dates 生成）
+        seed: 随机种子
+        config: 合成参数
+        processed_root: 不为 None 时同时用 convert_one_day 写出 processed parquet
+                        （与 build_processed 的 --processed_root 相同，即 ticks 目录的上一级）
+        n_jobs: 进程数（按标的分配）
+
+    Returns:
+        写出的原始文件路径列表（按标的、日期排序）
+    """
+    tasks = [(raw_root, s, list(dates), seed, config, processed_root) for s in symbols]
+    if n_jobs <= 1:
+        parts = [_write_symbol_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as ex:
+            parts = list(ex.map(_write_symbol_task, tasks))
+    return [p for part in parts for p in part]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="生成合成五档盘口数据（raw csv.gz，可选 processed parquet）")
+    ap.add_argument("--n_symbols", type=int, default=100)
+    ap.add_argument("--n_days", type=int, default=5)
+    ap.add_argument("--start", type=str, default="2021-01-04")
+    ap.add_argument("--raw_root", type=str, default="data/synthetic/raw/ticks")
+    ap.add_argument("--processed_root", type=str, default=None,
+                    help="同时写出 processed parquet（如 data/synthetic/processed）")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--jobs", type=int, default=1)
+    defaults = SyntheticConfig()
+    for name, value in asdict(defaults).items():
+        ap.add_argument(f"--{name}", type=int if isinstance(value, int) else float, default=value)
+    args = ap.parse_args()
+
+    config = SyntheticConfig(**{k: getattr(args, k) for k in asdict(defaults)})
+    symbols = synthetic_symbols(args.n_symbols)
+    dates = trading_dates(args.n_days, args.start)
+    paths = write_raw_days(Path(args.raw_root), symbols, dates, args.seed, config,
+                           Path(args.processed_root) if args.processed_root else None, args.jobs)
+    print(f"Wrote {len(paths)} files ({len(symbols)} symbols x {len(dates)} days) under {args.raw_root}")
+
+
+if __name__ == "__main__":
+    main()
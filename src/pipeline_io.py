@@ -2,7 +2,7 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Tuple, Optional, List
+from typing import Dict, Iterable, Tuple, Optional, List
 import pandas as pd
 import yaml
 
@@ -22,6 +22,11 @@ class OfiConfig:
     agg: str
     output_dir: Path
     overwrite: bool
+    engine: str = "pandas"
+    precision: str = "float64"
+    weights: Optional[Dict[str, List[float]]] = None
+    normalize: bool = False
+    integrated: bool = False
 
 @dataclass(frozen=True)
 class Config:
@@ -50,6 +55,11 @@ def load_config(path: str | os.PathLike) -> Config:
             agg=str(feat["agg"]),
             output_dir=Path(feat["output_dir"]),
             overwrite=bool(feat.get("overwrite", False)),
+            engine=str(feat.get("engine", "pandas")),
+            precision=str(feat.get("precision", "float64")),
+            weights={str(k): [float(x) for x in v] for k, v in (feat.get("weights") or {}).items()} or None,
+            normalize=bool(feat.get("normalize", False)),
+            integrated=bool(feat.get("integrated", False)),
         ),
     )
 
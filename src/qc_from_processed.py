@@ -1,67 +1,39 @@
 # src/qc_from_processed.py
 from __future__ import annotations
 from pathlib import Path
-import numpy as np
-import pandas as pd
+import argparse
 
-PX_COLS = [f"a{k}_p" for k in range(1, 6)] + [f"b{k}_p" for k in range(1, 6)]
+from src.ofi.qc import refresh_qc_store
+from src.ofi.profiling import StageProfiler, profile_session, PROFILERS
 
-def qc_one_parquet(pq: Path) -> dict:
-    df = pd.read_parquet(pq)
-
-    symbol = str(df["code"].iloc[0])
-    date_str = str(df["date"].iloc[0])
-    n = len(df)
-
-    dup_ratio = df["ts"].duplicated().mean()
-
-    a1 = df["a1_p"]
-    b1 = df["b1_p"]
-    crossed_ratio = (a1 <= b1).mean()
-
-    px = df[PX_COLS]
-    bad_price_cnt = int(((px <= 0) | px.isna()).any(axis=1).sum())
-
-    mid = (a1 + b1) / 2.0
-    spread = a1 - b1
-    spread_median = float(np.nanmedian(spread))
-    rel_spread_median = float(np.nanmedian(spread / mid))
-
-    mt_ratio = float(np.nanmean(pd.to_numeric(df.get("maybe_truncated", np.nan), errors="coerce") > 0))
-
-    return {
-        "symbol": symbol,
-        "date": date_str,
-        "n_rows": n,
-        "dup_ts_ratio": float(dup_ratio),
-        "crossed_ratio": float(crossed_ratio),
-        "bad_price_cnt": bad_price_cnt,
-        "spread_median": spread_median,
-        "rel_spread_median": rel_spread_median,
-        "maybe_truncated_ratio": mt_ratio,
-        "ts_min": df["ts"].min(),
-        "ts_max": df["ts"].max(),
-        "file": str(pq),
-    }
 
 def main():
-    processed_root = Path("data/processed/ticks")
-    out_file = Path("data/features/qc_all.parquet")
-    out_file.parent.mkdir(parents=True, exist_ok=True)
-
-    parts = sorted(processed_root.glob("*/*/part.parquet"))
-    rows = []
-    for i, pq in enumerate(parts, 1):
-        try:
-            rows.append(qc_one_parquet(pq))
-        except Exception as e:
-            print(f"[FAIL] {pq} -> {e}")
-        if i % 500 == 0:
-            print(f"[{i}/{len(parts)}] qc running...")
-
-    qc = pd.DataFrame(rows).sort_values(["symbol", "date"])
-    qc.to_parquet(out_file, index=False)
-    print(f"Saved: {out_file} rows={len(qc)}")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--processed_root", type=str, default="data/processed/ticks")
+    ap.add_argument("--ofi_root", type=str, default="data/features/ofi_minute")
+    ap.add_argument("--out_file", type=str, default="data/features/qc_all.parquet")
+    ap.add_argument("--jobs", type=int, default=None)
+    ap.add_argument("--profile_out", type=str, default=None,
+                    help="耗时/读取字节/峰值RSS 的 JSON 输出路径")
+    ap.add_argument("--profile", type=str, choices=PROFILERS, default=None,
+                    help="用 cProfile / pyinstrument 剖析，结果写在 profile_out 同目录（默认当前目录）")
+    args = ap.parse_args()
+
+    prof = StageProfiler()
+    prof_dir = Path(args.profile_out).parent if args.profile_out else Path(".")
+    # 增量刷新：只对新增/修改过的 part.parquet 计算 QC
+    with profile_session(args.profile, prof_dir, name="qc_profile"), prof.stage("refresh_qc_store"):
+        qc = refresh_qc_store(
+            Path(args.out_file),
+            Path(args.processed_root),
+            ofi_root=Path(args.ofi_root),
+            n_jobs=args.jobs,
+            verbose=True,
+        )
+    print(f"Saved: {args.out_file} rows={len(qc)}")
+    if args.profile_out:
+        prof.write(Path(args.profile_out))
+    print(prof.summary())
 
 if __name__ == "__main__":
     main()
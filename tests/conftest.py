@@ -0,0 +1,62 @@
+"""
+测试用样本数据
+
+由 src.ofi.synthetic 在临时目录中生成 processed tick、分钟 OFI 与分钟收益标签
+（目录结构与 data/ 相同），测试不读写 data/ 下的本地数据。
+"""
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from scripts.build_labels import compute_minute_returns
+from scripts.build_ofi_features import process_one_day
+from src.ofi import panel, pipeline
+from src.ofi.io import processed_path, read_processed
+from src.ofi.synthetic import write_symbol_days
+
+SAMPLE_SYMBOLS = ["510050.XSHG", "159915.XSHE", "510300.XSHG"]
+SAMPLE_DATES = ["2021-01-04", "2021-01-05", "2021-02-01"]
+
+
+class SampleData:
+    """样本数据根目录（processed / features / labels 三个子目录）"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.processed = root / "processed"
+        self.ticks_dir = self.processed / "ticks"
+        self.ofi_dir = root / "features" / "ofi_minute"
+        self.label_dir = root / "labels" / "minute_returns"
+        self.qc_store = root / "features" / "qc_all.parquet"
+
+    def ticks(self, symbol: str, date: str) -> pd.DataFrame:
+        """单日 processed tick"""
+        return read_processed(processed_path(self.processed, symbol, date))
+
+
+@pytest.fixture(scope="session")
+def sample_root(tmp_path_factory) -> SampleData:
+    data = SampleData(tmp_path_factory.mktemp("data"))
+    for symbol in SAMPLE_SYMBOLS:
+        write_symbol_days(data.root / "raw" / "ticks", symbol, SAMPLE_DATES, seed=0,
+                          processed_root=data.processed)
+        (data.ofi_dir / symbol).mkdir(parents=True)
+        (data.label_dir / symbol).mkdir(parents=True)
+        for date in SAMPLE_DATES:
+            df = data.ticks(symbol, date)
+            process_one_day(df, 5, "1min", "sum").to_parquet(data.ofi_dir / symbol / f"{date}.parquet")
+            compute_minute_returns(df.copy()).to_frame(name="ret").to_parquet(
+                data.label_dir / symbol / f"{date}.parquet")
+    return data
+
+
+@pytest.fixture
+def sample_data(sample_root, monkeypatch) -> SampleData:
+    """样本数据，并把 pipeline / panel 的默认数据目录指向它"""
+    for module in (pipeline, panel):
+        monkeypatch.setattr(module, "OFI_FEATURES_DIR", sample_root.ofi_dir)
+        monkeypatch.setattr(module, "LABELS_DIR", sample_root.label_dir)
+        monkeypatch.setattr(module, "PROCESSED_TICKS_DIR", sample_root.ticks_dir)
+    monkeypatch.setattr(pipeline, "QC_STORE_PATH", sample_root.qc_store)
+    return sample_root
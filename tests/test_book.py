@@ -0,0 +1,143 @@
+"""SnapshotRing / BookWindow / SnapshotStore"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.book import SnapshotRing, SnapshotStore
+
+LEVELS = 2
+T0 = pd.Timestamp("2021-01-04 09:30:00").value
+
+
+def snapshots(n, start=0):
+    """第 k 笔：ts = T0 + k 秒，ask_p = 10 + k，其余各列由 k 推出，便于核对"""
+    k = np.arange(start, start + n)
+    ts = T0 + k * 1_000_000_000
+    ask_p = np.column_stack([10.0 + k, 10.1 + k])
+    ask_v = np.column_stack([100.0 + k, 200.0 + k])
+    bid_p = np.column_stack([9.0 + k, 8.9 + k])
+    bid_v = np.column_stack([300.0 + k, 400.0 + k])
+    return ts, ask_p, ask_v, bid_p, bid_v, k.astype(float)
+
+
+def ring_ids(window):
+    """窗口中各快照的编号 k（由 ask_p 还原）"""
+    return (window.ask_p[:, 0] - 10.0).round().astype(int).tolist()
+
+
+def test_append_wraparound_keeps_last_capacity():
+    ring = SnapshotRing(capacity=4, levels=LEVELS)
+    ts, ap, av, bp, bv, cur = snapshots(11)
+    for i in range(11):
+        ring.append(ts[i], ap[i], av[i], bp[i], bv[i], cur[i])
+        assert len(ring) == min(i + 1, 4)
+        assert ring_ids(ring.last()) == list(range(max(0, i - 3), i + 1))
+    assert ring.latest().ts[0] == ts[10]
+    np.testing.assert_array_equal(ring.last().bid_v, bv[7:])
+    np.testing.assert_array_equal(ring.last().current, cur[7:])
+
+
+@pytest.mark.parametrize("chunks", [[3, 3, 3, 3], [1, 6, 2], [9], [2, 2, 2, 2, 2]])
+def test_extend_matches_append(chunks):
+    n = sum(chunks)
+    ts, ap, av, bp, bv, cur = snapshots(n)
+    a = SnapshotRing(capacity=5, levels=LEVELS)
+    for i in range(n):
+        a.append(ts[i], ap[i], av[i], bp[i], bv[i], cur[i])
+    b = SnapshotRing(capacity=5, levels=LEVELS)
+    pos = 0
+    for c in chunks:
+        sl = slice(pos, pos + c)
+        b.extend(ts[sl], ap[sl], av[sl], bp[sl], bv[sl], cur[sl])
+        pos += c
+    for k in range(0, 6):
+        wa, wb = a.last(k), b.last(k)
+        np.testing.assert_array_equal(wa.ts, wb.ts)
+        np.testing.assert_array_equal(wa.book, wb.book)
+        np.testing.assert_array_equal(wa.current, wb.current)
+    assert ring_ids(b.last()) == list(range(n - 5, n))
+
+
+def test_capacity_and_fixed_memory():
+    ring = SnapshotRing(capacity=3, levels=LEVELS)
+    nbytes = ring.nbytes
+    ts, ap, av, bp, bv, cur = snapshots(100)
+    ring.extend(ts, ap, av, bp, bv, cur)
+    assert len(ring) == 3 and ring.nbytes == nbytes
+    assert ring_ids(ring.last(10)) == [97, 98, 99]
+    ring.clear()
+    assert len(ring) == 0 and ring.latest() is None and len(ring.last()) == 0
+    with pytest.raises(ValueError):
+        SnapshotRing(capacity=0)
+
+
+def test_out_of_order_rejected():
+    ring = SnapshotRing(capacity=4, levels=LEVELS)
+    ts, ap, av, bp, bv, cur = snapshots(3)
+    ring.extend(ts[1:], ap[1:], av[1:], bp[1:], bv[1:])
+    with pytest.raises(ValueError):
+        ring.append(ts[0], ap[0], av[0], bp[0], bv[0])
+    with pytest.raises(ValueError):
+        ring.extend(ts[::-1], ap, av, bp, bv)
+
+
+def test_windows_are_views_across_wraparound():
+    ring = SnapshotRing(capacity=4, levels=LEVELS)
+    ts, ap, av, bp, bv, cur = snapshots(6)
+    ring.extend(ts, ap, av, bp, bv, cur)
+    # head 已回绕：最近 4 笔在底层数组中仍是连续的一段
+    w = ring.last(4)
+    assert ring_ids(w) == [2, 3, 4, 5]
+    assert np.shares_memory(w.book, ring._book) and w.book.base is not None
+    assert np.shares_memory(w.ts, ring._ts)
+    cols = w.columns()
+    np.testing.assert_array_equal(cols["a2_v"], av[2:, 1])
+    assert np.shares_memory(cols["b1_p"], ring._book)
+
+
+def test_between_time_index():
+    ring = SnapshotRing(capacity=4, levels=LEVELS)
+    ts, ap, av, bp, bv, cur = snapshots(7)
+    ring.extend(ts, ap, av, bp, bv, cur)          # 保留 3..6
+    assert ring_ids(ring.between(ts[3], ts[5])) == [4, 5]
+    assert ring_ids(ring.between(ts[3], ts[5], include_start=True)) == [3, 4, 5]
+    assert ring_ids(ring.between(None, ts[4])) == [3, 4]
+    assert ring_ids(ring.between(ts[5])) == [6]
+    assert ring_ids(ring.between(ts[0], ts[1])) == []
+    assert ring_ids(ring.between(pd.Timestamp(ts[4]), pd.Timestamp(ts[6]))) == [5, 6]
+
+
+def test_duplicate_timestamps_in_between():
+    ring = SnapshotRing(capacity=8, levels=LEVELS)
+    ts, ap, av, bp, bv, cur = snapshots(5)
+    ts = ts.copy()
+    ts[2] = ts[1]
+    ring.extend(ts, ap, av, bp, bv, cur)
+    assert ring_ids(ring.between(ts[1], ts[4], include_start=True)) == [1, 2, 3, 4]
+    assert ring_ids(ring.between(ts[1], ts[4])) == [3, 4]
+
+
+def test_rel_spread_and_frame_roundtrip():
+    ts, ap, av, bp, bv, cur = snapshots(3)
+    ap[1, 0] = bp[1, 0]                           # 交叉盘口
+    df = pd.DataFrame({"ts": pd.to_datetime(ts), "current": cur})
+    for i in range(LEVELS):
+        df[f"a{i + 1}_p"], df[f"a{i + 1}_v"] = ap[:, i], av[:, i]
+        df[f"b{i + 1}_p"], df[f"b{i + 1}_v"] = bp[:, i], bv[:, i]
+    ring = SnapshotRing(capacity=8, levels=LEVELS)
+    ring.extend_frame(df)
+    rel = ring.last().rel_spread()
+    assert np.isnan(rel[1])
+    assert rel[2] == pytest.approx((ap[2, 0] - bp[2, 0]) / ((ap[2, 0] + bp[2, 0]) / 2))
+    assert ring.last().last_rel_spread() == rel[2]
+
+
+def test_store_creates_rings_on_demand():
+    store = SnapshotStore(capacity=4, levels=LEVELS)
+    assert "A" not in store
+    ts, ap, av, bp, bv, cur = snapshots(2)
+    store["A"].extend(ts, ap, av, bp, bv, cur)
+    assert "A" in store and len(store["A"]) == 2 and "B" not in store
+    assert store.nbytes == store["A"].nbytes
+    store.clear()
+    assert len(store["A"]) == 0
@@ -0,0 +1,36 @@
+"""scripts/build_ofi_features.py：integrated 载荷在增量运行中的沿用"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.build_ofi_features import add_integrated_ofi, process_one_day, resolve_loadings
+
+SYMBOL = "510050.XSHG"
+DATES = ["2021-01-04", "2021-01-05", "2021-02-01"]
+
+
+def minute_frames(data):
+    return [process_one_day(data.ticks(SYMBOL, d), 5, "1min", "sum", normalize=True) for d in DATES]
+
+
+def test_incremental_day_reuses_full_fit_loadings(sample_root):
+    full = minute_frames(sample_root)
+    loadings = add_integrated_ofi(full, 5, keep_norm=False)
+
+    # 只重算最后一天：沿用全量载荷，结果与全量运行相同；单独拟合则不同
+    last = minute_frames(sample_root)[-1:]
+    add_integrated_ofi(last, 5, keep_norm=False, loadings=loadings.tolist())
+    pd.testing.assert_series_equal(last[0]["ofi_int"], full[-1]["ofi_int"])
+    assert last[0].attrs["ofi_int_loadings"] == full[-1].attrs["ofi_int_loadings"]
+    refit = add_integrated_ofi(minute_frames(sample_root)[-1:], 5, keep_norm=False)
+    assert not np.allclose(refit, loadings)
+
+
+def test_resolve_loadings():
+    stored = {"A": [0.5, 0.5], "B": [1.0, 0.0, 0.0]}
+    # 没有已有输出的标的重新拟合，有输出的沿用
+    assert resolve_loadings({"A", "C"}, {"A"}, stored, levels=2) == {"A": [0.5, 0.5]}
+    with pytest.raises(ValueError, match=r"\['C'\].*overwrite"):
+        resolve_loadings({"A", "C"}, {"A", "C"}, stored, levels=2)
+    with pytest.raises(ValueError, match="levels=2"):
+        resolve_loadings({"B"}, {"B"}, stored, levels=2)
@@ -0,0 +1,68 @@
+"""clean_lob_data：合并掩码与逐步过滤结果一致，CleanReport 逐规则计数"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.clean import clean_lob_data
+
+
+def sequential_clean(df, outlier_threshold=0.1):
+    """逐规则依次过滤的参考实现（合并掩码之前的写法）"""
+    out = df
+    price_cols = [c for c in out.columns if c.endswith("_p")]
+    out = out[~((out[price_cols] <= 0).any(axis=1) | out[price_cols].isna().any(axis=1))]
+    out = out[~(out["a1_p"] <= out["b1_p"])]
+    if "ts" in out.columns:
+        out = out.drop_duplicates(subset=["ts"], keep="last")
+    else:
+        out = out[~out.index.duplicated(keep="last")]
+    mid = (out["a1_p"] + out["b1_p"]) / 2.0
+    return out[~(mid.pct_change().abs() > outlier_threshold)]
+
+
+def defective_day(sample_root):
+    df = sample_root.ticks("510050.XSHG", "2021-01-04").reset_index(drop=True)
+    df.loc[[10, 11], "b3_p"] = np.nan
+    df.loc[12, "a2_p"] = 0.0
+    # 交叉盘口：其中一行同时缺价，只计入第一条规则
+    df.loc[[20, 21], "b1_p"] = df.loc[[20, 21], "a1_p"]
+    df.loc[21, "a4_v"] = np.nan
+    df.loc[21, "a5_p"] = -1.0
+    # 重复时间戳：31 与 30 相同，41 与已剔除的交叉行 20 不构成重复
+    df.loc[31, "ts"] = df.loc[30, "ts"]
+    df.loc[40, "ts"] = df.loc[20, "ts"]
+    # 价格跳动
+    df.loc[50, ["a1_p", "b1_p"]] *= 1.5
+    return df
+
+
+def test_clean_matches_sequential_filter_and_counts(sample_root):
+    df = defective_day(sample_root)
+    out, report = clean_lob_data(df)
+    pd.testing.assert_frame_equal(out, sequential_clean(df))
+
+    assert report.n_input == len(df)
+    assert report.bad_price == 4
+    assert report.crossed == 1
+    assert report.duplicate_ts == 1
+    # 跳动相对前三步保留的前一行计算：50 跳上去、51 跳回来，两行都剔除
+    assert report.outlier == 2
+    assert report.removed == len(df) - len(out) == 8
+    assert report.as_dict()["n_output"] == len(out)
+
+
+def test_clean_with_datetime_index(sample_root):
+    df = defective_day(sample_root).set_index("ts")
+    out, report = clean_lob_data(df)
+    pd.testing.assert_frame_equal(out, sequential_clean(df))
+    assert report.duplicate_ts == 1
+
+
+@pytest.mark.parametrize("rule", ["remove_zero_price", "remove_crossed", "remove_duplicates", "remove_outliers"])
+def test_disabled_rule_counts_zero(sample_root, rule):
+    df = defective_day(sample_root)
+    field = {"remove_zero_price": "bad_price", "remove_crossed": "crossed",
+             "remove_duplicates": "duplicate_ts", "remove_outliers": "outlier"}[rule]
+    out, report = clean_lob_data(df, **{rule: False})
+    assert getattr(report, field) == 0
+    assert report.n_output == len(out)
@@ -0,0 +1,29 @@
+"""features_ofi：档位权重矩阵与加权 OFI 列"""
+import numpy as np
+import pytest
+
+from src.ofi.features_ofi import compute_ofi_per_tick, weight_matrix
+
+
+def test_weight_matrix_truncates_to_levels():
+    names, mat = weight_matrix([[1, 0.5, 0.25], [1, 1, 1, 1]], levels=3)
+    assert names == ["ofi_w0", "ofi_w1"]
+    np.testing.assert_array_equal(mat, [[1, 0.5, 0.25], [1, 1, 1]])
+    names, mat = weight_matrix({"decay": [1, 0.5, 0.25, 0.1]}, levels=2)
+    assert names == ["ofi_decay"] and mat.shape == (1, 2)
+    assert weight_matrix(np.ones(4), levels=4)[1].shape == (1, 4)
+
+
+@pytest.mark.parametrize("weights", [[[1, 1, 1], [1, 1]], {"a": [1, 1, 1], "b": [1]}, [1, 1]])
+def test_weight_matrix_rejects_short_vectors(weights):
+    with pytest.raises(ValueError, match="at least levels=3"):
+        weight_matrix(weights, levels=3)
+
+
+def test_weighted_columns_match_level_ofi(sample_root):
+    df = sample_root.ticks("510050.XSHG", "2021-01-04").set_index("ts")
+    weights = {"flat": np.ones(5), "decay": 1.0 / np.arange(1, 6)}
+    out = compute_ofi_per_tick(df, levels=5, weights=weights)
+    level = out[[f"ofi{i}" for i in range(1, 6)]].to_numpy()
+    for name, w in weights.items():
+        np.testing.assert_allclose(out[f"ofi_{name}"].to_numpy(), level @ w, rtol=1e-12, atol=1e-9)
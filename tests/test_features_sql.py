@@ -0,0 +1,33 @@
+"""DuckDB 分钟 OFI 与 build_ofi_features.process_one_day 逐日一致"""
+import pandas as pd
+import pytest
+
+from scripts.build_ofi_features import process_one_day
+from src.ofi.features_sql import compute_ofi_minute_duckdb
+from src.ofi.io import list_day_files, read_processed
+from src.ofi.synthetic import SyntheticConfig, write_symbol_days
+from tests.conftest import SAMPLE_DATES
+
+pytest.importorskip("duckdb")
+
+
+@pytest.fixture(scope="module")
+def day_files(tmp_path_factory):
+    # 含重复时间戳的合成数据：同一 ts 的快照按文件行顺序取上一 tick
+    root = tmp_path_factory.mktemp("sql")
+    write_symbol_days(root / "raw", "510050.XSHG", SAMPLE_DATES, seed=4,
+                      config=SyntheticConfig(duplicate_rate=0.03, fill_rate=0.7),
+                      processed_root=root / "processed")
+    return list_day_files(root / "processed" / "ticks" / "510050.XSHG", layout="dir")
+
+
+@pytest.mark.parametrize("bar,agg", [("1min", "sum"), ("5min", "sum"), ("1min", "mean")])
+@pytest.mark.parametrize("levels", [1, 5])
+def test_duckdb_matches_process_one_day(day_files, bar, agg, levels):
+    assert [d for d, _ in day_files] == SAMPLE_DATES
+    got = compute_ofi_minute_duckdb(day_files, levels=levels, bar=bar, agg=agg)
+    assert list(got) == SAMPLE_DATES
+    for date, path in day_files:
+        want = process_one_day(read_processed(path), levels, bar, agg)
+        pd.testing.assert_frame_equal(got[date], want, check_dtype=False, check_freq=False,
+                                      check_index_type=False, rtol=1e-9)
@@ -0,0 +1,42 @@
+"""io.list_day_files：按目录项名称裁剪日期区间，与 glob 后逐个过滤结果一致"""
+from pathlib import Path
+
+import pytest
+
+from src.ofi.io import list_day_files
+from tests.conftest import SAMPLE_DATES
+
+
+def globbed(symbol_dir, start, end, layout):
+    """glob 全部日文件再按日期过滤的参考写法"""
+    pattern = "*.parquet" if layout == "file" else "*/part.parquet"
+    out = []
+    for path in sorted(symbol_dir.glob(pattern)):
+        date = path.stem if layout == "file" else path.parent.name
+        if (start is None or date >= start) and (end is None or date <= end):
+            out.append((date, path))
+    return out
+
+
+@pytest.mark.parametrize("start,end", [(None, None), ("2021-01-05", None), (None, "2021-01-05"),
+                                       ("2021-01-05", "2021-01-31"), ("2022-01-01", None)])
+@pytest.mark.parametrize("layout", ["file", "dir"])
+def test_list_day_files_matches_glob(sample_root, start, end, layout):
+    root = sample_root.ofi_dir if layout == "file" else sample_root.ticks_dir
+    symbol_dir = root / "510050.XSHG"
+    assert list_day_files(symbol_dir, start, end, layout=layout) == globbed(symbol_dir, start, end, layout)
+
+
+def test_out_of_range_days_are_not_touched(sample_root, monkeypatch):
+    touched = []
+    exists = Path.exists
+
+    def recording(self, *args, **kwargs):
+        touched.append(self)
+        return exists(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "exists", recording)
+    days = list_day_files(sample_root.ticks_dir / "510050.XSHG", "2021-02-01", None, layout="dir")
+    assert [d for d, _ in days] == SAMPLE_DATES[-1:]
+    assert not [p for p in touched if p.parent.name in SAMPLE_DATES[:-1]]
+    assert list_day_files(sample_root.ticks_dir / "000000.XSHG") == []
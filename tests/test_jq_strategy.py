@@ -0,0 +1,163 @@
+"""jq_strategy/strategy.py 在本地 jqdata 替身上的回归测试"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "jq_strategy"))
+
+import jqdata  # noqa: E402
+import strategy  # noqa: E402
+
+DATE = "2021-01-04"
+
+
+@pytest.fixture
+def tick_source(sample_root, monkeypatch):
+    """默认标的池中两只有样本数据（159915.XSHE、510300.XSHG），其余四只没有"""
+    monkeypatch.setattr(jqdata, "PROCESSED_TICKS_DIR", sample_root.ticks_dir)
+    jqdata.set_tick_source(None)
+    yield sample_root
+    jqdata.MULTI_SECURITY_TICKS = True
+
+
+def test_missing_symbol_returns_empty_frame_with_fields(tick_source):
+    fields = strategy.tick_fields(5)
+    end = pd.Timestamp(f"{DATE} 10:00:00")
+    one = jqdata.get_ticks("511380.XSHG", end_dt=end, count=10, fields=fields, df=True)
+    assert len(one) == 0 and list(one.columns) == fields
+    many = jqdata.get_ticks(["511380.XSHG", "159915.XSHE"], end_dt=end, count=10, fields=fields, df=True)
+    assert set(many["code"]) == {"159915.XSHE"}
+
+
+@pytest.mark.parametrize("multi", [True, False])
+def test_run_strategy_with_missing_symbols(tick_source, multi):
+    jqdata.MULTI_SECURITY_TICKS = multi
+    jqdata.run_strategy(strategy, [DATE])
+    assert jqdata.g.batch_ticks is multi
+    assert jqdata.CALLS["get_ticks"] == (240 if multi else 1 + 6 * 240)
+    assert jqdata.ORDERS, "two symbols with data should produce trades"
+    assert {s for s, _, _ in jqdata.ORDERS} <= {"159915.XSHE", "510300.XSHG"}
+
+
+def test_batch_fetch_does_not_swallow_data_errors(tick_source, monkeypatch):
+    jqdata.run_strategy(strategy, [DATE])
+
+    def broken(*args, **kwargs):
+        raise KeyError("a1_p")
+
+    monkeypatch.setattr(strategy, "get_ticks", broken)
+    with pytest.raises(KeyError):
+        strategy.update_minute_ofi(pd.Timestamp(f"{DATE} 10:00:00").to_pydatetime())
+    assert jqdata.g.batch_ticks is True
+
+
+def test_minute_ofi_matches_get_ofi(tick_source, monkeypatch):
+    """批量 + 快照缓冲的 1-min OFI / 点差与逐标的 get_ofi（[dt-60s, dt] 窗口）逐分钟一致"""
+    seen = []
+    update = strategy.update_minute_ofi
+
+    def recording(dt):
+        ofi, spread = update(dt)
+        seen.append((dt, ofi, spread))
+        return ofi, spread
+
+    monkeypatch.setattr(strategy, "update_minute_ofi", recording)
+    jqdata.run_strategy(strategy, [DATE])
+    assert len(seen) == 240
+
+    n_valid = 0
+    for dt, ofi, spread in seen:
+        for s in jqdata.g.universe:
+            ref_ofi, ref_spread, _ = strategy.get_ofi(s, dt, window_seconds=jqdata.g.minute_window_seconds,
+                                                      levels=jqdata.g.levels, weight=jqdata.g.weight)
+            np.testing.assert_equal(ofi[s], ref_ofi, err_msg=f"{s} {dt}")
+            np.testing.assert_equal(spread[s], ref_spread, err_msg=f"{s} {dt}")
+            n_valid += not np.isnan(ref_ofi)
+    assert n_valid > 400
+
+
+def test_rebalance_window_spans_lunch(tick_source, monkeypatch):
+    """再平衡窗口按 bar 计：13:06（第 126 根 bar，balance_interval=7）的窗口为 11:30 与 13:01-13:06，
+    信号等于 (11:29, 13:06] 内全部相邻快照的 OFI 之和，午后第一次再平衡不因午休被跳过"""
+    initialize = strategy.initialize
+
+    def initialize_7(context):
+        initialize(context)
+        jqdata.g.balance_interval = 7
+
+    seen = {}
+    market_open = strategy.market_open
+
+    def recording(context):
+        market_open(context)
+        g = jqdata.g
+        if g.bar_count % g.balance_interval == 0:
+            seen[context.current_dt] = {s: (acc.active_minutes(7), acc.ofi(7)) for s, acc in g.ofi_acc.items()}
+
+    monkeypatch.setattr(strategy, "initialize", initialize_7)
+    monkeypatch.setattr(strategy, "market_open", recording)
+    jqdata.run_strategy(strategy, [DATE])
+
+    dt = pd.Timestamp(f"{DATE} 13:06:00").to_pydatetime()
+    assert dt in seen
+    start = pd.Timestamp(f"{DATE} 11:29:00")
+    for s in ["159915.XSHE", "510300.XSHG"]:
+        n_active, ofi = seen[dt][s]
+        assert n_active == 7
+        ticks = jqdata._load_day(s, DATE)
+        # 窗口前最后一笔作基准
+        first = int((ticks["time"] <= start).sum()) - 1
+        window = ticks.iloc[first:int((ticks["time"] <= dt).sum())]
+        ref, _, _ = strategy.ofi_from_ticks(window, levels=jqdata.g.levels, weight=jqdata.g.weight)
+        assert ofi == pytest.approx(ref, rel=1e-12, abs=1e-6)
+
+
+@pytest.mark.parametrize("multi", [True, False])
+def test_fetch_requests_only_new_ticks(tick_source, monkeypatch, multi):
+    """第一根 bar 之后，请求起点为已取到的最新时间，而不是整段 [dt-180s, dt] 窗口；1-min OFI 不变"""
+    jqdata.MULTI_SECURITY_TICKS = multi
+    initialize = strategy.initialize
+
+    def initialize_180(context):
+        initialize(context)
+        jqdata.g.minute_window_seconds = 180
+
+    calls = []
+
+    def recording(security, end_dt, start_dt=None, **kwargs):
+        calls.append((security, start_dt, end_dt))
+        return jqdata.get_ticks(security, end_dt=end_dt, start_dt=start_dt, **kwargs)
+
+    seen = []
+    update = strategy.update_minute_ofi
+
+    def recording_ofi(dt):
+        ofi, _ = update(dt)
+        seen.append((dt, ofi))
+        return ofi, _
+
+    monkeypatch.setattr(strategy, "initialize", initialize_180)
+    monkeypatch.setattr(strategy, "get_ticks", recording)
+    monkeypatch.setattr(strategy, "update_minute_ofi", recording_ofi)
+    jqdata.run_strategy(strategy, [DATE])
+
+    calls = [c for c in calls if isinstance(c[0], list) == multi]
+    assert len(calls) == 240 * (1 if multi else 6)
+    prev_end = {}
+    for security, start, end in calls:
+        key = tuple(security) if multi else security
+        if key in prev_end:
+            # 不留空档（午休后从窗口起点取），也不重取整段窗口
+            assert start <= max(prev_end[key], pd.Timestamp(end) - pd.Timedelta(seconds=180))
+            assert start >= prev_end[key] - pd.Timedelta(seconds=60)
+        prev_end[key] = pd.Timestamp(end)
+
+    for dt, ofi in seen[::17]:
+        for s in jqdata.g.universe:
+            ref, _, _ = strategy.get_ofi(s, dt, window_seconds=180, levels=jqdata.g.levels, weight=jqdata.g.weight)
+            np.testing.assert_equal(ofi[s], ref, err_msg=f"{s} {dt}")
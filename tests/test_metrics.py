@@ -0,0 +1,57 @@
+"""backtest.metrics.compute_metrics：二维逐列计算与单列 / 标量函数结果一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.metrics import calculate_max_drawdown, calculate_sharpe_ratio, compute_metrics
+
+
+def longest_underwater(returns):
+    """逐期循环的最长水下期数"""
+    equity, peak, run, longest = 1.0, 1.0, 0, 0
+    for r in returns:
+        equity *= 1 + r
+        peak = max(peak, equity)
+        run = run + 1 if equity < peak else 0
+        longest = max(longest, run)
+    return longest
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(5)
+    r = rng.normal(0.0005, 0.01, size=(250, 6))
+    r[:, 4] = 0.0
+    r[100:, 5] = np.abs(r[100:, 5])
+    return r
+
+
+def test_matrix_matches_per_column(returns):
+    rng = np.random.default_rng(6)
+    costs = np.abs(rng.normal(0, 1e-4, size=returns.shape))
+    turnover = np.abs(rng.normal(0, 0.5, size=returns.shape))
+    full = compute_metrics(returns, costs=costs, turnover=turnover)
+    for j in range(returns.shape[1]):
+        one = compute_metrics(returns[:, j], costs=costs[:, j], turnover=turnover[:, j])
+        for key, value in full.items():
+            np.testing.assert_allclose(value[j], one[key][0], rtol=1e-12, err_msg=key)
+
+
+def test_matrix_matches_scalar_helpers(returns):
+    m = compute_metrics(returns)
+    for j in range(returns.shape[1]):
+        r = returns[:, j]
+        equity = np.r_[1.0, np.cumprod(1 + r)]
+        assert m["sharpe"][j] == pytest.approx(calculate_sharpe_ratio(r) * np.sqrt(252), rel=1e-12)
+        assert m["max_drawdown"][j] == pytest.approx(calculate_max_drawdown(equity), rel=1e-12, abs=0)
+        assert m["max_drawdown_duration"][j] == longest_underwater(r)
+        assert m["total_return"][j] == pytest.approx(equity[-1] - 1, rel=1e-12)
+        nz = r[r != 0]
+        assert m["hit_rate"][j] == pytest.approx((nz > 0).mean() if len(nz) else np.nan, nan_ok=True)
+
+
+def test_dataframe_input_is_indexed_by_columns(returns):
+    df = pd.DataFrame(returns, columns=[f"s{j}" for j in range(returns.shape[1])])
+    out = compute_metrics(df)
+    assert list(out.index) == list(df.columns)
+    np.testing.assert_allclose(out["sharpe"].to_numpy(), compute_metrics(returns)["sharpe"])
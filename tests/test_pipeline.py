@@ -0,0 +1,54 @@
+"""pipeline 各任务的参数处理"""
+import json
+
+import pandas as pd
+import pytest
+
+from src.ofi.pipeline import _qc_filter_unit, backtest_task, ic_analysis_task, model_eval_task
+
+SYMBOLS = ["510050.XSHG", "159915.XSHE"]
+
+
+def test_backtest_task_trims_weight_to_levels(sample_data, tmp_path):
+    strategy = {"levels": 3, "weight": [1, 0.8, 0.6, 0.4, 0.2], "k_long": 1}
+    assert backtest_task(SYMBOLS, tmp_path, strategy=strategy) is not None
+    params = json.loads((tmp_path / "tables" / "backtest_summary.json").read_text())["params"]
+    assert params["levels"] == 3 and params["weight"] == [1.0, 0.8, 0.6]
+
+
+@pytest.mark.parametrize("strategy", [{"weight": [1, 1]}, {"levels": 3, "weight": [1, 1]}])
+def test_backtest_task_rejects_inconsistent_weight(tmp_path, strategy):
+    with pytest.raises(ValueError, match="weight"):
+        backtest_task(SYMBOLS, tmp_path, strategy=strategy)
+
+
+@pytest.mark.parametrize("task", [ic_analysis_task, model_eval_task])
+def test_eval_tasks_take_allowed_days(sample_data, tmp_path, task):
+    (tmp_path / "tables").mkdir()
+    kw = {"start_date": "2021-01-04", "end_date": "2021-01-05"}
+    full = task(SYMBOLS, tmp_path, **kw)
+    allowed = {(SYMBOLS[0], "2021-01-04")}
+    kept = task(SYMBOLS, tmp_path, allowed=allowed, store_dir=None, **kw)
+    assert len(full[0]) > len(kept[0]) > 0
+    days = pd.DataFrame(kept[0])[["symbol", "date"]].drop_duplicates()
+    assert set(map(tuple, days.to_numpy())) == allowed
+
+
+def test_qc_filter_keeps_days_without_qc_record(sample_data, capsys):
+    # 2021-01-04 合格、2021-01-05 不合格，2021-02-01 没有QC记录
+    qc_df = pd.DataFrame({"symbol": SYMBOLS[0], "date": ["2021-01-04", "2021-01-05"],
+                          "crossed_ratio": [0.0, 0.5]})
+    allowed = _qc_filter_unit({"crossed_ratio_max": 0.001}, (qc_df, None), symbols=SYMBOLS[:1])
+    assert allowed == {(SYMBOLS[0], "2021-01-04"), (SYMBOLS[0], "2021-02-01")}
+    assert "1 days have no QC record" in capsys.readouterr().out
+
+
+def test_qc_filter_counts_only_run_scope(sample_data, capsys):
+    # 持久化QC表含本次运行之外的标的与日期：可用集合与合格天数只统计运行范围内的
+    qc_df = pd.DataFrame({"symbol": [SYMBOLS[0]] * 3 + [SYMBOLS[1]] * 3 + ["510300.XSHG"],
+                          "date": ["2021-01-04", "2021-01-05", "2021-02-01"] * 2 + ["2021-01-04"],
+                          "crossed_ratio": [0.0, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0]})
+    allowed = _qc_filter_unit({"crossed_ratio_max": 0.001}, (qc_df, None), symbols=SYMBOLS,
+                              start_date="2021-01-04", end_date="2021-01-05")
+    assert allowed == {(SYMBOLS[0], "2021-01-04"), (SYMBOLS[1], "2021-01-04"), (SYMBOLS[1], "2021-01-05")}
+    assert "3/4 days eligible" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+"""float32 精度模式相对 float64 的特征 / IC 漂移（阈值与 benchmarks/bench_precision.py 相同）"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_precision import FEATURE_COLS, build_panels, feature_drift, pearson_ic  # noqa: E402
+from src.ofi.evaluate import grouped_rank_ic  # noqa: E402
+from src.ofi.features_ofi import compute_ofi_minute  # noqa: E402
+from src.ofi.synthetic import synthetic_symbols, trading_dates  # noqa: E402
+
+MAX_FEATURE_DRIFT = 1e-6
+MAX_IC_DRIFT = 1e-4
+KEYS = ["symbol", "date"]
+
+
+@pytest.fixture(scope="module")
+def panels():
+    return build_panels(synthetic_symbols(2), trading_dates(2), seed=0)
+
+
+def test_feature_drift_within_tolerance(panels):
+    p64, p32 = panels
+    assert (p32[FEATURE_COLS + ["ret"]].dtypes == np.float32).all()
+    drift = feature_drift(p64, p32)
+    assert max(drift.values()) <= MAX_FEATURE_DRIFT, drift
+
+
+@pytest.mark.parametrize("col", ["ofi1", "ofi"])
+def test_ic_drift_within_tolerance(panels, col):
+    p64, p32 = panels
+    r64 = grouped_rank_ic(p64, KEYS, signal_col=col, return_col="ret").set_index(KEYS)["ic"]
+    r32 = grouped_rank_ic(p32, KEYS, signal_col=col, return_col="ret").set_index(KEYS)["ic"]
+    c64, c32 = pearson_ic(p64, col), pearson_ic(p32, col)
+    for a, b in [(r64, r32), (c64, c32)]:
+        assert a.notna().all()
+        assert float(np.max(np.abs(a - b.reindex(a.index)))) <= MAX_IC_DRIFT
+
+
+@pytest.mark.parametrize("symbol,date", [("510050.XSHG", "2021-01-04"), ("159915.XSHE", "2021-02-01")])
+def test_sample_day_feature_drift(sample_root, symbol, date):
+    df = sample_root.ticks(symbol, date).set_index("ts")
+    f64 = compute_ofi_minute(df, dtype="float64")
+    f32 = compute_ofi_minute(df, dtype="float32")
+    for col in FEATURE_COLS:
+        a, b = f64[col].to_numpy(dtype=float), f32[col].to_numpy(dtype=float)
+        scale = np.nanmax(np.abs(a))
+        assert np.nanmax(np.abs(a - b)) <= MAX_FEATURE_DRIFT * scale, col
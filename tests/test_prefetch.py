@@ -0,0 +1,79 @@
+"""prefetch：按输入顺序产出、结果与同步加载一致、异常在 get() 处抛出、预取深度有界"""
+import random
+import threading
+import time
+
+import pytest
+
+from src.ofi.prefetch import prefetch
+
+ITEMS = list(range(20))
+
+
+def slow_load(item):
+    time.sleep(random.Random(item).uniform(0, 0.01))
+    if item == 7:
+        raise KeyError(f"missing {item}")
+    return item * item
+
+
+def consume(it):
+    out = []
+    for item, get in it:
+        try:
+            out.append((item, get()))
+        except KeyError as e:
+            out.append((item, repr(e)))
+    return out
+
+
+@pytest.mark.parametrize("depth,workers", [(1, 1), (4, 2), (8, 4)])
+def test_matches_synchronous_loading(depth, workers):
+    expected = consume(prefetch(ITEMS, slow_load, depth=0))
+    assert [i for i, _ in expected] == ITEMS
+    assert expected[7] == (7, repr(KeyError("missing 7")))
+
+    it = prefetch(ITEMS, slow_load, depth=depth, workers=workers)
+    assert consume(it) == expected
+    assert it.stats.n_items == len(ITEMS)
+    assert it.stats.load_seconds >= it.stats.hidden_seconds >= 0
+
+
+def test_get_is_memoized_and_reraises():
+    calls = []
+
+    def load(item):
+        calls.append(item)
+        if item == 1:
+            raise ValueError("bad day")
+        return item
+
+    with prefetch([0, 1, 2], load, depth=2) as it:
+        (_, g0), (_, g1), (_, g2) = list(it)
+        assert g0() == g0() == 0
+        for _ in range(2):
+            with pytest.raises(ValueError, match="bad day"):
+                g1()
+        assert g2() == 2
+    assert sorted(calls) == [0, 1, 2]
+
+
+def test_depth_bounds_loads_ahead_of_consumer():
+    lock = threading.Lock()
+    started = []
+
+    def load(item):
+        with lock:
+            started.append(item)
+        return item
+
+    it = prefetch(ITEMS, load, depth=3, workers=3)
+    for n, (item, get) in enumerate(it):
+        get()
+        # 已提交的加载最多领先消费者 depth 个
+        with lock:
+            assert max(started) <= n + 3
+        if n == 5:
+            it.close()
+    assert n == 5
+    assert max(started) <= 8
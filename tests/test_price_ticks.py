@@ -0,0 +1,72 @@
+"""整数价格档位：OFI、QC 与清洗结果与浮点价格一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.clean import clean_lob_data, qc_one_day
+from src.ofi.features_ofi import compute_ofi_minute, compute_ofi_per_tick
+from src.ofi.io import (PX_COLS, prices_to_ticks, processed_path, read_processed, read_tick_size,
+                        ticks_to_prices, write_processed)
+from src.ofi.qc import qc_day
+from tests.conftest import SAMPLE_DATES
+
+SYMBOL = "510300.XSHG"
+
+
+@pytest.fixture(params=SAMPLE_DATES)
+def day(request, sample_root, tmp_path):
+    """同一交易日的浮点价格文件与整数档位文件"""
+    date = request.param
+    float_path = processed_path(sample_root.processed, SYMBOL, date)
+    int_path = tmp_path / "part.parquet"
+    write_processed(prices_to_ticks(read_processed(float_path), 0.001), int_path)
+    return date, float_path, int_path
+
+
+def test_round_trip(day):
+    _, float_path, int_path = day
+    px, ticks = read_processed(float_path), read_processed(int_path)
+    assert read_tick_size(float_path) is None and read_tick_size(int_path) == 0.001
+    assert (ticks[PX_COLS].dtypes == np.int32).all() and ticks.attrs["tick_size"] == 0.001
+    pd.testing.assert_frame_equal(ticks_to_prices(ticks), px, check_exact=False, rtol=1e-12)
+
+
+def test_ofi_matches_float_prices(day):
+    _, float_path, int_path = day
+    px = read_processed(float_path).set_index("ts")
+    ticks = read_processed(int_path).set_index("ts")
+    got, want = compute_ofi_per_tick(ticks), compute_ofi_per_tick(px)
+    ofi_cols = [c for c in want.columns if c.startswith("ofi")]
+    # 价格比较在整数上进行，OFI 逐 tick 完全相同
+    pd.testing.assert_frame_equal(got[ofi_cols], want[ofi_cols], check_exact=True)
+
+    got, want = compute_ofi_minute(ticks), compute_ofi_minute(px)
+    pd.testing.assert_frame_equal(got[ofi_cols], want[ofi_cols], check_exact=True)
+    pd.testing.assert_frame_equal(got, want, check_exact=False, rtol=1e-9)
+
+
+def test_qc_and_clean_match_float_prices(day):
+    date, float_path, int_path = day
+    px, ticks = read_processed(float_path), read_processed(int_path)
+    for key, value in qc_one_day(px).items():
+        assert qc_one_day(ticks)[key] == pytest.approx(value, rel=1e-9, nan_ok=True), key
+    got, want = qc_day(SYMBOL, date, int_path), qc_day(SYMBOL, date, float_path)
+    for key, value in want.items():
+        if isinstance(value, float):
+            assert got[key] == pytest.approx(value, rel=1e-9, nan_ok=True), key
+        elif key != "file":
+            assert got[key] == value, key
+
+    got, got_report = clean_lob_data(ticks)
+    want, want_report = clean_lob_data(px)
+    assert got_report == want_report
+    pd.testing.assert_index_equal(got.index, want.index)
+
+
+def test_off_grid_prices_fail():
+    df = pd.DataFrame({c: [3.251, 3.252] for c in PX_COLS})
+    with pytest.raises(ValueError, match="off the tick_size=0.01 grid"):
+        prices_to_ticks(df, 0.01)
+    df.loc[1, "b2_p"] = np.nan
+    with pytest.raises(ValueError, match="missing prices"):
+        prices_to_ticks(df, 0.001)
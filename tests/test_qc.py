@@ -0,0 +1,93 @@
+"""QC：原始文件统计与持久化QC表的增量刷新"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.clean import PX_COLS, qc_one_day
+from src.ofi.io import processed_path, raw_path, read_raw_lob_csv
+from src.ofi.qc import build_qc_table, discover_qc_tasks, qc_day, refresh_qc_store, run_qc
+from src.ofi.synthetic import generate_lob_day
+from tests.conftest import SAMPLE_DATES, SAMPLE_SYMBOLS
+
+SYMBOL = "000001.XSHE"
+DATE = "2021-01-04"
+
+
+def write_raw_day(root):
+    df = generate_lob_day(SYMBOL, DATE, seed=1, zero_price_rate=0.02)
+    # 再加几笔缺价与中间价为负的快照
+    df.loc[df.index[10:13], "b3_p"] = np.nan
+    df.loc[df.index[20], ["a1_p", "b1_p"]] = [-1.0, -1.2]
+    path = raw_path(root, 2021, SYMBOL, DATE)
+    path.parent.mkdir(parents=True)
+    df.to_csv(path, index=False, compression="gzip")
+    return df, path
+
+
+def test_raw_qc_counts_bad_rows(tmp_path):
+    df, path = write_raw_day(tmp_path)
+    px = df[PX_COLS].to_numpy(dtype=float)
+    n_bad = int(((px <= 0) | np.isnan(px)).any(axis=1).sum())
+    assert n_bad > 3
+
+    rec = qc_day(SYMBOL, DATE, path, source="raw")
+    assert rec["n_rows"] == len(df)
+    assert rec["bad_price_cnt"] == n_bad
+    assert rec["mid_negative"] == 1 / len(df)
+
+    # 默认读取仍丢弃坏价格快照
+    assert len(read_raw_lob_csv(path)) == len(df) - n_bad
+    assert len(read_raw_lob_csv(path, drop_invalid=False)) == len(df)
+
+
+def test_qc_store_shared_across_relative_and_absolute_roots(sample_root, tmp_path, monkeypatch, capsys):
+    store = tmp_path / "qc_all.parquet"
+    monkeypatch.chdir(sample_root.root)
+    # qc_from_processed 默认传相对路径，pipeline 传绝对路径：同一交易日只计算一次
+    first = refresh_qc_store(store, Path("processed/ticks"), ofi_root=Path("features/ofi_minute"),
+                             n_jobs=1, verbose=True)
+    assert "0 cached" in capsys.readouterr().out
+    second = refresh_qc_store(store, sample_root.ticks_dir, ofi_root=sample_root.ofi_dir,
+                              n_jobs=1, verbose=True)
+    assert " 0 new/modified" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(first, second)
+    assert len(second) == len(SAMPLE_SYMBOLS) * len(SAMPLE_DATES)
+    assert all(Path(f).is_absolute() for f in second["file"])
+
+    # build_qc_table 同样走持久化表
+    third = build_qc_table(sample_root.ticks_dir, store, ofi_root=sample_root.ofi_dir, n_jobs=1, verbose=True)
+    assert " 0 new/modified" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(first, third)
+
+
+def test_processed_qc_matches_pandas_reference(sample_root):
+    symbol, date = "159915.XSHE", "2021-01-05"
+    path = processed_path(sample_root.processed, symbol, date)
+    rec = qc_day(symbol, date, path, sample_root.ofi_dir / symbol / f"{date}.parquet")
+
+    # 逐列 pandas 写法（向量化引擎之前的 quality_check 口径）
+    df = pd.read_parquet(path)
+    for key, value in qc_one_day(df).items():
+        assert rec[key] == pytest.approx(value, rel=1e-12, nan_ok=True), key
+    a1, b1 = df["a1_p"], df["b1_p"]
+    assert rec["spread_negative"] == pytest.approx(((a1 - b1) <= 0).mean())
+    assert rec["mid_negative"] == pytest.approx(((a1 + b1) / 2 <= 0).mean())
+    assert rec["bid_ge_ask"] == pytest.approx((b1 >= a1).mean())
+    minute = df["ts"].dt.floor("min")
+    hm = minute.dt.hour * 60 + minute.dt.minute
+    in_session = hm.between(9 * 60 + 30, 11 * 60 + 29) | hm.between(13 * 60, 14 * 60 + 59)
+    assert rec["n_minutes"] == minute[in_session].nunique()
+
+    ofi = pd.read_parquet(sample_root.ofi_dir / symbol / f"{date}.parquet")["ofi"].dropna()
+    for key, value in {"ofi_mean": ofi.mean(), "ofi_std": ofi.std(), "ofi_q25": ofi.quantile(0.25),
+                       "ofi_q50": ofi.median(), "ofi_q75": ofi.quantile(0.75),
+                       "ofi_min": ofi.min(), "ofi_max": ofi.max()}.items():
+        assert rec[key] == pytest.approx(value, rel=1e-12), key
+
+
+def test_parallel_qc_matches_serial(sample_root):
+    tasks = discover_qc_tasks(sample_root.ticks_dir, ofi_root=sample_root.ofi_dir)
+    assert len(tasks) == len(SAMPLE_SYMBOLS) * len(SAMPLE_DATES)
+    pd.testing.assert_frame_equal(run_qc(tasks, n_jobs=2), run_qc(tasks, n_jobs=1))
@@ -0,0 +1,79 @@
+"""TaskGraph：依赖顺序、结果注入、串行与进程池结果一致，以及逐单元的 profiling 记录"""
+import os
+import time
+
+import pytest
+
+from src.ofi.profiling import StageProfiler
+from src.ofi.scheduler import TaskGraph
+
+SYMBOLS = ["A", "B", "C"]
+
+
+def qc(symbols):
+    time.sleep(0.05)
+    return {s: i for i, s in enumerate(symbols)}
+
+
+def score(symbol, allowed=None):
+    return {"symbol": symbol, "allowed": allowed[symbol], "pid": os.getpid(), "done": time.time()}
+
+
+def merge(parts, qc_result=None):
+    return {"symbols": [p["symbol"] for p in parts], "allowed": [p["allowed"] for p in parts],
+            "latest_part": max(p["done"] for p in parts), "merged_at": time.time(), "qc": qc_result}
+
+
+def build(order=None):
+    def traced(name, func):
+        def run(*args, **kwargs):
+            if order is not None:
+                order.append(name)
+            return func(*args, **kwargs)
+        return run
+
+    graph = TaskGraph()
+    # 按依赖的逆序添加，串行执行顺序只由依赖决定
+    graph.add(("report", "*"), traced("report", merge), inputs={"parts": [("score", s) for s in SYMBOLS],
+                                                               "qc_result": ("qc", "*")}, inline=True)
+    for s in SYMBOLS:
+        func = score if order is None else traced(f"score:{s}", score)
+        graph.add(("score", s), func, s, inputs={"allowed": ("qc", "*")})
+    graph.add(("qc", "*"), qc if order is None else traced("qc", qc), SYMBOLS)
+    return graph
+
+
+def test_serial_runs_in_dependency_order():
+    order = []
+    results = build(order).run(jobs=1)
+    assert order == ["qc", "score:A", "score:B", "score:C", "report"]
+    assert results[("report", "*")]["allowed"] == [0, 1, 2]
+
+
+def test_process_pool_matches_serial():
+    prof = StageProfiler()
+    pooled = build().run(jobs=2, profiler=prof)
+    serial = build().run(jobs=1)
+    report = pooled[("report", "*")]
+    assert report["symbols"] == SYMBOLS and report["allowed"] == serial[("report", "*")]["allowed"]
+    assert report["qc"] == serial[("qc", "*")]
+    # 汇总单元在所有上游单元完成后才执行；标的单元在子进程中运行
+    assert report["merged_at"] >= report["latest_part"]
+    assert all(pooled[("score", s)]["pid"] != os.getpid() for s in SYMBOLS)
+
+    stages = {(r["stage"], r["symbol"]): r for r in prof.to_dict()["stages"]}
+    assert set(stages) == set(pooled)
+    assert all(r["calls"] == 1 for r in stages.values())
+    assert stages[("qc", "*")]["seconds"] >= 0.05
+
+
+def test_invalid_graphs():
+    graph = TaskGraph()
+    graph.add(("a", "*"), qc, SYMBOLS, deps=[("b", "*")])
+    with pytest.raises(ValueError, match="unknown unit"):
+        graph.run()
+    graph.add(("b", "*"), qc, SYMBOLS, deps=[("a", "*")])
+    with pytest.raises(ValueError, match="cycle"):
+        graph.run()
+    with pytest.raises(ValueError, match="Duplicate"):
+        graph.add(("a", "*"), qc, SYMBOLS)
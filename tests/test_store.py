@@ -0,0 +1,47 @@
+"""分钟特征库：FeatureStore.panel / day 与直接读取 parquet 的 load_minute_panel 一致"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.panel import load_minute_panel
+from src.ofi.store import DEFAULT_FEATURES, FeatureStore, build_feature_store
+from tests.conftest import SAMPLE_DATES, SAMPLE_SYMBOLS
+
+
+@pytest.fixture(scope="module")
+def roots(sample_root):
+    return {"ofi_root": sample_root.ofi_dir, "label_root": sample_root.label_dir,
+            "processed_root": sample_root.ticks_dir}
+
+
+@pytest.fixture(scope="module", params=[True, False], ids=["spread", "no_spread"])
+def store(request, roots, tmp_path_factory):
+    out = tmp_path_factory.mktemp("store")
+    build_feature_store(SAMPLE_SYMBOLS, out, with_spread=request.param, **roots)
+    return FeatureStore.open(out)
+
+
+@pytest.mark.parametrize("kw", [
+    {},
+    {"start_date": "2021-01-05", "feature_cols": ["ofi1", "ofi"], "with_spread": True},
+    {"allowed": {(SAMPLE_SYMBOLS[0], SAMPLE_DATES[0]), (SAMPLE_SYMBOLS[2], SAMPLE_DATES[2])},
+     "with_spread": True, "dtype": "float32"},
+])
+def test_panel_matches_load_minute_panel(store, roots, kw):
+    symbols = SAMPLE_SYMBOLS[::-1]
+    want = load_minute_panel(symbols, **kw, **roots)
+    got = store.panel(symbols, **kw)
+    assert len(got) > 0
+    pd.testing.assert_frame_equal(got, want)
+
+
+def test_day_matches_parquet(store, roots):
+    symbol, date = SAMPLE_SYMBOLS[1], SAMPLE_DATES[1]
+    want = load_minute_panel([symbol], date, date, feature_cols=DEFAULT_FEATURES,
+                             **roots).set_index("minute")
+    got = store.day(symbol, date)
+    np.testing.assert_array_equal(got.index, want.index)
+    np.testing.assert_array_equal(got[DEFAULT_FEATURES + ["ret"]].to_numpy(),
+                                  want[DEFAULT_FEATURES + ["ret"]].to_numpy())
+    assert store.days(symbol) == SAMPLE_DATES
+    assert (symbol, "2021-03-01") not in store
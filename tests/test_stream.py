@@ -0,0 +1,99 @@
+"""OfiAccumulator 滚动窗口与 compute_ofi_per_tick + aggregate_to_minute 的一致性"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.features_ofi import aggregate_to_minute, compute_ofi_per_tick
+from src.ofi.stream import OfiAccumulator
+
+LEVELS = 5
+WINDOWS = (1, 3, 5)
+LEVEL_COLS = [f"ofi{i}" for i in range(1, LEVELS + 1)]
+
+
+def expected_windows(df):
+    """批处理口径：tick OFI 聚合到自然分钟（空分钟为 0），再做 w 分钟滚动求和"""
+    minute = aggregate_to_minute(compute_ofi_per_tick(df, LEVELS))[LEVEL_COLS]
+    return {w: minute.rolling(w, min_periods=1).sum() for w in WINDOWS}
+
+
+@pytest.mark.parametrize("symbol,date", [("510050.XSHG", "2021-01-04"), ("159915.XSHE", "2021-01-05")])
+@pytest.mark.parametrize("mode", ["tick", "batch"])
+def test_window_sums_match_minute_rolling_sum(sample_root, symbol, date, mode):
+    df = sample_root.ticks(symbol, date).set_index("ts")
+    expected = expected_windows(df)
+    weight = 1.0 / np.arange(1, LEVELS + 1)
+    acc = OfiAccumulator(LEVELS, weight=weight, windows=WINDOWS)
+
+    minutes = df.index.floor("min")
+    for m, chunk in df.groupby(minutes, sort=True):
+        if mode == "batch":
+            acc.update_frame(chunk.reset_index())
+        else:
+            books = [chunk[[f"{s}{i}_{k}" for i in range(1, LEVELS + 1)]].to_numpy(float)
+                     for s, k in (("a", "p"), ("a", "v"), ("b", "p"), ("b", "v"))]
+            for j, ts in enumerate(chunk.index):
+                acc.update(ts, *(x[j] for x in books))
+        assert acc.current_minute == m
+        for w in WINDOWS:
+            np.testing.assert_allclose(acc.window(w), expected[w].loc[m].to_numpy(), rtol=1e-12, atol=1e-6)
+            assert acc.ofi(w) == pytest.approx(float(expected[w].loc[m].to_numpy() @ weight), abs=1e-6)
+
+    # 收盘后无新快照：推进时钟后窗口清零
+    acc.advance_to(minutes[-1] + pd.Timedelta(minutes=WINDOWS[-1]))
+    for w in WINDOWS:
+        np.testing.assert_array_equal(acc.window(w), 0.0)
+        assert acc.active_minutes(w) == 0
+
+
+def test_active_minutes_counts_minutes_with_observations():
+    acc = OfiAccumulator(levels=1, windows=(3,))
+    t0 = pd.Timestamp("2021-01-04 09:31:00")
+    snap = ([10.1], [100.0], [10.0], [200.0])
+
+    # 重置后的第一笔只作基准，所在分钟不计为有观测
+    acc.update(t0, *snap)
+    assert acc.active_minutes(3) == 0
+    acc.update(t0 + pd.Timedelta(seconds=3), *snap)
+    assert acc.active_minutes(3) == 1
+
+    acc.add(t0 + pd.Timedelta(minutes=1), [5.0])
+    acc.advance_to(t0 + pd.Timedelta(minutes=2))
+    assert acc.active_minutes(3) == 2
+    assert acc.ofi(3) == 5.0
+
+    # 09:31 滑出窗口，09:32 的 add 仍在
+    acc.add(t0 + pd.Timedelta(minutes=3), [-2.0])
+    assert acc.active_minutes(3) == 2
+    assert acc.ofi(3) == 3.0
+
+    acc.reset()
+    acc.update_batch(np.array([t0.value, t0.value + 10**9]), *(np.array([x, x]) for x in snap))
+    assert acc.active_minutes(3) == 1
+    with pytest.raises(KeyError):
+        acc.active_minutes(5)
+
+
+@pytest.mark.parametrize("session_clock,n_active,ofi", [(True, 3, 7.0), (False, 1, 3.0)])
+def test_session_clock_window_spans_lunch(session_clock, n_active, ofi):
+    """右闭分钟桶 + 交易分钟时钟：13:01 的 3 根 bar 窗口为 11:29、11:30、13:01"""
+    acc = OfiAccumulator(levels=1, windows=(3,), closed="right", session_clock=session_clock)
+    times = ["11:28:10", "11:28:40", "11:29:10", "11:29:40", "11:30:00", "13:00:03", "13:00:30", "13:01:00"]
+    # 价格不变、买量每笔 +1：每对相邻快照的 OFI 为 1
+    for i, t in enumerate(times):
+        acc.update(pd.Timestamp(f"2021-01-04 {t}"), [10.1], [100.0], [10.0], [100.0 + i])
+    acc.advance_to(pd.Timestamp("2021-01-04 13:01:00"))
+    assert acc.current_minute == pd.Timestamp("2021-01-04 13:01:00")
+    # 分钟桶 11:29 / 11:30 / 13:01 各有 1 / 3 / 3 对快照；自然分钟时钟下只剩 13:01
+    assert acc.active_minutes(3) == n_active
+    assert acc.ofi(3) == ofi
+
+    # 右闭：13:02:00 的快照属于 13:02，11:29 滑出窗口
+    acc.update(pd.Timestamp("2021-01-04 13:02:00"), [10.1], [100.0], [10.0], [100.0 + len(times)])
+    assert acc.current_minute == pd.Timestamp("2021-01-04 13:02:00")
+    assert acc.ofi(3) == (7.0 if session_clock else 4.0)
+
+
+def test_invalid_closed():
+    with pytest.raises(ValueError, match="closed"):
+        OfiAccumulator(levels=1, closed="both")
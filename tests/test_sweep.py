@@ -0,0 +1,38 @@
+"""参数扫描：缓存的分档窗口和 + 进程池结果与逐组合 run_backtest 一致"""
+import pytest
+
+from src.ofi.backtest import backtest_summary, run_backtest
+from src.ofi.panel import load_minute_panel
+from src.ofi.sweep import expand_grid, run_sweep
+from tests.conftest import SAMPLE_SYMBOLS
+
+SPACE = {"balance_interval": [1, 3], "k_long": [1, 2], "levels": [1, 3, 5],
+         "weight": [[1, 1, 1, 1, 1], [1, 0.8, 0.6, 0.4, 0.2]]}
+
+
+@pytest.fixture(scope="module")
+def panel(sample_root):
+    return load_minute_panel(SAMPLE_SYMBOLS, feature_cols=[f"ofi{i}" for i in range(1, 6)],
+                             ofi_root=sample_root.ofi_dir, label_root=sample_root.label_dir,
+                             with_spread=True, processed_root=sample_root.ticks_dir)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_sweep_matches_individual_backtests(panel, n_jobs):
+    configs = expand_grid(SPACE)
+    # levels=1 时两个权重向量截取后相同，只保留一个
+    assert len(configs) == 2 * 2 * (1 + 2 + 2)
+    res = run_sweep(panel, configs, n_jobs=n_jobs, chunk_size=3)
+    assert len(res) == len(configs) and (res["n_trades"] > 0).all()
+
+    for p in configs:
+        ref = backtest_summary(run_backtest(
+            panel, balance_interval=p["balance_interval"], k_long=p["k_long"], ofi_window=p["ofi_window"],
+            k_spread=p["k_spread"], gross=p["gross"], levels=p["levels"], weight=p["weight"]).pnl)
+        weight = ",".join(f"{w:g}" for w in p["weight"])
+        row = res[(res["balance_interval"] == p["balance_interval"]) & (res["k_long"] == p["k_long"])
+                  & (res["levels"] == p["levels"]) & (res["weight"] == weight)]
+        assert len(row) == 1
+        got = row.iloc[0]
+        for key, value in ref.items():
+            assert got[key] == pytest.approx(value, rel=1e-9, abs=1e-12, nan_ok=True), (p, key)
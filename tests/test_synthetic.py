@@ -0,0 +1,57 @@
+"""合成盘口数据：确定性、原始格式往返读取、并行写出与串行一致、缺陷注入比例"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ofi.clean import PX_COLS
+from src.ofi.io import read_raw_lob_csv
+from src.ofi.qc import qc_day
+from src.ofi.synthetic import RAW_COLUMNS, generate_lob_day, write_raw_days
+
+SYMBOLS = ["510050.XSHG", "159915.XSHE"]
+DATES = ["2021-01-04", "2021-01-05"]
+
+
+def test_generation_is_deterministic():
+    a = generate_lob_day(SYMBOLS[0], DATES[0], seed=3)
+    pd.testing.assert_frame_equal(a, generate_lob_day(SYMBOLS[0], DATES[0], seed=3))
+    assert not a.equals(generate_lob_day(SYMBOLS[0], DATES[0], seed=4))
+    assert not a.equals(generate_lob_day(SYMBOLS[0], DATES[1], seed=3))
+    assert list(a.columns) == RAW_COLUMNS
+
+
+def test_raw_files_round_trip(tmp_path):
+    path = write_raw_days(tmp_path, SYMBOLS[:1], DATES[:1])[0]
+    df = generate_lob_day(SYMBOLS[0], DATES[0])
+    got = read_raw_lob_csv(path, drop_invalid=False)
+    pd.testing.assert_frame_equal(got[RAW_COLUMNS].reset_index(drop=True), df, check_dtype=False)
+    ts = pd.to_datetime(df["time"].astype("int64").astype(str), format="%Y%m%d%H%M%S")
+    np.testing.assert_array_equal(got["ts"].to_numpy(), ts.to_numpy())
+    # 没有注入缺陷时盘口全部有效，点差为 1~2 个 tick
+    spread = np.round((df["a1_p"] - df["b1_p"]) / 0.001)
+    assert set(spread.unique()) <= {1.0, 2.0}
+    assert (df[PX_COLS] > 0).all().all()
+
+
+def test_parallel_write_matches_serial(tmp_path):
+    serial = write_raw_days(tmp_path / "serial", SYMBOLS, DATES, seed=1, processed_root=tmp_path / "p1")
+    pooled = write_raw_days(tmp_path / "pooled", SYMBOLS, DATES, seed=1, processed_root=tmp_path / "p2",
+                            n_jobs=2)
+    assert [p.relative_to(tmp_path / "serial") for p in serial] == \
+           [p.relative_to(tmp_path / "pooled") for p in pooled]
+    for a, b in zip(serial, pooled):
+        pd.testing.assert_frame_equal(read_raw_lob_csv(a), read_raw_lob_csv(b))
+    for a in sorted((tmp_path / "p1").rglob("*.parquet")):
+        b = tmp_path / "p2" / a.relative_to(tmp_path / "p1")
+        pd.testing.assert_frame_equal(pd.read_parquet(a), pd.read_parquet(b))
+
+
+@pytest.mark.parametrize("rate_field,metric", [("crossed_rate", "crossed_ratio"),
+                                               ("duplicate_rate", "dup_ts_ratio")])
+def test_defect_rates_show_up_in_qc(tmp_path, rate_field, metric):
+    for rate in (0.0, 0.05):
+        path = tmp_path / f"{rate_field}_{rate}.csv.gz"
+        generate_lob_day(SYMBOLS[0], DATES[0], seed=2, **{rate_field: rate}).to_csv(
+            path, index=False, compression="gzip")
+        rec = qc_day(SYMBOLS[0], DATES[0], path, source="raw")
+        assert rec[metric] == pytest.approx(rate, abs=0.015)